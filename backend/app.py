@@ -1,16 +1,67 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+import hmac
 import json
+import math
+import os
 import random
+import time
 from datetime import datetime
 import uuid
 
+from content_registry import ContentRegistry
+from conversation_context import RECENT_KURALS, ContextStore, ConversationContext, valid_session_id
+from emotions import emotion_distribution
+from feedback_analytics import FeedbackAnalytics
+from feedback_store import WriteBehindWriter, create_feedback_store
+from message_cache import AnalyzedMessage, MessageCache
+from metrics import SIZE_BUCKETS, metrics
+from pagination import CappedRecords, iter_pages, ndjson_response, parse_page_args
+from personality import PersonalityScorer, load_weights
+from quiz_analytics import QuizAnalytics
+from quiz_store import create_quiz_store, valid_answers
+from rate_limit import create_rate_limiter
+from rollups import parse_window_args
+from structured_logging import configure_logging, debug_sampled
+
 app = Flask(__name__)
 CORS(app)
 
-# In-memory storage for quiz answers (in production, use a database)
-quiz_responses = []
-feedback_responses = []
+# JSON-lines logs written by a background thread (LOG_LEVEL, LOG_DEBUG_SAMPLE_RATE)
+logger = configure_logging()
+
+# Quiz answers go to the store named by QUIZ_STORE_URL (in-memory by default, keeping
+# the newest QUIZ_MAX_RESPONSES; e.g. sqlite:///quiz.db to persist and share them across workers)
+quiz_store = create_quiz_store(os.environ.get('QUIZ_STORE_URL'))
+# Personality typing weights: the quizLogic.js rules, or a JSON file at PERSONALITY_WEIGHTS_PATH
+personality_scorer = PersonalityScorer(
+    *load_weights(os.environ['PERSONALITY_WEIGHTS_PATH'])
+) if os.environ.get('PERSONALITY_WEIGHTS_PATH') else PersonalityScorer()
+# Running analytics, seeded from whatever the store already holds, with minute/hour/day
+# rollups for windowed queries (ROLLUP_MINUTES, ROLLUP_HOURS, ROLLUP_DAYS buckets kept).
+# With a store shared across workers, each worker folds in what every worker added when
+# analytics are read, rather than counting only its own submissions
+quiz_analytics = QuizAnalytics(personality_scorer)
+quiz_analytics.refresh_from(quiz_store)
+# Feedback is kept in memory and, when FEEDBACK_STORE_URL is set (sqlite:///feedback.db
+# or jsonl:///feedback.jsonl), written behind to disk in batches by a background thread.
+# Only the newest FEEDBACK_MAX_RECORDS stay in memory; analytics still count every record
+feedback_store = create_feedback_store(os.environ.get('FEEDBACK_STORE_URL'))
+feedback_responses = CappedRecords(max_records=int(os.environ.get('FEEDBACK_MAX_RECORDS', '100000')))
+feedback_analytics = FeedbackAnalytics()
+feedback_writer = WriteBehindWriter(feedback_store) if feedback_store else None
+
+# Per-client token buckets on the write endpoints (WRITE_RATE_LIMIT per second, bursts of
+# WRITE_RATE_BURST; 0 disables). RATE_LIMIT_URL=sqlite:///ratelimit.db shares them across workers
+write_limiter = create_rate_limiter(os.environ.get('RATE_LIMIT_URL'))
+# Behind TRUST_PROXY reverse proxies the client address is the X-Forwarded-For entry the
+# outermost of them added; entries further left are whatever the client sent
+TRUST_PROXY = int(os.environ.get('TRUST_PROXY', '0'))
+if TRUST_PROXY:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUST_PROXY)
+# Maintenance endpoints need 'Authorization: Bearer <ADMIN_TOKEN>'; unset, they are turned off
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
 
 # Sample Kurals database with emotions and responses
 KURALS_DATABASE = {
@@ -175,72 +226,189 @@ CHAT_RESPONSES = {
     ]
 }
 
-def get_emotion_from_text(text):
-    """Extract emotion from user input using keyword matching"""
-    text_lower = text.lower()
-    
-    emotion_keywords = {
-        "joy": ["happy", "joy", "cheerful", "excited", "celebrate", "smile", "laugh"],
-        "sadness": ["sad", "depressed", "down", "blue", "cry", "tears", "grief", "mourn"],
-        "anger": ["angry", "mad", "furious", "rage", "irritated", "annoyed", "frustrated"],
-        "fear": ["afraid", "scared", "fear", "anxious", "worried", "nervous", "panic"],
-        "love": ["love", "adore", "cherish", "romance", "affection", "care", "devotion"],
-        "forgiveness": ["forgive", "forgiveness", "pardon", "excuse", "apologize", "sorry"],
-        "strength": ["strong", "power", "courage", "brave", "mighty", "resilient", "tough"],
-        "peace": ["peace", "calm", "serene", "tranquil", "quiet", "still", "harmony"],
-        "gratitude": ["grateful", "thankful", "appreciate", "blessed", "gratitude", "thanks"],
-        "hope": ["hope", "hopeful", "optimistic", "positive", "future", "dream", "aspire"]
+# Kural lookups over the binary corpus at KURAL_CORPUS_PATH (built with build_corpus.py),
+# or over the sample KURALS_DATABASE above when it is unset, plus the reply templates
+# (CHAT_RESPONSES_PATH, else CHAT_RESPONSES). Both files are watched and reloaded in the
+# background; requests take one snapshot from content_registry.current and use only that
+content_registry = ContentRegistry(
+    KURALS_DATABASE, CHAT_RESPONSES,
+    os.environ.get('KURAL_CORPUS_PATH'), os.environ.get('CHAT_RESPONSES_PATH')
+)
+content_registry.start()
+
+def refresh_feedback():
+    """Fold the feedback every worker has written to FEEDBACK_STORE_URL since the last call into this worker"""
+    if feedback_store:
+        feedback_analytics.refresh_from(
+            feedback_store, content_registry.current.kural_index.number_of, feedback_responses
+        )
+
+# Feedback analytics count votes by Kural number, so stored feedback is replayed once the corpus is loaded
+refresh_feedback()
+
+# Per-session emotion trend and recently shown Kurals, so clients send only the new message
+chat_sessions = ContextStore()
+
+# Greeting check, emotion distribution and ranked Kurals of repeated messages (CHAT_CACHE_SIZE, CHAT_CACHE_TTL)
+chat_cache = MessageCache()
+
+# Ranked candidates kept per cached message: enough to skip a session's recent Kurals
+CACHED_MATCHES = 3 + RECENT_KURALS
+
+# Greeting phrases that get a welcome message instead of emotion matching
+GREETING_WORDS = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"]
+
+# Upper bound on messages accepted by /api/chat/batch in one request
+MAX_CHAT_BATCH = 1000
+
+def is_greeting(user_message):
+    """Check whether a message is a greeting"""
+    text_lower = user_message.lower()
+    return any(word in text_lower for word in GREETING_WORDS)
+
+def get_greeting_response(content, kural=None):
+    """Welcome message with a random kural"""
+    return {
+        "message": random.choice(content.responses["greeting"]),
+        "kural": kural or content.kural_index.random_kural(),
+        "follow_up": random.choice(content.responses["follow_up"])
     }
-    
-    for emotion, keywords in emotion_keywords.items():
-        if any(keyword in text_lower for keyword in keywords):
-            return emotion
-    
-    return "general"
 
-def get_chat_response(user_message, conversation_history=None):
-    """Generate appropriate chat response based on user input"""
-    if conversation_history is None:
-        conversation_history = []
+def get_wisdom_response(content, kural):
+    """General response wrapped around the chosen kural"""
+    return {
+        "message": random.choice(content.responses["general"]),
+        "kural": kural,
+        "follow_up": random.choice(content.responses["follow_up"])
+    }
+
+@metrics.timed('analyze_message')
+def analyze_message(text, expires):
+    """Everything about a message that does not depend on the session"""
+    return AnalyzedMessage(text, is_greeting(text), emotion_distribution(text), expires)
+
+def ranked_matches(analysis, emotion, content):
+    """Retrieval candidates for an analyzed message, computed once per emotion and corpus version"""
+    key = (content.version, emotion)
+    matches = analysis.matches.get(key)
+    if matches is None:
+        matches = analysis.matches[key] = content.kural_index.matches_for_message(
+            analysis.text, emotion, CACHED_MATCHES
+        )
+    return matches
+
+def history_context(conversation_history, content):
+    """Context rebuilt from the history a client sent, for requests without a session"""
+    context = ConversationContext()
+    context.rebase(content.version)
+    if isinstance(conversation_history, list):
+        context.seed(conversation_history, content.kural_index)
+    return context
+
+@metrics.timed('get_chat_response')
+def get_chat_response(user_message, conversation_history=None, context=None, content=None):
+    """Generate appropriate chat response based on user input and the conversation so far"""
+    if content is None:
+        content = content_registry.current
+    kural_index = content.kural_index
+    if context is None:
+        # No session: rebuild what we can from the history the client sent
+        context = history_context(conversation_history, content)
+    context.rebase(content.version)
+    
+    # Repeated messages skip classification and ranking; the pick below stays random
+    analysis = chat_cache.analyze(user_message, analyze_message)
     
     # Check for greetings
-    greeting_words = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening"]
-    if any(word in user_message.lower() for word in greeting_words):
-        # Get a random kural for greeting
-        all_kurals = []
-        for emotion_kurals in KURALS_DATABASE.values():
-            all_kurals.extend(emotion_kurals)
-        kural = random.choice(all_kurals)
-        
-        return {
-            "message": random.choice(CHAT_RESPONSES["greeting"]),
-            "kural": kural,
-            "follow_up": random.choice(CHAT_RESPONSES["follow_up"])
-        }
+    if analysis.greeting:
+        position = kural_index.random_position(exclude=context.recent)
+        context.remember(position)
+        return get_greeting_response(content, kural_index.corpus.kural(position))
     
-    # Get emotion from text
-    emotion = get_emotion_from_text(user_message)
+    # Get emotion from text, following the conversation's trend when it names none
+    emotion = context.emotion_for_distribution(analysis.distribution)
     
-    # Get relevant Kural
-    if emotion in KURALS_DATABASE:
-        kural = random.choice(KURALS_DATABASE[emotion])
-    else:
-        # Default to a general wisdom kural
-        all_kurals = []
-        for emotion_kurals in KURALS_DATABASE.values():
-            all_kurals.extend(emotion_kurals)
-        kural = random.choice(all_kurals)
+    # Get the closest matching Kural not shown recently, defaulting to a general wisdom kural
+    position = kural_index.pick_position(ranked_matches(analysis, emotion, content), emotion, context.recent)
+    context.remember(position)
+    
+    return get_wisdom_response(content, kural_index.corpus.kural(position))
+
+def get_chat_responses(user_messages, conversation_histories=None):
+    """get_chat_response for many sessionless messages, ranking the uncached ones in one batch"""
+    content = content_registry.current
+    kural_index = content.kural_index
+    if conversation_histories is None:
+        conversation_histories = [None] * len(user_messages)
+    responses = [None] * len(user_messages)
+    pending = []
+    for position, (user_message, history) in enumerate(zip(user_messages, conversation_histories)):
+        context = history_context(history, content)
+        analysis = chat_cache.analyze(user_message, analyze_message)
+        if analysis.greeting:
+            kural_position = kural_index.random_position(exclude=context.recent)
+            responses[position] = get_greeting_response(content, kural_index.corpus.kural(kural_position))
+        else:
+            pending.append((position, context, analysis, context.emotion_for_distribution(analysis.distribution)))
+    
+    # Messages whose candidates are not cached for their emotion yet are ranked in one matrix product
+    unranked = [item for item in pending if (content.version, item[3]) not in item[2].matches]
+    if unranked:
+        matches = kural_index.matches_for_messages(
+            [analysis.text for _, _, analysis, _ in unranked],
+            [emotion for _, _, _, emotion in unranked],
+            CACHED_MATCHES
+        )
+        for (_, _, analysis, emotion), ranked in zip(unranked, matches):
+            analysis.matches[(content.version, emotion)] = ranked
     
-    # Generate response
-    base_response = random.choice(CHAT_RESPONSES["general"])
-    follow_up = random.choice(CHAT_RESPONSES["follow_up"])
+    for position, context, analysis, emotion in pending:
+        kural_position = kural_index.pick_position(ranked_matches(analysis, emotion, content), emotion, context.recent)
+        responses[position] = get_wisdom_response(content, kural_index.corpus.kural(kural_position))
+    
+    return responses
+
+def build_chat_payload(user_message, response):
+    """Shape a chat response the way /api/chat returns it"""
+    # Add to conversation history
+    conversation_entry = {
+        'user': user_message,
+        'bot': response['message'],
+        'kural': response['kural'],
+        'timestamp': datetime.now().isoformat()
+    }
     
     return {
-        "message": f"{base_response}",
-        "kural": kural,
-        "follow_up": follow_up
+        'response': response['message'],
+        'kural': response['kural'],
+        'follow_up': response['follow_up'],
+        'conversation_entry': conversation_entry
     }
 
+@app.before_request
+def start_request_timer():
+    """Remember when the request started for the latency histogram"""
+    g.metrics_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and record its latency and body sizes"""
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = (('endpoint', endpoint), ('method', request.method))
+    metrics.inc('thirukkural_http_requests_total', labels + (('status', str(response.status_code)),))
+    if response.status_code >= 500:
+        metrics.inc('thirukkural_http_errors_total', labels)
+    metrics.observe('thirukkural_http_request_duration_seconds', labels, time.perf_counter() - start)
+    # Streamed (ndjson) responses have no length up front and are left out
+    if response.content_length is not None:
+        metrics.observe('thirukkural_http_response_bytes', labels, response.content_length, SIZE_BUCKETS)
+    if request.content_length:
+        metrics.observe('thirukkural_http_request_bytes', labels, request.content_length, SIZE_BUCKETS)
+    return response
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Main chat endpoint"""
@@ -251,37 +419,90 @@ def chat():
             
         user_message = data.get('message', '')
         conversation_history = data.get('history', [])
+        session_id = data.get('session_id')
         
-        print(f"Received message: {user_message}")  # Debug logging
+        logger.info('chat request', extra={'fields': {'message_length': len(user_message)}})
         
         if not user_message.strip():
             return jsonify({
                 'error': 'Message cannot be empty'
             }), 400
         
+        # One content version for the whole request, even if a reload lands meanwhile
+        content = content_registry.current
+        
+        # Continue the client's session, or start one and hand its token back. A token this
+        # worker does not hold, sent without history, gets a 409 so the client resends with it
+        if not valid_session_id(session_id):
+            session_id = str(uuid.uuid4())
+        elif 'history' not in data and chat_sessions.find(session_id) is None:
+            return jsonify({'error': 'Unknown session', 'session_unknown': True}), 409
+        context, created = chat_sessions.get(session_id)
+        if created and isinstance(conversation_history, list):
+            context.rebase(content.version)
+            context.seed(conversation_history, content.kural_index)
+        
         # Generate response
-        response = get_chat_response(user_message, conversation_history)
-        print(f"Generated response: {response}")  # Debug logging
-        
-        # Add to conversation history
-        conversation_entry = {
-            'user': user_message,
-            'bot': response['message'],
-            'kural': response['kural'],
-            'timestamp': datetime.now().isoformat()
-        }
+        response = get_chat_response(user_message, conversation_history, context, content)
+        if debug_sampled(logger):
+            logger.debug('chat response', extra={'fields': {'user_message': user_message, 'response': response}})
+        
+        payload = build_chat_payload(user_message, response)
+        payload['session_id'] = session_id
+        return jsonify(payload)
+        
+    except Exception as e:
+        logger.exception('Error in chat endpoint')
+        return jsonify({
+            'error': 'Internal server error',
+            'details': str(e)
+        }), 500
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer many chat messages in one request, results in request order"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        items = data.get('messages')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'No messages provided'}), 400
+        if len(items) > MAX_CHAT_BATCH:
+            return jsonify({'error': f'At most {MAX_CHAT_BATCH} messages per batch'}), 400
+        
+        # Each item is a message string or {"message": ..., "history": [...]}
+        user_messages = []
+        conversation_histories = []
+        for item in items:
+            if isinstance(item, dict):
+                user_messages.append(item.get('message', ''))
+                conversation_histories.append(item.get('history', []))
+            else:
+                user_messages.append(item)
+                conversation_histories.append([])
+        
+        valid = [
+            position for position, user_message in enumerate(user_messages)
+            if isinstance(user_message, str) and user_message.strip()
+        ]
+        responses = get_chat_responses(
+            [user_messages[position] for position in valid],
+            [conversation_histories[position] for position in valid]
+        )
+        
+        results = [{'error': 'Message cannot be empty'}] * len(items)
+        for position, response in zip(valid, responses):
+            results[position] = build_chat_payload(user_messages[position], response)
         
         return jsonify({
-            'response': response['message'],
-            'kural': response['kural'],
-            'follow_up': response['follow_up'],
-            'conversation_entry': conversation_entry
+            'count': len(results),
+            'results': results
         })
         
     except Exception as e:
-        print(f"Error in chat endpoint: {str(e)}")  # Debug logging
-        import traceback
-        traceback.print_exc()  # Print full traceback
+        logger.exception('Error in chat batch endpoint')
         return jsonify({
             'error': 'Internal server error',
             'details': str(e)
@@ -290,18 +511,14 @@ def chat():
 @app.route('/api/emotions', methods=['GET'])
 def get_emotions():
     """Get available emotions for suggestions"""
-    return jsonify({
-        'emotions': list(KURALS_DATABASE.keys())
-    })
+    return content_registry.current.kural_index.emotions_payload.response()
 
 @app.route('/api/kurals/<emotion>', methods=['GET'])
 def get_kurals_by_emotion(emotion):
     """Get Kurals by specific emotion"""
-    if emotion in KURALS_DATABASE:
-        return jsonify({
-            'emotion': emotion,
-            'kurals': KURALS_DATABASE[emotion]
-        })
+    payload = content_registry.current.kural_index.emotion_payload(emotion)
+    if payload:
+        return payload.response()
     else:
         return jsonify({
             'error': 'Emotion not found'
@@ -310,15 +527,23 @@ def get_kurals_by_emotion(emotion):
 @app.route('/api/random', methods=['GET'])
 def get_random_kural():
     """Get a random Kural"""
-    all_kurals = []
-    for emotion, kurals in KURALS_DATABASE.items():
-        for kural in kurals:
-            kural_copy = kural.copy()
-            kural_copy['emotion'] = emotion
-            all_kurals.append(kural_copy)
+    return jsonify(content_registry.current.kural_index.random_record())
+
+@app.route('/api/search', methods=['GET'])
+def search_kurals():
+    """Full-text search over Kural Tamil, English and relevance text"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Query cannot be empty'}), 400
     
-    random_kural = random.choice(all_kurals)
-    return jsonify(random_kural)
+    k = max(1, min(request.args.get('k', default=10, type=int), 50))
+    emotion = request.args.get('emotion') or None
+    results = content_registry.current.kural_index.search(query, k, emotion)
+    
+    return jsonify({
+        'query': query,
+        'results': [{'kural': kural, 'score': round(score, 4)} for kural, score in results]
+    })
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -326,12 +551,46 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'message': 'Thirukkural.Ai API is running',
+        'content_version': content_registry.current.version,
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Request counters and latency histograms in Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def client_key():
+    """Address the rate limit is counted against"""
+    return request.remote_addr or 'unknown'
+
+def check_write_limit(endpoint):
+    """429 response when the client has used up its write budget, else None"""
+    if write_limiter is None:
+        return None
+    allowed, retry_after = write_limiter.allow(client_key())
+    if allowed:
+        return None
+    metrics.inc('thirukkural_rate_limited_total', (('endpoint', endpoint),))
+    return jsonify({'error': 'Too many requests, please slow down'}), 429, {'Retry-After': str(math.ceil(retry_after))}
+
+def check_admin(endpoint):
+    """429 or 403 response unless the client is within its write budget and sends ADMIN_TOKEN, else None"""
+    limited = check_write_limit(endpoint)
+    if limited:
+        return limited
+    supplied = request.headers.get('Authorization', '').encode()
+    if not ADMIN_TOKEN or not hmac.compare_digest(supplied, f'Bearer {ADMIN_TOKEN}'.encode()):
+        return jsonify({'error': 'Admin token required'}), 403
+    return None
+
 @app.route('/api/quiz/submit', methods=['POST'])
 def submit_quiz():
     """Submit quiz answers and store them"""
+    limited = check_write_limit('quiz_submit')
+    if limited:
+        return limited
+    
     try:
         data = request.get_json()
         if not data:
@@ -340,33 +599,65 @@ def submit_quiz():
         answers = data.get('answers', {})
         if not answers:
             return jsonify({'error': 'No answers provided'}), 400
+        if not valid_answers(answers):
+            return jsonify({'error': 'answers must map quiz question ids (1-15) to A, B, C or D'}), 400
         
         # Generate unique session ID
         session_id = str(uuid.uuid4())
         
+        # Score once here; the type is stored with the response and counted by analytics
+        personality = personality_scorer.result(answers)
+        
         # Create quiz response record
         quiz_response = {
             'session_id': session_id,
             'answers': answers,
             'timestamp': datetime.now().isoformat(),
-            'total_questions': len(answers)
+            'total_questions': len(answers),
+            'personality_type': personality['type']
         }
         
-        # Store in memory (in production, save to database)
-        quiz_responses.append(quiz_response)
+        quiz_store.add(quiz_response)
+        if not hasattr(quiz_store, 'changes'):
+            quiz_analytics.record(answers, personality['type'], quiz_response['timestamp'])
         
-        print(f"Quiz submitted: {session_id}")  # Debug logging
+        logger.info('quiz submitted', extra={'fields': {'session_id': session_id}})
         
-        print(quiz_responses)
         return jsonify({
             'success': True,
             'session_id': session_id,
+            'personality': personality,
             'message': 'Quiz answers submitted successfully',
             'timestamp': datetime.now().isoformat()
         })
         
     except Exception as e:
-        print(f"Error in quiz submission: {str(e)}")
+        logger.exception('Error in quiz submission')
+        return jsonify({
+            'error': 'Internal server error',
+            'details': str(e)
+        }), 500
+
+@app.route('/api/quiz/score', methods=['POST'])
+def score_quiz():
+    """Personality type and dimension scores for quiz answers, without storing them"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        answers = data.get('answers')
+        if not answers or not isinstance(answers, dict):
+            return jsonify({'error': 'No answers provided'}), 400
+        if not valid_answers(answers):
+            return jsonify({'error': 'answers must map quiz question ids (1-15) to A, B, C or D'}), 400
+        
+        return jsonify({
+            'success': True,
+            'personality': personality_scorer.result(answers)
+        })
+        
+    except Exception as e:
         return jsonify({
             'error': 'Internal server error',
             'details': str(e)
@@ -374,12 +665,22 @@ def submit_quiz():
 
 @app.route('/api/quiz/responses', methods=['GET'])
 def get_quiz_responses():
-    """Get all quiz responses (for analytics)"""
+    """Get quiz responses page by page, or stream them all as NDJSON (for analytics)"""
     try:
+        try:
+            page_args = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if request.args.get('format') == 'ndjson':
+            return ndjson_response(iter_pages(quiz_store.page, page_args['since'], page_args['until']))
+        
+        responses, next_cursor = quiz_store.page(**page_args)
         return jsonify({
             'success': True,
-            'total_responses': len(quiz_responses),
-            'responses': quiz_responses,
+            'total_responses': quiz_store.count(),
+            'responses': responses,
+            'next_cursor': next_cursor,
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -392,7 +693,7 @@ def get_quiz_responses():
 def get_quiz_response(session_id):
     """Get specific quiz response by session ID"""
     try:
-        response = next((r for r in quiz_responses if r['session_id'] == session_id), None)
+        response = quiz_store.get(session_id)
         if not response:
             return jsonify({'error': 'Quiz response not found'}), 404
         
@@ -408,9 +709,25 @@ def get_quiz_response(session_id):
 
 @app.route('/api/quiz/analytics', methods=['GET'])
 def get_quiz_analytics():
-    """Get quiz analytics and insights"""
+    """Get quiz analytics and insights, all-time or over a from/to window in granularity buckets"""
     try:
-        if not quiz_responses:
+        try:
+            window = parse_window_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        quiz_analytics.refresh_from(quiz_store)
+        if window is not None:
+            return jsonify({
+                'success': True,
+                'analytics': {
+                    **quiz_analytics.window(**window),
+                    'timestamp': datetime.now().isoformat()
+                }
+            })
+        
+        analytics = quiz_analytics.snapshot()
+        if not analytics['total_responses']:
             return jsonify({
                 'success': True,
                 'total_responses': 0,
@@ -422,42 +739,10 @@ def get_quiz_analytics():
                 }
             })
         
-        # Calculate analytics
-        total_responses = len(quiz_responses)
-        
-        # Count answer frequencies
-        answer_counts = {}
-        personality_counts = {}
-        
-        for response in quiz_responses:
-            answers = response['answers']
-            for question_id, answer in answers.items():
-                key = f"Q{question_id}_{answer}"
-                answer_counts[key] = answer_counts.get(key, 0) + 1
-            
-            # Analyze personality type (simplified)
-            wisdom_count = sum(1 for q, a in answers.items() if a in ['A'] and int(q) in [1, 2, 3, 4, 5])
-            compassion_count = sum(1 for q, a in answers.items() if a in ['B'] and int(q) in [1, 2, 3, 4, 5])
-            strength_count = sum(1 for q, a in answers.items() if a in ['C'] and int(q) in [1, 2, 3, 4, 5])
-            harmony_count = sum(1 for q, a in answers.items() if a in ['D'] and int(q) in [1, 2, 3, 4, 5])
-            
-            if wisdom_count >= max(compassion_count, strength_count, harmony_count):
-                personality_type = 'The Wise Seeker'
-            elif compassion_count >= max(wisdom_count, strength_count, harmony_count):
-                personality_type = 'The Compassionate Heart'
-            elif strength_count >= max(wisdom_count, compassion_count, harmony_count):
-                personality_type = 'The Strong Leader'
-            else:
-                personality_type = 'The Peaceful Soul'
-            
-            personality_counts[personality_type] = personality_counts.get(personality_type, 0) + 1
-        
         return jsonify({
             'success': True,
             'analytics': {
-                'total_responses': total_responses,
-                'answer_frequencies': answer_counts,
-                'personality_distribution': personality_counts,
+                **analytics,
                 'timestamp': datetime.now().isoformat()
             }
         })
@@ -468,9 +753,56 @@ def get_quiz_analytics():
             'details': str(e)
         }), 500
 
+@app.route('/api/quiz/analytics/rebuild', methods=['POST'])
+def rebuild_quiz_analytics():
+    """Recompute quiz analytics from the quiz store (recovery), in every worker when the store is shared"""
+    denied = check_admin('quiz_analytics_rebuild')
+    if denied:
+        return denied
+    
+    try:
+        quiz_analytics.rebuild_from(quiz_store)
+        return jsonify({
+            'success': True,
+            'analytics': quiz_analytics.snapshot(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({
+            'error': 'Internal server error',
+            'details': str(e)
+        }), 500
+
+@app.route('/api/quiz/rescore', methods=['POST'])
+def rescore_quiz_responses():
+    """Re-type every stored response with the current weights, then rebuild analytics"""
+    denied = check_admin('quiz_rescore')
+    if denied:
+        return denied
+    
+    try:
+        start = time.perf_counter()
+        quiz_store.rescore(personality_scorer)
+        quiz_analytics.rebuild_from(quiz_store)
+        logger.info('quiz responses rescored', extra={'fields': {'seconds': round(time.perf_counter() - start, 3)}})
+        return jsonify({
+            'success': True,
+            'analytics': quiz_analytics.snapshot(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({
+            'error': 'Internal server error',
+            'details': str(e)
+        }), 500
+
 @app.route('/api/feedback/submit', methods=['POST'])
 def submit_feedback():
     """Submit user feedback for bot responses"""
+    limited = check_write_limit('feedback_submit')
+    if limited:
+        return limited
+    
     try:
         data = request.get_json()
         if not data:
@@ -485,6 +817,15 @@ def submit_feedback():
         if not feedback or feedback not in ['positive', 'negative']:
             return jsonify({'error': 'Invalid feedback type'}), 400
         
+        if not all(isinstance(value, str) for value in (user_message, bot_response, timestamp)):
+            return jsonify({'error': 'userMessage, botResponse and timestamp must be strings'}), 400
+        
+        if not isinstance(kural, dict):
+            return jsonify({'error': 'kural must be an object'}), 400
+        
+        # Votes on Kurals outside the corpus count only in the totals
+        kural_number = content_registry.current.kural_index.number_of(kural)
+        
         # Generate unique feedback ID
         feedback_id = str(uuid.uuid4())
         
@@ -498,10 +839,17 @@ def submit_feedback():
             'timestamp': timestamp
         }
         
-        # Store in memory (in production, save to database)
-        feedback_responses.append(feedback_record)
+        # Queue for disk first so a full queue turns the request away before anything is kept
+        if feedback_writer and not feedback_writer.submit(feedback_record):
+            logger.warning('feedback queue full', extra={'fields': {'feedback_id': feedback_id}})
+            return jsonify({'error': 'Feedback queue is full, please retry'}), 503, {'Retry-After': '1'}
+        
+        # A stored record is counted, by every worker, once it has been written (refresh_feedback)
+        if not feedback_store:
+            feedback_responses.append(feedback_record)
+            feedback_analytics.record(kural_number, feedback, timestamp)
         
-        print(f"Feedback submitted: {feedback_id} - {feedback}")  # Debug logging
+        logger.info('feedback submitted', extra={'fields': {'feedback_id': feedback_id, 'feedback': feedback}})
         
         return jsonify({
             'success': True,
@@ -511,7 +859,7 @@ def submit_feedback():
         })
         
     except Exception as e:
-        print(f"Error in feedback submission: {str(e)}")
+        logger.exception('Error in feedback submission')
         return jsonify({
             'error': 'Internal server error',
             'details': str(e)
@@ -519,12 +867,23 @@ def submit_feedback():
 
 @app.route('/api/feedback/responses', methods=['GET'])
 def get_feedback_responses():
-    """Get all feedback responses (for analytics)"""
+    """Get feedback responses page by page, or stream them all as NDJSON (for analytics)"""
     try:
+        try:
+            page_args = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        refresh_feedback()
+        if request.args.get('format') == 'ndjson':
+            return ndjson_response(iter_pages(feedback_responses.page, page_args['since'], page_args['until']))
+        
+        feedback, next_cursor = feedback_responses.page(**page_args)
         return jsonify({
             'success': True,
             'total_feedback': len(feedback_responses),
-            'feedback': feedback_responses,
+            'feedback': feedback,
+            'next_cursor': next_cursor,
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -533,11 +892,52 @@ def get_feedback_responses():
             'details': str(e)
         }), 500
 
+def kural_labels(ranked, kural_index):
+    """(Tamil text, counts) pairs for (Kural number, counts) pairs; numbers no longer in the corpus stay as they are"""
+    labelled = []
+    for number, counts in ranked:
+        kural = kural_index.by_number(number)
+        labelled.append((kural['tamil'] if kural else number, counts))
+    return labelled
+
 @app.route('/api/feedback/analytics', methods=['GET'])
 def get_feedback_analytics():
-    """Get feedback analytics and insights"""
+    """Get feedback analytics and insights, all-time or over a from/to window in granularity buckets"""
     try:
-        if not feedback_responses:
+        try:
+            window = parse_window_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        refresh_feedback()
+        # Number of most helpful Kurals to return
+        k = max(0, min(request.args.get('k', default=5, type=int), 100))
+        kural_index = content_registry.current.kural_index
+        # A Kural's number or Tamil text restricts a window to the votes on that Kural
+        kural = request.args.get('kural')
+        kural_number = None
+        if kural:
+            if kural.isdigit():
+                kural_number = int(kural) if kural_index.by_number(int(kural)) else None
+            else:
+                kural_number = kural_index.number_of({'tamil': kural})
+            if kural_number is None:
+                return jsonify({'error': 'Unknown Kural'}), 404
+        if window is not None or kural_number is not None:
+            analytics = feedback_analytics.window(**(window or {}), k=k, kural_number=kural_number)
+            if 'most_helpful_kurals' in analytics:
+                analytics['most_helpful_kurals'] = kural_labels(analytics['most_helpful_kurals'], kural_index)
+            return jsonify({
+                'success': True,
+                'analytics': {
+                    **analytics,
+                    'timestamp': datetime.now().isoformat()
+                }
+            })
+        
+        analytics = feedback_analytics.snapshot(k)
+        analytics['most_helpful_kurals'] = kural_labels(analytics['most_helpful_kurals'], kural_index)
+        if not analytics['total_feedback']:
             return jsonify({
                 'success': True,
                 'total_feedback': 0,
@@ -549,35 +949,10 @@ def get_feedback_analytics():
                 }
             })
         
-        # Calculate analytics
-        total_feedback = len(feedback_responses)
-        positive_count = sum(1 for f in feedback_responses if f['feedback'] == 'positive')
-        negative_count = sum(1 for f in feedback_responses if f['feedback'] == 'negative')
-        
-        # Count Kural feedback
-        kural_feedback = {}
-        for feedback in feedback_responses:
-            if feedback['kural'] and 'tamil' in feedback['kural']:
-                kural_text = feedback['kural']['tamil']
-                if kural_text not in kural_feedback:
-                    kural_feedback[kural_text] = {'positive': 0, 'negative': 0}
-                kural_feedback[kural_text][feedback['feedback']] += 1
-        
-        # Find most helpful Kurals
-        most_helpful = sorted(
-            kural_feedback.items(),
-            key=lambda x: x[1]['positive'] - x[1]['negative'],
-            reverse=True
-        )[:5]
-        
         return jsonify({
             'success': True,
             'analytics': {
-                'total_feedback': total_feedback,
-                'positive_feedback': positive_count,
-                'negative_feedback': negative_count,
-                'feedback_rate': round((positive_count / total_feedback) * 100, 2) if total_feedback > 0 else 0,
-                'most_helpful_kurals': most_helpful,
+                **analytics,
                 'timestamp': datetime.now().isoformat()
             }
         })
@@ -589,4 +964,5 @@ def get_feedback_analytics():
         }), 500
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server only; use serve.py for production
+    app.run(debug=os.environ.get('FLASK_DEBUG', '1') == '1', host='0.0.0.0', port=5000)
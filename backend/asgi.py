@@ -0,0 +1,14 @@
+"""
+ASGI entry point: the Flask app wrapped for uvicorn workers
+
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker --preload
+"""
+
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import app
+
+# WSGI calls run on a thread pool inside each uvicorn worker
+application = WSGIMiddleware(app, workers=int(os.environ.get('THREADS', 4)))
@@ -0,0 +1,1923 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the Thirukkural.Ai backend
+
+Usage:
+    python benchmark.py emotions
+    python benchmark.py quiz-store --sizes 10000 100000 1000000
+    python benchmark.py quiz-analytics --size 100000
+    python benchmark.py quiz-memory --sizes 100000 1000000
+    python benchmark.py personality --sessions 1000000
+    python benchmark.py feedback-analytics --size 1000000
+    python benchmark.py stream --size 1000000
+    python benchmark.py kural-endpoints --requests 20000
+    python benchmark.py search --queries 10000
+    python benchmark.py retrieval --messages 2000 --batch-size 256
+    python benchmark.py chat-batch --messages 1000
+    python benchmark.py quiz-submit --stored 100000
+    python benchmark.py metrics --requests 20000
+    python benchmark.py feedback-submit --submissions 20000 --threads 8 --disk-latency-ms 2
+    python benchmark.py chat-sessions --sessions 100000 --turns 20
+    python benchmark.py chat-cache --requests 20000 --repeat-share 0.8
+    python benchmark.py rate-limit --requests 5000
+    python benchmark.py content-reload --kurals 1330 --duration 10 --threads 8
+    python benchmark.py regression --requests 5000 --quiz 100000 --feedback 100000 --results results.json
+    python benchmark.py regression --baseline baseline.json --save-baseline
+    python benchmark.py regression --baseline baseline.json --margin 0.25
+    python benchmark.py rollups --events 10000000 --days 30
+    python benchmark.py load --modes dev wsgi asgi --workers 4 --concurrency 16 --duration 10
+"""
+
+import argparse
+import collections
+import contextlib
+import http.client
+import json
+import logging
+import os
+import random
+import resource
+import string
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+
+import numpy as np
+from werkzeug.serving import make_server
+
+# Keep request logs out of benchmark output unless asked for
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+# Submission benchmarks post far faster than any client should; rate-limit builds its own limiters
+os.environ.setdefault('WRITE_RATE_LIMIT', '0')
+
+import app as backend
+from app import CHAT_RESPONSES, KURALS_DATABASE
+from content_registry import ContentRegistry
+from conversation_context import ContextStore
+from emotions import EMOTION_KEYWORDS, emotion_distribution, get_emotion_from_text
+from feedback_analytics import FeedbackAnalytics
+from feedback_store import JSONLFeedbackStore, SQLiteFeedbackStore, WriteBehindWriter
+from kural_corpus import DictCorpus, MappedCorpus, write_corpus
+from kural_index import KuralIndex
+from kural_retrieval import KuralRetriever
+from message_cache import MessageCache
+from metrics import MetricsRegistry
+from pagination import DEFAULT_PAGE_SIZE, in_time_range
+from quiz_analytics import QuizAnalytics, column_analytics, rollup_columns, split_rollup_counts
+from personality import PersonalityScorer
+from quiz_store import ANSWER_LETTERS, PERSONALITY_TYPES, QUESTION_IDS, InMemoryQuizStore, SQLiteQuizStore
+from rate_limit import SQLiteTokenBucketLimiter, TokenBucketLimiter
+from rollups import GRANULARITIES, TimeRollup, iso_time, wall_clock
+from structured_logging import configure_logging
+
+# Events generated and folded into the rollups per step of `rollups`
+ROLLUP_CHUNK = 1_000_000
+
+FILLER_WORDS = [
+    "today", "work", "family", "friend", "morning", "think", "really", "about",
+    "something", "lately", "everything", "feel", "just", "what", "when", "going",
+]
+
+
+def legacy_get_emotion_from_text(text):
+    """Original per-call dict rebuild and nested substring scan"""
+    text_lower = text.lower()
+
+    emotion_keywords = {
+        "joy": ["happy", "joy", "cheerful", "excited", "celebrate", "smile", "laugh"],
+        "sadness": ["sad", "depressed", "down", "blue", "cry", "tears", "grief", "mourn"],
+        "anger": ["angry", "mad", "furious", "rage", "irritated", "annoyed", "frustrated"],
+        "fear": ["afraid", "scared", "fear", "anxious", "worried", "nervous", "panic"],
+        "love": ["love", "adore", "cherish", "romance", "affection", "care", "devotion"],
+        "forgiveness": ["forgive", "forgiveness", "pardon", "excuse", "apologize", "sorry"],
+        "strength": ["strong", "power", "courage", "brave", "mighty", "resilient", "tough"],
+        "peace": ["peace", "calm", "serene", "tranquil", "quiet", "still", "harmony"],
+        "gratitude": ["grateful", "thankful", "appreciate", "blessed", "gratitude", "thanks"],
+        "hope": ["hope", "hopeful", "optimistic", "positive", "future", "dream", "aspire"]
+    }
+
+    for emotion, keywords in emotion_keywords.items():
+        if any(keyword in text_lower for keyword in keywords):
+            return emotion
+
+    return "general"
+
+
+def make_message(length, rng):
+    """Build a message of roughly `length` characters with a keyword near the end"""
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(FILLER_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    keyword = rng.choice(rng.choice(list(EMOTION_KEYWORDS.values())))
+    words[-1] = keyword
+    return " ".join(words)
+
+
+def time_call(func, args, repeat):
+    """Return mean seconds per call of func(*args)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) / repeat
+
+
+# Labelled messages for emotion accuracy, including negation, intensity and mixed feelings
+EMOTION_FIXTURES = (
+    ("I am so happy today", "joy"),
+    ("We are celebrating my sister's wedding and I can't stop smiling", "joy"),
+    ("I feel sad and lonely", "sadness"),
+    ("I've been crying all night", "sadness"),
+    ("My grandfather passed away and the grief is heavy", "sadness"),
+    ("I'm really angry at my manager", "anger"),
+    ("The traffic made me furious", "anger"),
+    ("I'm scared of the exam results", "fear"),
+    ("Feeling anxious and nervous about the interview", "fear"),
+    ("I love my family", "love"),
+    ("I deeply cherish the time with my wife", "love"),
+    ("Please forgive me, I am sorry", "forgiveness"),
+    ("I want to apologize to my friend", "forgiveness"),
+    ("I need courage to face this", "strength"),
+    ("I want to be brave and resilient", "strength"),
+    ("I just want some peace and quiet", "peace"),
+    ("Sitting by the lake I feel calm and serene", "peace"),
+    ("I'm grateful for my friends", "gratitude"),
+    ("Thank you, I truly appreciate it", "gratitude"),
+    ("I'm hopeful about the future", "hope"),
+    ("I dream of becoming a doctor", "hope"),
+    ("not angry, just sad", "sadness"),
+    ("I'm not happy, I'm furious", "anger"),
+    ("I don't feel afraid anymore, I feel calm", "peace"),
+    ("I'm not scared, I'm excited", "joy"),
+    ("I was never so happy in my life", "joy"),
+    ("It's not that I don't love him, I'm just worried", "fear"),
+    ("No worries, I'm grateful for everything", "gratitude"),
+    ("a little sad but very grateful", "gratitude"),
+    ("slightly annoyed but extremely thankful", "gratitude"),
+    ("I'm careful with my money", "general"),
+    ("The sky is blue and I am so happy", "joy"),
+    ("I am down to earth and really optimistic", "hope"),
+    ("My boss is mad, and I am terrified", "fear"),
+    ("I'm heartbroken after the breakup", "sadness"),
+    ("I hate how everything went", "anger"),
+    ("What should I do with my life", "general"),
+    ("Tell me a Kural", "general"),
+    ("I am still thankful for the lesson", "gratitude"),
+    ("Even without hope, I stay strong", "strength"),
+    ("I can't stop crying", "sadness"),
+    ("I can't stop worrying about my son", "fear"),
+    ("She couldn't help smiling at the news", "joy"),
+    ("I can't stop myself from crying", "sadness"),
+    ("I just can't quit worrying", "fear"),
+    ("I won't stop, I'm determined", "strength"),
+)
+
+
+def keyword_count_emotion(text, _table={}):
+    """The previous classifier: unweighted keyword counts, no negation or intensity"""
+    if not _table:
+        for suffix in ("", "s", "es", "d", "ed", "ing", "ness", "ly"):
+            for emotion, keywords in EMOTION_KEYWORDS.items():
+                for keyword in keywords:
+                    _table.setdefault(keyword + suffix, emotion)
+    words = text.lower().translate(str.maketrans(string.punctuation, " " * len(string.punctuation))).split()
+    scores = {}
+    for word in _table.keys() & words:
+        scores[_table[word]] = scores.get(_table[word], 0) + words.count(word)
+    if not scores:
+        return "general"
+    order = list(EMOTION_KEYWORDS)
+    return min(scores, key=lambda emotion: (-scores[emotion], order.index(emotion)))
+
+
+def bench_emotions(args):
+    """Accuracy on EMOTION_FIXTURES and latency by message length for each classifier"""
+    rng = random.Random(args.seed)
+    classifiers = (
+        ('substring', legacy_get_emotion_from_text),
+        ('keyword count', keyword_count_emotion),
+        ('weighted', get_emotion_from_text),
+    )
+
+    print(f"{'classifier':<14} {'accuracy':>9}")
+    for name, classify in classifiers:
+        correct = sum(classify(text) == label for text, label in EMOTION_FIXTURES)
+        print(f"{name:<14} {correct / len(EMOTION_FIXTURES):>9.1%}")
+
+    # Every distribution covers every emotion, with non-negative shares that sum to 1
+    texts = [text for text, _ in EMOTION_FIXTURES] + [make_message(rng.choice((10, 100)), rng) for _ in range(1000)]
+    for text in texts:
+        distribution = emotion_distribution(text)
+        if (set(distribution) != set(EMOTION_KEYWORDS) | {'general'} or min(distribution.values()) < 0
+                or abs(sum(distribution.values()) - 1) > 1e-9):
+            raise SystemExit(f"emotion_distribution({text!r}) is not a distribution: {distribution}")
+    print(f"{len(texts)} emotion distributions sum to 1")
+
+    print()
+    print(f"{'chars':>8}" + "".join(f" {name + ' us':>16}" for name, _ in classifiers))
+    for length in (10, 100, 1_000, 10_000):
+        messages = [make_message(length, rng) for _ in range(50)]
+        repeat = max(1, args.iterations // length)
+        timings = [
+            sum(time_call(classify, (m,), repeat) for m in messages) / len(messages)
+            for _, classify in classifiers
+        ]
+        print(f"{length:>8}" + "".join(f" {timing * 1e6:>16.2f}" for timing in timings))
+
+
+def make_quiz_response(rng):
+    """Build a synthetic quiz submission shaped like /api/quiz/submit records"""
+    answers = {str(q): rng.choice('ABCD') for q in range(1, 16)}
+    return {
+        'session_id': str(uuid.uuid4()),
+        'answers': answers,
+        'timestamp': datetime.now().isoformat(),
+        'total_questions': len(answers)
+    }
+
+
+def bench_quiz_store(args):
+    """Measure session lookup latency for each quiz store backend"""
+    rng = random.Random(args.seed)
+    print(f"{'sessions':>10} {'backend':>8} {'lookup us':>10}")
+    for size in args.sizes:
+        responses = [make_quiz_response(rng) for _ in range(size)]
+        probes = [rng.choice(responses)['session_id'] for _ in range(1_000)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            stores = {
+                'memory': InMemoryQuizStore(),
+                'sqlite': SQLiteQuizStore(os.path.join(directory, 'quiz.db')),
+            }
+            for name, store in stores.items():
+                store.add_many(responses)
+                start = time.perf_counter()
+                for session_id in probes:
+                    store.get(session_id)
+                elapsed = (time.perf_counter() - start) / len(probes)
+                print(f"{size:>10} {name:>8} {elapsed * 1e6:>10.2f}")
+
+
+def legacy_quiz_analytics(quiz_responses):
+    """Original full recomputation done by /api/quiz/analytics on every call"""
+    answer_counts = {}
+    personality_counts = {}
+
+    for response in quiz_responses:
+        answers = response['answers']
+        for question_id, answer in answers.items():
+            key = f"Q{question_id}_{answer}"
+            answer_counts[key] = answer_counts.get(key, 0) + 1
+
+        wisdom_count = sum(1 for q, a in answers.items() if a in ['A'] and int(q) in [1, 2, 3, 4, 5])
+        compassion_count = sum(1 for q, a in answers.items() if a in ['B'] and int(q) in [1, 2, 3, 4, 5])
+        strength_count = sum(1 for q, a in answers.items() if a in ['C'] and int(q) in [1, 2, 3, 4, 5])
+        harmony_count = sum(1 for q, a in answers.items() if a in ['D'] and int(q) in [1, 2, 3, 4, 5])
+
+        if wisdom_count >= max(compassion_count, strength_count, harmony_count):
+            personality_type = 'The Wise Seeker'
+        elif compassion_count >= max(wisdom_count, strength_count, harmony_count):
+            personality_type = 'The Compassionate Heart'
+        elif strength_count >= max(wisdom_count, compassion_count, harmony_count):
+            personality_type = 'The Strong Leader'
+        else:
+            personality_type = 'The Peaceful Soul'
+
+        personality_counts[personality_type] = personality_counts.get(personality_type, 0) + 1
+
+    return {
+        'total_responses': len(quiz_responses),
+        'answer_frequencies': answer_counts,
+        'personality_distribution': personality_counts
+    }
+
+
+def bench_quiz_analytics(args):
+    """Check incremental quiz analytics against a full recomputation and time both"""
+    rng = random.Random(args.seed)
+    responses = [make_quiz_response(rng) for _ in range(args.size)]
+
+    analytics = QuizAnalytics()
+    start = time.perf_counter()
+    for response in responses:
+        analytics.record(response['answers'])
+    record_time = (time.perf_counter() - start) / len(responses)
+
+    start = time.perf_counter()
+    expected = legacy_quiz_analytics(responses)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    snapshot = analytics.snapshot()
+    snapshot_time = time.perf_counter() - start
+
+    # The legacy scan typed personalities by a simplified count; typing is checked by `personality`
+    expected['personality_distribution'] = dict(collections.Counter(
+        analyze_personality_reference(response['answers']) for response in responses
+    ))
+    if snapshot != expected:
+        raise SystemExit("Incremental quiz analytics differ from a full recomputation")
+
+    # Two workers sharing an SQLite store, each with its own connection and analytics,
+    # submitting alternately: both must report the totals of every stored response
+    shared = responses[:20_000]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'quiz.db')
+        workers = [(SQLiteQuizStore(path), QuizAnalytics()) for _ in range(2)]
+        for store, worker_analytics in workers:
+            worker_analytics.refresh_from(store)
+        for index, response in enumerate(shared):
+            workers[index % 2][0].add(response)
+        start = time.perf_counter()
+        for store, worker_analytics in workers:
+            worker_analytics.refresh_from(store)
+        catch_up_time = time.perf_counter() - start
+        reference = QuizAnalytics()
+        reference.rebuild(shared)
+        if any(worker_analytics.snapshot() != reference.snapshot() for _, worker_analytics in workers):
+            raise SystemExit("Workers sharing an SQLite quiz store report different analytics")
+        idle_time = time_call(workers[0][1].refresh_from, (workers[0][0],), 1_000)
+
+        # A rescore in one worker re-types responses under every worker's analytics
+        store, worker_analytics = workers[0]
+        store.rescore(PersonalityScorer({}, {'A': {'harmony': 1}}))
+        worker_analytics.rebuild_from(store)
+        workers[1][1].refresh_from(workers[1][0])
+        if workers[1][1].snapshot() != worker_analytics.snapshot() or \
+                worker_analytics.snapshot() == reference.snapshot():
+            raise SystemExit("A rescore in one worker left another worker's quiz analytics stale")
+
+    print(f"responses:            {args.size}")
+    print(f"record per submit:    {record_time * 1e6:.2f} us")
+    print(f"legacy full scan:     {legacy_time * 1e3:.2f} ms")
+    print(f"incremental snapshot: {snapshot_time * 1e6:.2f} us")
+    print("incremental totals match full recomputation")
+    print(f"shared store refresh: {catch_up_time * 1e3 / 2:.2f} ms per worker for {len(shared)} responses, "
+          f"{idle_time * 1e6:.2f} us when unchanged")
+    print("workers sharing an SQLite store report the same analytics")
+
+
+def analyze_personality_reference(answers):
+    """Line-by-line port of analyzePersonality in project/src/utils/quizLogic.js"""
+    wisdom = compassion = strength = harmony = 0
+    for question_id, answer in answers.items():
+        question = int(question_id) if str(question_id).isdigit() else None
+        if question == 1:
+            wisdom += 2 * (answer == 'A')
+            compassion += 2 * (answer == 'B')
+            harmony += answer == 'D'
+        elif question == 2:
+            wisdom += 2 * (answer == 'A')
+            compassion += answer == 'B'
+        elif question == 3:
+            wisdom += 2 * (answer == 'A')
+            compassion += 2 * (answer == 'D')
+        elif question == 4:
+            compassion += 2 * (answer == 'A')
+            wisdom += answer == 'B'
+        elif question == 5:
+            strength += 2 * (answer == 'A')
+            harmony += 2 * (answer == 'B')
+        else:
+            wisdom += answer == 'A'
+            compassion += answer == 'B'
+            strength += answer == 'C'
+            harmony += answer == 'D'
+
+    max_score = max(wisdom, compassion, strength, harmony)
+    if wisdom == max_score:
+        return 'The Wise Seeker'
+    elif compassion == max_score:
+        return 'The Compassionate Heart'
+    elif strength == max_score:
+        return 'The Strong Leader'
+    return 'The Peaceful Soul'
+
+
+def make_quiz_answers(rng):
+    """Answers that stray from the quiz too: skipped questions, unknown ids and letters"""
+    question_ids = rng.sample([str(question) for question in range(1, 18)], rng.randint(0, 15))
+    return {question_id: rng.choice('ABCDE') for question_id in question_ids}
+
+
+def bench_personality(args):
+    """Check the weight-table scorer against quizLogic.js and time single, bulk and store re-scoring"""
+    rng = random.Random(args.seed)
+    scorer = PersonalityScorer()
+
+    checks = [make_quiz_answers(rng) for _ in range(args.checks)] + [make_quiz_response(rng)['answers']
+                                                                      for _ in range(args.checks)]
+    mismatches = sum(scorer.classify(answers) != analyze_personality_reference(answers) for answers in checks)
+    if mismatches:
+        raise SystemExit(f"{mismatches} of {len(checks)} answer sets typed differently from analyzePersonality")
+
+    single = time_call(scorer.classify, (checks[-1],), args.iterations)
+    reference = time_call(analyze_personality_reference, (checks[-1],), args.iterations)
+
+    responses = [make_quiz_response(rng) for _ in range(args.sessions)]
+    store = InMemoryQuizStore(max_responses=0)
+    store.add_many(responses)
+    answers, _, _, _ = store.columns()
+    start = time.perf_counter()
+    types = scorer.classify_columns(answers)
+    bulk = time.perf_counter() - start
+    sample = rng.sample(range(args.sessions), min(args.sessions, 10_000))
+    if any(PERSONALITY_TYPES[types[row]] != analyze_personality_reference(responses[row]['answers'])
+           for row in sample):
+        raise SystemExit("Vectorized scoring differs from analyzePersonality")
+
+    start = time.perf_counter()
+    store.rescore(scorer)
+    rescore = time.perf_counter() - start
+    if store.get(responses[0]['session_id'])['personality_type'] != \
+            analyze_personality_reference(responses[0]['answers']):
+        raise SystemExit("store.rescore typed a response differently from analyzePersonality")
+
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite_store = SQLiteQuizStore(os.path.join(directory, 'quiz.db'))
+        sqlite_store.add_many(responses)
+        start = time.perf_counter()
+        sqlite_store.rescore(scorer)
+        sqlite_rescore = time.perf_counter() - start
+        if any(sqlite_store.get(responses[row]['session_id'])['personality_type'] !=
+               analyze_personality_reference(responses[row]['answers']) for row in sample[:1000]):
+            raise SystemExit("SQLite store.rescore typed a response differently from analyzePersonality")
+
+    print(f"{len(checks)} answer sets typed exactly as analyzePersonality")
+    print(f"reference port:        {1 / reference:>12.0f} sessions/sec")
+    print(f"scorer.classify:       {1 / single:>12.0f} sessions/sec")
+    print(f"classify_columns:      {args.sessions / bulk:>12.0f} sessions/sec ({args.sessions} sessions)")
+    print(f"store.rescore:         {args.sessions / rescore:>12.0f} sessions/sec ({rescore * 1e3:.0f} ms)")
+    print(f"sqlite store.rescore:  {args.sessions / sqlite_rescore:>12.0f} sessions/sec "
+          f"({sqlite_rescore * 1e3:.0f} ms)")
+
+
+class DictQuizStore:
+    """The previous in-memory store: response dicts kept in a dict keyed by session ID"""
+
+    def __init__(self):
+        self._responses = {}
+        # Session IDs in submission order, so cursors are stable list positions
+        self._order = []
+        self._lock = threading.Lock()
+
+    def add(self, response):
+        self.add_many([response])
+
+    def add_many(self, responses):
+        with self._lock:
+            for response in responses:
+                session_id = response['session_id']
+                if session_id not in self._responses:
+                    self._order.append(session_id)
+                self._responses[session_id] = response
+
+    def get(self, session_id):
+        return self._responses.get(session_id)
+
+    def page(self, cursor=0, limit=DEFAULT_PAGE_SIZE, since=None, until=None):
+        """Return (responses, next_cursor) starting at list position `cursor`"""
+        page = []
+        position = cursor
+        end = len(self._order)
+        while position < end and len(page) < limit:
+            response = self._responses[self._order[position]]
+            position += 1
+            if in_time_range(response, since, until):
+                page.append(response)
+        next_cursor = str(position) if position < end else None
+        return page, next_cursor
+
+    def all(self):
+        return list(self._responses.values())
+
+    def count(self):
+        return len(self._responses)
+
+
+def bench_quiz_memory(args):
+    """Bytes per session for dict vs columnar quiz storage, and analytics rebuild time"""
+    rng = random.Random(args.seed)
+    print(f"{'sessions':>10} {'store':>9} {'bytes/session':>14} {'rebuild ms':>11}")
+    for size in args.sizes:
+        for name, store_class in (('dict', DictQuizStore), ('columnar', InMemoryQuizStore)):
+            # The dict store needs ~1.5 KB per session; measure it on a prefix of large runs
+            sessions = min(size, args.dict_max) if store_class is DictQuizStore else size
+            tracemalloc.start()
+            store = store_class()
+            store.add_many(make_quiz_response(rng) for _ in range(sessions))
+            used = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            analytics = QuizAnalytics()
+            start = time.perf_counter()
+            analytics.rebuild_from(store)
+            rebuild = time.perf_counter() - start
+            if analytics.snapshot()['total_responses'] != sessions:
+                raise SystemExit(f"{name} store rebuilt {analytics.snapshot()['total_responses']} of {sessions} sessions")
+            print(f"{sessions:>10} {name:>9} {used / sessions:>14.1f} {rebuild * 1e3:>11.1f}")
+            del store
+
+
+def make_feedback_record(rng, kurals):
+    """Build a synthetic feedback record shaped like /api/feedback/submit records"""
+    return {
+        'feedback_id': str(uuid.uuid4()),
+        'user_message': 'I feel sad today',
+        'bot_response': 'Here is some wisdom.',
+        'kural': rng.choice(kurals),
+        'feedback': rng.choice(('positive', 'positive', 'negative')),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def legacy_feedback_analytics(feedback_responses):
+    """Original three-pass scan and full sort done by /api/feedback/analytics"""
+    total_feedback = len(feedback_responses)
+    positive_count = sum(1 for f in feedback_responses if f['feedback'] == 'positive')
+    negative_count = sum(1 for f in feedback_responses if f['feedback'] == 'negative')
+
+    kural_feedback = {}
+    for feedback in feedback_responses:
+        if feedback['kural'] and 'tamil' in feedback['kural']:
+            kural_text = feedback['kural']['tamil']
+            if kural_text not in kural_feedback:
+                kural_feedback[kural_text] = {'positive': 0, 'negative': 0}
+            kural_feedback[kural_text][feedback['feedback']] += 1
+
+    most_helpful = sorted(
+        kural_feedback.items(),
+        key=lambda x: x[1]['positive'] - x[1]['negative'],
+        reverse=True
+    )[:5]
+
+    return {
+        'total_feedback': total_feedback,
+        'positive_feedback': positive_count,
+        'negative_feedback': negative_count,
+        'feedback_rate': round((positive_count / total_feedback) * 100, 2) if total_feedback > 0 else 0,
+        'most_helpful_kurals': most_helpful
+    }
+
+
+def bench_feedback_analytics(args):
+    """Check incremental feedback analytics against the original scan and time both"""
+    rng = random.Random(args.seed)
+    kurals = [kural for kurals in KURALS_DATABASE.values() for kural in kurals]
+    records = [make_feedback_record(rng, kurals) for _ in range(args.size)]
+
+    kural_index = backend.content_registry.current.kural_index
+    analytics = FeedbackAnalytics()
+    start = time.perf_counter()
+    for record in records:
+        analytics.record(kural_index.number_of(record['kural']), record['feedback'])
+    record_time = (time.perf_counter() - start) / len(records)
+
+    start = time.perf_counter()
+    expected = legacy_feedback_analytics(records)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    snapshot = analytics.snapshot(5)
+    first_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analytics.snapshot(5)
+    cached_time = time.perf_counter() - start
+
+    # The original scan keys Kurals by Tamil text, as the endpoint still reports them
+    snapshot['most_helpful_kurals'] = backend.kural_labels(snapshot['most_helpful_kurals'], kural_index)
+    if snapshot != expected:
+        raise SystemExit("Incremental feedback analytics differ from the original scan")
+
+    # Two workers writing behind to one store file, each refreshing its own analytics from it:
+    # both must count every record, whichever worker took it
+    shared = records[:20_000]
+    refresh_times = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for store_name, store_class, filename in (
+            ('sqlite', SQLiteFeedbackStore, 'feedback.db'),
+            ('jsonl', JSONLFeedbackStore, 'feedback.jsonl'),
+        ):
+            path = os.path.join(directory, filename)
+            workers = [(store_class(path), FeedbackAnalytics()) for _ in range(2)]
+            writers = [WriteBehindWriter(store) for store, _ in workers]
+            for index, record in enumerate(shared):
+                writers[index % 2].submit(record)
+            for writer in writers:
+                writer.close()
+            start = time.perf_counter()
+            for store, worker_analytics in workers:
+                worker_analytics.refresh_from(store, kural_index.number_of)
+            refresh_times[store_name] = (time.perf_counter() - start) / 2
+            snapshots = [worker_analytics.snapshot(5) for _, worker_analytics in workers]
+            positive = sum(record['feedback'] == 'positive' for record in shared)
+            if snapshots[0] != snapshots[1] or \
+                    (snapshots[0]['positive_feedback'], snapshots[0]['total_feedback']) != (positive, len(shared)):
+                raise SystemExit(f"Workers sharing a {store_name} feedback store report different analytics")
+
+    print(f"feedback records:       {args.size}")
+    print(f"record per submit:      {record_time * 1e6:.2f} us")
+    print(f"legacy scan + sort:     {legacy_time * 1e3:.2f} ms")
+    print(f"incremental top-5:      {first_time * 1e6:.2f} us")
+    print(f"incremental top-5 again: {cached_time * 1e6:.2f} us")
+    print("incremental totals match the original scan")
+    for store_name, refresh_time in refresh_times.items():
+        print(f"{store_name} shared refresh:  {refresh_time * 1e3:.2f} ms per worker for {len(shared)} records")
+    print("workers sharing a feedback store report the same analytics")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (Linux reports KB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def stream_ndjson(client, path):
+    """Read a listing as NDJSON chunk by chunk; returns (lines, bytes)"""
+    response = client.get(f'{path}?format=ndjson', buffered=False)
+    lines = 0
+    size = 0
+    for chunk in response.response:
+        lines += chunk.count(b'\n') if isinstance(chunk, bytes) else chunk.count('\n')
+        size += len(chunk)
+    response.close()
+    return lines, size
+
+
+def bench_stream(args):
+    """Stream the full feedback and quiz datasets as NDJSON and report the memory the export takes"""
+    rng = random.Random(args.seed)
+    kurals = [kural for kurals in KURALS_DATABASE.values() for kural in kurals]
+    # Every seeded record must come back, so lift the FEEDBACK_MAX_RECORDS cap on the in-memory list
+    backend.feedback_responses.max_records = None
+    backend.feedback_responses.extend(make_feedback_record(rng, kurals) for _ in range(args.size))
+    backend.quiz_store.add_many(make_quiz_response(rng) for _ in range(args.size))
+    client = backend.app.test_client()
+
+    for path in ('/api/feedback/responses', '/api/quiz/responses'):
+        start = time.perf_counter()
+        lines, size = stream_ndjson(client, path)
+        elapsed = time.perf_counter() - start
+        if lines != args.size:
+            raise SystemExit(f"{path}: streamed {lines} records, expected {args.size}")
+
+        # Peak allocations above what was live before, on a second untimed pass (tracing is slow)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        stream_ndjson(client, path)
+        peak = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        print(f"{path}: {lines} records, {size / 1e6:.1f} MB in {elapsed:.2f} s, "
+              f"peak memory while streaming {peak / 1e6:.2f} MB")
+
+
+def register_legacy_kural_routes(flask_app):
+    """Mount the original jsonify-per-request handlers next to the cached ones"""
+    from flask import jsonify
+
+    def legacy_emotions():
+        return jsonify({'emotions': list(KURALS_DATABASE.keys())})
+
+    def legacy_kurals(emotion):
+        if emotion in KURALS_DATABASE:
+            return jsonify({'emotion': emotion, 'kurals': KURALS_DATABASE[emotion]})
+        return jsonify({'error': 'Emotion not found'}), 404
+
+    flask_app.add_url_rule('/bench/legacy/emotions', 'legacy_emotions', legacy_emotions)
+    flask_app.add_url_rule('/bench/legacy/kurals/<emotion>', 'legacy_kurals', legacy_kurals)
+
+
+def requests_per_second(client, path, count, headers=None):
+    """Issue `count` GETs through the test client and return requests/sec"""
+    start = time.perf_counter()
+    for _ in range(count):
+        client.get(path, headers=headers)
+    return count / (time.perf_counter() - start)
+
+
+def bench_kural_endpoints(args):
+    """Requests/sec for the read-only Kural endpoints before and after payload caching"""
+    register_legacy_kural_routes(backend.app)
+    client = backend.app.test_client()
+
+    print(f"{'endpoint':<22} {'legacy rps':>11} {'cached rps':>11} {'304 rps':>11}")
+    for name, path, legacy_path in (
+        ('/api/emotions', '/api/emotions', '/bench/legacy/emotions'),
+        ('/api/kurals/<emotion>', '/api/kurals/sadness', '/bench/legacy/kurals/sadness'),
+    ):
+        etag = client.get(path).headers['ETag']
+        legacy = requests_per_second(client, legacy_path, args.requests)
+        cached = requests_per_second(client, path, args.requests)
+        not_modified = requests_per_second(client, path, args.requests, {'If-None-Match': etag})
+        print(f"{name:<22} {legacy:>11.0f} {cached:>11.0f} {not_modified:>11.0f}")
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def make_synthetic_database(size, rng):
+    """A KURALS_DATABASE-shaped corpus of `size` Kurals mixing words from the samples"""
+    samples = [kural for kurals in KURALS_DATABASE.values() for kural in kurals]
+    words = {field: [word for kural in samples for word in kural[field].split()]
+             for field in ('tamil', 'english', 'relevance')}
+    database = {}
+    emotions = list(KURALS_DATABASE)
+    for position in range(size):
+        kural = {field: " ".join(rng.sample(pool, 6)) for field, pool in words.items()}
+        kural['category'] = samples[position % len(samples)]['category']
+        database.setdefault(emotions[position % len(emotions)], []).append(kural)
+    return database, words
+
+
+def bench_search(args):
+    """Query latency percentiles for BM25 search over a full-size corpus"""
+    rng = random.Random(args.seed)
+    database, words = make_synthetic_database(1330, rng)
+    corpus_path = os.environ.get('KURAL_CORPUS_PATH')
+    corpus = MappedCorpus(corpus_path) if corpus_path else DictCorpus(database)
+
+    start = time.perf_counter()
+    index = KuralIndex(corpus)
+    build_time = time.perf_counter() - start
+
+    vocabulary = words['english'] + words['tamil']
+    queries = [" ".join(rng.sample(vocabulary, rng.randint(1, 3))) for _ in range(args.queries)]
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, 10)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    print(f"corpus size:   {len(index)} Kurals ({corpus_path or 'synthetic'})")
+    print(f"index build:   {build_time * 1e3:.1f} ms")
+    for label, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0)):
+        print(f"{label} latency:   {percentile(latencies, fraction) * 1e6:.1f} us")
+
+
+def bench_retrieval(args):
+    """Messages/sec for TF-IDF retrieval, one message at a time vs batched"""
+    rng = random.Random(args.seed)
+    database, words = make_synthetic_database(1330, rng)
+    corpus = DictCorpus(database)
+
+    start = time.perf_counter()
+    retriever = KuralRetriever(corpus)
+    build_time = time.perf_counter() - start
+
+    messages = [
+        "I feel " + " ".join(rng.sample(words['english'], rng.randint(2, 8)))
+        for _ in range(args.messages)
+    ]
+
+    start = time.perf_counter()
+    single_results = [retriever.search(message, 5) for message in messages]
+    single = len(messages) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batch_results = []
+    for offset in range(0, len(messages), args.batch_size):
+        batch_results.extend(retriever.search_batch(messages[offset:offset + args.batch_size], 5))
+    batched = len(messages) / (time.perf_counter() - start)
+
+    # Both paths must score alike (float32 vs float64 sums, so ties may swap places)
+    for message, one, many in zip(messages, single_results, batch_results):
+        if not np.allclose([score for _, score in one], [score for _, score in many], atol=1e-5):
+            raise SystemExit(f"search_batch scores differ from search for {message!r}: {many} vs {one}")
+
+    print(f"corpus size:    {len(corpus)} Kurals, matrix {retriever.matrix.nbytes / 1e6:.1f} MB")
+    print(f"matrix build:   {build_time * 1e3:.1f} ms")
+    print(f"single:         {single:.0f} messages/sec")
+    print(f"batch of {args.batch_size:<5} {batched:.0f} messages/sec ({batched / single:.1f}x)")
+    if args.batch_size >= 64 and batched <= single:
+        raise SystemExit("batched retrieval is no faster than one search() per message")
+
+
+def bench_chat_batch(args):
+    """Messages/sec for N individual /api/chat calls vs one /api/chat/batch call"""
+    rng = random.Random(args.seed)
+    messages = [make_message(rng.choice((20, 60, 200)), rng) for _ in range(args.messages)]
+    client = backend.app.test_client()
+    original_cache = backend.chat_cache
+
+    # Every phase starts from an empty chat cache so none of them reuses another's ranking
+    backend.chat_cache = MessageCache()
+    start = time.perf_counter()
+    for message in messages:
+        client.post('/api/chat', json={'message': message, 'history': []})
+    individual = len(messages) / (time.perf_counter() - start)
+
+    backend.chat_cache = MessageCache()
+    start = time.perf_counter()
+    for offset in range(0, len(messages), backend.MAX_CHAT_BATCH):
+        batch = messages[offset:offset + backend.MAX_CHAT_BATCH]
+        response = client.post('/api/chat/batch', json={'messages': batch})
+        if response.json['count'] != len(batch):
+            raise SystemExit(f"/api/chat/batch answered {response.json['count']} of {len(batch)} messages")
+    batched = len(messages) / (time.perf_counter() - start)
+
+    print(f"individual /api/chat: {individual:.0f} messages/sec")
+    print(f"/api/chat/batch:      {batched:.0f} messages/sec ({batched / individual:.1f}x)")
+
+    # Without HTTP: get_chat_responses against a get_chat_response loop, by batch size
+    print(f"{'batch size':>10} {'loop msg/s':>11} {'batch msg/s':>12}")
+    for size in (1, 4, 16, 256, backend.MAX_CHAT_BATCH):
+        rates = []
+        for answer in (lambda batch: [backend.get_chat_response(message) for message in batch],
+                       backend.get_chat_responses):
+            backend.chat_cache = MessageCache()
+            start = time.perf_counter()
+            for offset in range(0, len(messages), size):
+                answer(messages[offset:offset + size])
+            rates.append(len(messages) / (time.perf_counter() - start))
+        print(f"{size:>10} {rates[0]:>11.0f} {rates[1]:>12.0f}")
+        if size >= 256 and rates[1] <= rates[0]:
+            raise SystemExit(f"get_chat_responses is no faster than a loop at batch size {size}")
+    backend.chat_cache = original_cache
+
+
+def bench_quiz_submit(args):
+    """Quiz submit latency with many stored responses: print()-ing the store vs queued logging"""
+    rng = random.Random(args.seed)
+    backend.quiz_store.add_many(make_quiz_response(rng) for _ in range(args.stored))
+    client = backend.app.test_client()
+    answers = make_quiz_response(rng)['answers']
+
+    def legacy_submit():
+        # What submit_quiz used to do on every call: two synchronous prints, one of the whole store
+        response = client.post('/api/quiz/submit', json={'answers': answers})
+        print(f"Quiz submitted: {response.json['session_id']}")
+        print(backend.quiz_store.all())
+
+    with open(os.devnull, 'w') as devnull:
+        with contextlib.redirect_stdout(devnull):
+            legacy = time_call(legacy_submit, (), args.submits)
+
+        # INFO request logs on, written by the background thread to /dev/null
+        configure_logging('INFO', devnull)
+        current = time_call(lambda: client.post('/api/quiz/submit', json={'answers': answers}), (), args.submits)
+        configure_logging('WARNING')
+
+    print(f"stored responses:     {args.stored}")
+    print(f"print() per submit:   {legacy * 1e3:.2f} ms")
+    print(f"queued JSON logging:  {current * 1e3:.3f} ms")
+
+
+def bench_metrics(args):
+    """Per-request cost of the metrics hooks, and recording throughput across threads"""
+    client = backend.app.test_client()
+    hooks = (backend.start_request_timer, backend.record_request_metrics)
+    before = backend.app.before_request_funcs[None]
+    after = backend.app.after_request_funcs[None]
+
+    for hook_list, hook in ((before, hooks[0]), (after, hooks[1])):
+        hook_list.remove(hook)
+    bare = time_call(client.get, ('/api/health',), args.requests)
+    before.append(hooks[0])
+    after.append(hooks[1])
+    instrumented = time_call(client.get, ('/api/health',), args.requests)
+
+    registry = MetricsRegistry()
+    labels = (('endpoint', '/api/chat'), ('method', 'POST'))
+    per_thread = args.requests * 5
+
+    def record():
+        for _ in range(per_thread):
+            registry.inc('thirukkural_http_requests_total', labels + (('status', '200'),))
+            registry.observe('thirukkural_http_request_duration_seconds', labels, 0.003)
+
+    threads = [threading.Thread(target=record) for _ in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    render = time_call(registry.render, (), 100)
+    exposition = registry.render()
+    expected = f"thirukkural_http_request_duration_seconds_count{{endpoint=\"/api/chat\",method=\"POST\"}} {per_thread * args.threads}"
+    if expected not in exposition:
+        raise SystemExit("Metrics recorded across threads are missing from the exposition")
+    # The recording threads have exited, so their shards must be folded away with the counts kept
+    if registry.shard_count():
+        raise SystemExit(f"{registry.shard_count()} shards kept after their threads exited")
+
+    print(f"/api/health without hooks: {bare * 1e6:.1f} us/request")
+    print(f"/api/health with hooks:    {instrumented * 1e6:.1f} us/request ({(instrumented - bare) * 1e6:+.1f} us)")
+    print(f"recording, {args.threads} threads:    {per_thread * args.threads / elapsed:.0f} requests/sec")
+    print(f"render /api/metrics:       {render * 1e3:.2f} ms")
+
+
+class SynchronousFeedbackWriter:
+    """One write per submission inside the request, the baseline for write-behind"""
+
+    def __init__(self, store):
+        self.store = store
+        # The stores hold one handle for one writer, so requests take turns with it
+        self._lock = threading.Lock()
+
+    def submit(self, record):
+        with self._lock:
+            self.store.write_batch([record])
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SlowDiskStore:
+    """A feedback store whose every write also waits `latency` seconds, as an fsync on a slow disk does"""
+
+    def __init__(self, store, latency):
+        self.store = store
+        self.latency = latency
+
+    def write_batch(self, records):
+        # sleep releases the GIL like blocking disk I/O, so other requests keep running meanwhile
+        time.sleep(self.latency)
+        self.store.write_batch(records)
+
+    def load(self):
+        return self.store.load()
+
+
+def bench_feedback_submit(args):
+    """/api/feedback/submit from concurrent clients, writing per request vs writing behind, side by side"""
+    rng = random.Random(args.seed)
+    kurals = [kural for kurals in KURALS_DATABASE.values() for kural in kurals]
+    payloads = [
+        {'userMessage': make_message(60, rng), 'botResponse': 'ok', 'kural': rng.choice(kurals),
+         'feedback': rng.choice(('positive', 'negative'))}
+        for _ in range(args.submissions)
+    ]
+    original_writer = backend.feedback_writer
+
+    def run(writer):
+        """Submit every payload from args.threads clients; returns (submits/sec, sorted latencies, 503s)"""
+        backend.feedback_writer = writer
+        backend.feedback_responses.clear()
+        latencies = [[] for _ in range(args.threads)]
+        rejected = [0] * args.threads
+
+        def client(worker):
+            client = backend.app.test_client()
+            for payload in payloads[worker::args.threads]:
+                request_start = time.perf_counter()
+                response = client.post('/api/feedback/submit', json=payload)
+                latencies[worker].append(time.perf_counter() - request_start)
+                rejected[worker] += response.status_code == 503
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(worker,)) for worker in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Sustained rate includes getting everything onto disk
+        writer.flush()
+        elapsed = time.perf_counter() - start
+        writer.close()
+        return len(payloads) / elapsed, sorted(latency for worker in latencies for latency in worker), sum(rejected)
+
+    print(f"{args.submissions} submissions from {args.threads} clients; 'slow' disks add "
+          f"{args.disk_latency_ms:g} ms to every write")
+    print(f"{'store':<8} {'disk':<5} {'writer':<13} {'submits/sec':>12} {'p50 ms':>7} {'p99 ms':>7} "
+          f"{'rejected':>9} {'stored':>7} {'gain':>6}")
+    gains = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for store_name, make_store in (
+            ('sqlite', lambda: SQLiteFeedbackStore(os.path.join(directory, f'{uuid.uuid4()}.db'))),
+            ('jsonl', lambda: JSONLFeedbackStore(os.path.join(directory, f'{uuid.uuid4()}.jsonl'))),
+        ):
+            for disk, latency in (('local', 0.0), ('slow', args.disk_latency_ms / 1e3)):
+                baseline = None
+                for writer_name, make_writer in (
+                    ('synchronous', SynchronousFeedbackWriter),
+                    ('write-behind', WriteBehindWriter),
+                ):
+                    store = make_store()
+                    rate, latencies, rejected = run(make_writer(SlowDiskStore(store, latency) if latency else store))
+                    stored = len(store.load())
+                    if stored != len(payloads) - rejected:
+                        raise SystemExit(f"{store_name}/{writer_name}: stored {stored} of "
+                                         f"{len(payloads) - rejected} accepted records")
+                    baseline = baseline or rate
+                    gains[store_name, disk] = rate / baseline
+                    print(f"{store_name:<8} {disk:<5} {writer_name:<13} {rate:>12.0f} "
+                          f"{percentile(latencies, 0.5) * 1e3:>7.2f} {percentile(latencies, 0.99) * 1e3:>7.2f} "
+                          f"{rejected:>9} {stored:>7} {rate / baseline:>5.1f}x")
+
+    backend.feedback_writer = original_writer
+    # Writing behind exists so the disk stays out of the request; on a slow disk that must show
+    for store_name in ('sqlite', 'jsonl'):
+        if gains[store_name, 'slow'] <= 1:
+            raise SystemExit(f"{store_name}: writing behind was no faster than writing per request on a slow disk")
+
+
+def bench_chat_sessions(args):
+    """/api/chat cost with server-side sessions vs resending the whole history"""
+    rng = random.Random(args.seed)
+    client = backend.app.test_client()
+
+    # Memory per session, measured on a separate store
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = ContextStore(max_sessions=args.sessions)
+    for _ in range(args.sessions):
+        context, _ = store.get(str(uuid.uuid4()))
+        for _ in range(3):
+            context.emotion_for(make_message(40, rng))
+            context.remember(rng.randrange(len(backend.content_registry.current.kural_index)))
+    per_session = (tracemalloc.get_traced_memory()[0] - before) / args.sessions
+    tracemalloc.stop()
+
+    backend.chat_sessions = ContextStore(max_sessions=args.sessions)
+    session_ids = [str(uuid.uuid4()) for _ in range(args.sessions)]
+    for session_id in session_ids:
+        backend.chat_sessions.get(session_id)
+
+    # A conversation of args.turns exchanges as the frontend used to resend it
+    history = []
+    for turn in range(args.turns):
+        response = client.post('/api/chat', json={'message': make_message(60, rng), 'history': []}).json
+        history.append({'id': turn * 2, 'type': 'user', 'message': make_message(60, rng)})
+        history.append({'id': turn * 2 + 1, 'type': 'bot', 'message': response['response'],
+                        'kural': response['kural'], 'followUp': response['follow_up']})
+
+    messages = [make_message(60, rng) for _ in range(args.requests)]
+    stateless_bytes = len(json.dumps({'message': messages[0], 'history': history}))
+    stateless = time_call(
+        lambda message: client.post('/api/chat', json={'message': message, 'history': history}),
+        (messages[0],), args.requests
+    )
+    session_bytes = len(json.dumps({'message': messages[0], 'session_id': session_ids[0]}))
+    start = time.perf_counter()
+    for message in messages:
+        client.post('/api/chat', json={'message': message, 'session_id': rng.choice(session_ids)})
+    with_sessions = (time.perf_counter() - start) / len(messages)
+    if len(backend.chat_sessions) != args.sessions:
+        raise SystemExit(f"{len(backend.chat_sessions)} sessions held, expected {args.sessions}")
+    held = len(backend.chat_sessions)
+
+    # A token this worker does not hold is refused until the client resends it with history,
+    # as chatApi.js does; from then on the token alone continues the session
+    unknown = str(uuid.uuid4())
+    refused = client.post('/api/chat', json={'message': messages[0], 'session_id': unknown})
+    if refused.status_code != 409 or not refused.json.get('session_unknown'):
+        raise SystemExit(f"Unknown session without history answered {refused.status_code}, expected 409")
+    retried = client.post('/api/chat', json={'message': messages[0], 'session_id': unknown, 'history': history})
+    followed = client.post('/api/chat', json={'message': messages[1], 'session_id': unknown})
+    if (retried.status_code, followed.status_code) != (200, 200) or retried.json['session_id'] != unknown:
+        raise SystemExit("Resending with history did not restore the session")
+
+    print(f"sessions held:            {held} (~{per_session:.0f} bytes each)")
+    print(f"history resend ({args.turns} turns): {stateless * 1e6:.0f} us/request, {stateless_bytes} byte body")
+    print(f"session token:            {with_sessions * 1e6:.0f} us/request, {session_bytes} byte body")
+    print("unknown session token:    409, restored by resending with history")
+
+
+# Suggestion chip texts (project/src/data/emotions.js) and other messages users repeat
+REPEATED_MESSAGES = (
+    'Joy', 'Sadness', 'Anger', 'Fear', 'Forgiveness', 'Strength', 'Peace', 'Heartbreak',
+    'Confusion', 'Gratitude', 'Frustration', 'Hope', 'hi', 'Hello', 'I feel sad',
+    'I am so angry', 'I feel lonely', 'thank you',
+)
+
+
+def bench_chat_cache(args):
+    """get_chat_response with and without the message cache on repeat-heavy traffic"""
+    rng = random.Random(args.seed)
+    messages = [
+        rng.choice(REPEATED_MESSAGES) if rng.random() < args.repeat_share else make_message(60, rng)
+        for _ in range(args.requests)
+    ]
+    original_cache = backend.chat_cache
+
+    print(f"{'cache':<10} {'us/message':>11} {'hit rate':>9}")
+    for name, cache in (('off', MessageCache(max_entries=0)), ('on', MessageCache())):
+        backend.chat_cache = cache
+        start = time.perf_counter()
+        for message in messages:
+            backend.get_chat_response(message)
+        elapsed = (time.perf_counter() - start) / len(messages)
+        print(f"{name:<10} {elapsed * 1e6:>11.1f} {cache.hits / (cache.hits + cache.misses):>9.2%}")
+
+    # A cached message still varies its Kural and template as much as an uncached one
+    for name, cache in (('off', MessageCache(max_entries=0)), ('on', MessageCache())):
+        backend.chat_cache = cache
+        responses = [backend.get_chat_response('Hope') for _ in range(200)]
+        kurals = len({response['kural']['tamil'] for response in responses})
+        templates = len({response['message'] for response in responses})
+        print(f"'Hope' x200, cache {name}: {kurals} distinct Kurals, {templates} distinct replies")
+    backend.chat_cache = original_cache
+
+
+LOAD_MIX = (
+    ('POST', '/api/chat', {'message': 'I feel sad and worried today', 'history': []}),
+    ('POST', '/api/chat', {'message': 'Hello there', 'history': []}),
+    ('GET', '/api/random', None),
+    ('GET', '/api/emotions', None),
+    ('GET', '/api/kurals/hope', None),
+)
+
+
+def bench_rate_limit(args):
+    """Cost of the write rate limit on allowed submissions, and that floods get 429"""
+    client = backend.app.test_client()
+    answers = make_quiz_response(random.Random(args.seed))['answers']
+    original_limiter = backend.write_limiter
+
+    def submit():
+        return client.post('/api/quiz/submit', json={'answers': answers})
+
+    print(f"{'limiter':<8} {'submit us':>10} {'allow() us':>11}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, limiter in (
+            ('off', None),
+            ('memory', TokenBucketLimiter(rate=1e9, burst=1e9)),
+            ('sqlite', SQLiteTokenBucketLimiter(os.path.join(directory, 'ratelimit.db'), rate=1e9, burst=1e9)),
+        ):
+            backend.write_limiter = limiter
+            per_submit = time_call(submit, (), args.requests)
+            per_allow = time_call(limiter.allow, ('127.0.0.1',), args.requests) if limiter else 0.0
+            print(f"{name:<8} {per_submit * 1e6:>10.1f} {per_allow * 1e6:>11.2f}")
+
+        # A burst of 30 then 2/sec: a flood well past the burst must mostly be refused
+        for name, limiter in (
+            ('memory', TokenBucketLimiter(rate=2, burst=30)),
+            ('sqlite', SQLiteTokenBucketLimiter(os.path.join(directory, 'flood.db'), rate=2, burst=30)),
+        ):
+            backend.write_limiter = limiter
+            statuses = [submit().status_code for _ in range(200)]
+            limited = statuses.count(429)
+            if statuses[:30] != [200] * 30 or limited < 165:
+                raise SystemExit(f"{name} limiter let the flood through: {statuses}")
+            response = submit()
+            if response.status_code != 429 or int(response.headers['Retry-After']) < 1:
+                raise SystemExit(f"{name} limiter answered {response.status_code} without a Retry-After")
+            print(f"{name} flood of 200: {statuses.count(200)} accepted, {limited} refused with 429")
+
+    backend.write_limiter = original_limiter
+
+
+def write_tagged_corpus(path, tag, size, rng):
+    """Corpus whose every Kural's English text starts with `tag`"""
+    database, _ = make_synthetic_database(size, rng)
+    write_corpus(
+        ({**kural, 'english': f"{tag} {kural['english']}", 'emotion': emotion}
+         for emotion, kurals in database.items() for kural in kurals),
+        path
+    )
+
+
+def write_tagged_responses(path, tag):
+    """Reply templates that all start with `tag`, replaced in one rename"""
+    responses = {kind: [f"{tag} {template}" for template in templates] for kind, templates in CHAT_RESPONSES.items()}
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as target:
+        json.dump(responses, target)
+    os.replace(f'{path}.tmp', path)
+
+
+def bench_content_reload(args):
+    """/api/chat from many threads while the corpus and templates are rewritten and reloaded"""
+    rng = random.Random(args.seed)
+    original_registry = backend.content_registry
+    messages = [rng.choice(REPEATED_MESSAGES) if rng.random() < 0.5 else make_message(60, rng) for _ in range(1000)]
+
+    def hammer(duration):
+        """Chat from args.threads clients; returns (sorted latencies, failures, (Kural tag, reply tag) pairs)"""
+        latencies = []
+        failures = []
+        pairs = set()
+        lock = threading.Lock()
+        stop_at = time.monotonic() + duration
+
+        def client(worker):
+            client = backend.app.test_client()
+            local_rng = random.Random(args.seed + worker)
+            session_id = None
+            local_latencies = []
+            local_failures = []
+            local_pairs = set()
+            while time.monotonic() < stop_at:
+                start = time.perf_counter()
+                response = client.post('/api/chat', json={'message': local_rng.choice(messages), 'session_id': session_id})
+                local_latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    local_failures.append(f"status {response.status_code}")
+                    continue
+                payload = response.json
+                session_id = payload['session_id']
+                reply_tag = payload['response'].split()[0]
+                if payload['follow_up'].split()[0] != reply_tag:
+                    local_failures.append("reply and follow-up from different templates")
+                local_pairs.add((payload['kural']['english'].split()[0], reply_tag))
+            with lock:
+                latencies.extend(local_latencies)
+                failures.extend(local_failures)
+                pairs.update(local_pairs)
+
+        threads = [threading.Thread(target=client, args=(worker,)) for worker in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(latencies), failures, pairs
+
+    with tempfile.TemporaryDirectory() as directory:
+        corpus_path = os.path.join(directory, 'kurals.bin')
+        responses_path = os.path.join(directory, 'responses.json')
+        write_tagged_corpus(corpus_path, 'c0', args.kurals, rng)
+        write_tagged_responses(responses_path, 't0')
+        registry = ContentRegistry(
+            KURALS_DATABASE, CHAT_RESPONSES, corpus_path, responses_path, poll_interval=args.poll_interval
+        )
+        backend.content_registry = registry
+        registry.start()
+
+        steady, steady_failures, _ = hammer(args.duration)
+
+        # Rewrite one file at a time, alternating corpus sizes so positions really move. Every
+        # (corpus, templates) pair that was ever on disk is a valid snapshot; any other is torn
+        on_disk = [('c0', 't0')]
+        stop = threading.Event()
+
+        def rewrite():
+            writer_rng = random.Random(args.seed)
+            generation = 0
+            while not stop.wait(args.rewrite_interval):
+                generation += 1
+                corpus_tag, reply_tag = on_disk[-1]
+                if generation % 2:
+                    corpus_tag = f'c{generation}'
+                    write_tagged_corpus(corpus_path, corpus_tag, args.kurals + (generation % 4 == 1) * 500, writer_rng)
+                else:
+                    reply_tag = f't{generation}'
+                    write_tagged_responses(responses_path, reply_tag)
+                on_disk.append((corpus_tag, reply_tag))
+
+        writer = threading.Thread(target=rewrite)
+        writer.start()
+        reloading, reload_failures, pairs = hammer(args.duration)
+        stop.set()
+        writer.join()
+        registry.stop()
+
+    backend.content_registry = original_registry
+    reload_failures += [f"torn snapshot {pair}" for pair in sorted(pairs - set(on_disk))]
+
+    print(f"{'phase':<10} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'failures':>9}")
+    for name, latencies, failures in (('steady', steady, steady_failures), ('reloading', reloading, reload_failures)):
+        print(f"{name:<10} {len(latencies):>9} {percentile(latencies, 0.5) * 1e3:>8.2f} "
+              f"{percentile(latencies, 0.99) * 1e3:>8.2f} {latencies[-1] * 1e3:>8.2f} {len(failures):>9}")
+    print(f"rewrites: {len(on_disk) - 1}, reloads: {registry.reloads}, versions served: {len(pairs)}, "
+          f"failed builds: {registry.failures}")
+
+    if steady_failures or reload_failures:
+        raise SystemExit(f"failed requests: {(steady_failures + reload_failures)[:5]}")
+    if not registry.reloads:
+        raise SystemExit("no content reload happened during the run")
+    increase = percentile(reloading, 0.99) - percentile(steady, 0.99)
+    if increase * 1e3 > args.max_p99_increase_ms:
+        raise SystemExit(f"p99 rose by {increase * 1e3:.1f} ms during reloads")
+
+
+def wait_for_server(port, timeout=30):
+    """Poll /api/health until the server answers"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                connection.close()
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"Server on port {port} did not start")
+
+
+def drive_load(port, concurrency, duration, seed):
+    """Run `concurrency` keep-alive clients for `duration` seconds; return (latencies, errors, elapsed)"""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(worker):
+        rng = random.Random(seed + worker)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        local_latencies = []
+        local_errors = 0
+        while time.monotonic() < stop_at:
+            method, path, body = rng.choice(LOAD_MIX)
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 500:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                continue
+            local_latencies.append(time.perf_counter() - start)
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(worker,)) for worker in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), sum(errors), time.perf_counter() - start
+
+
+def bench_load(args):
+    """Start serve.py in each mode and report requests/sec and p50/p99 latency"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'mode':<6} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for offset, mode in enumerate(args.modes):
+        port = args.port + offset
+        command = [sys.executable, 'serve.py', '--mode', mode, '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(args.workers), '--threads', str(args.threads)]
+        env = dict(os.environ, FLASK_DEBUG='0')
+        server = subprocess.Popen(command, cwd=backend_dir, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_server(port)
+            latencies, errors, elapsed = drive_load(port, args.concurrency, args.duration, args.seed)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        if not latencies:
+            print(f"{mode:<6} no successful requests")
+            continue
+        print(f"{mode:<6} {len(latencies):>9} {errors:>7} {len(latencies) / elapsed:>9.0f} "
+              f"{percentile(latencies, 0.5) * 1e3:>8.2f} {percentile(latencies, 0.99) * 1e3:>8.2f}")
+
+# Relative call rates of the chatApi.js methods: a chat page loads emotions and health once,
+# then sends messages (chips or typed), opens emotion lists and rates some replies; the quiz
+# is submitted once per visit and the admin views (listings, analytics) are opened rarely
+TRAFFIC_MIX = (
+    ('chat', 40),
+    ('feedback-submit', 8),
+    ('emotions', 8),
+    ('kurals-by-emotion', 8),
+    ('random', 6),
+    ('health', 5),
+    ('quiz-submit', 4),
+    ('quiz-response', 4),
+    ('search', 3),
+    ('quiz-responses', 3),
+    ('quiz-analytics', 3),
+    ('feedback-responses', 3),
+    ('feedback-analytics', 3),
+    ('quiz-score', 2),
+    ('chat-batch', 1),
+    ('quiz-analytics-window', 1),
+    ('feedback-analytics-window', 1),
+    ('metrics', 1),
+)
+
+# Tail latencies from fewer samples than this are too noisy to compare with a baseline
+MIN_P99_SAMPLES = 1000
+
+
+def make_traffic(count, rng, quiz_session_ids, kurals):
+    """`count` (endpoint, method, path, body) requests drawn from TRAFFIC_MIX"""
+    names = [name for name, _ in TRAFFIC_MIX]
+    weights = [weight for _, weight in TRAFFIC_MIX]
+    emotions = list(KURALS_DATABASE)
+    kural_index = backend.content_registry.current.kural_index
+    search_words = [word.strip('.,;:!?"\'') for kural in kurals for word in kural['english'].split()]
+    # Dashboard windows: the last day by hour, and the last week for one Kural
+    day_ago = iso_time(wall_clock() - 86400)
+    week_ago = iso_time(wall_clock() - 7 * 86400)
+    traffic = []
+    for name in rng.choices(names, weights, k=count):
+        if name == 'chat':
+            message = rng.choice(REPEATED_MESSAGES) if rng.random() < 0.4 else make_message(60, rng)
+            request = ('POST', '/api/chat', {'message': message, 'session_id': None})
+        elif name == 'feedback-submit':
+            request = ('POST', '/api/feedback/submit', {
+                'userMessage': make_message(40, rng), 'botResponse': 'Here is some wisdom.',
+                'kural': rng.choice(kurals), 'feedback': rng.choice(('positive', 'negative')),
+                'timestamp': datetime.now().isoformat()
+            })
+        elif name == 'emotions':
+            request = ('GET', '/api/emotions', None)
+        elif name == 'kurals-by-emotion':
+            request = ('GET', f'/api/kurals/{rng.choice(emotions)}', None)
+        elif name == 'random':
+            request = ('GET', '/api/random', None)
+        elif name == 'health':
+            request = ('GET', '/api/health', None)
+        elif name == 'quiz-submit':
+            request = ('POST', '/api/quiz/submit', {'answers': make_quiz_response(rng)['answers']})
+        elif name == 'quiz-response':
+            request = ('GET', f'/api/quiz/responses/{rng.choice(quiz_session_ids)}', None)
+        elif name == 'quiz-responses':
+            request = ('GET', '/api/quiz/responses', None)
+        elif name == 'quiz-analytics':
+            request = ('GET', '/api/quiz/analytics', None)
+        elif name == 'feedback-responses':
+            request = ('GET', '/api/feedback/responses', None)
+        elif name == 'feedback-analytics':
+            request = ('GET', '/api/feedback/analytics', None)
+        elif name == 'search':
+            request = ('GET', f'/api/search?q={rng.choice(search_words)}', None)
+        elif name == 'quiz-score':
+            request = ('POST', '/api/quiz/score', {'answers': make_quiz_response(rng)['answers']})
+        elif name == 'chat-batch':
+            request = ('POST', '/api/chat/batch', {
+                'messages': [make_message(60, rng) for _ in range(10)]
+            })
+        elif name == 'quiz-analytics-window':
+            request = ('GET', f'/api/quiz/analytics?from={day_ago}&granularity=hour', None)
+        elif name == 'feedback-analytics-window':
+            request = ('GET', f'/api/feedback/analytics?from={week_ago}&kural={kural_index.number_of(rng.choice(kurals))}', None)
+        else:
+            request = ('GET', '/api/metrics', None)
+        traffic.append((name,) + request)
+    return traffic
+
+
+def in_process_sender():
+    """send(method, path, body) -> (status, body bytes) through the Flask test client"""
+    client = backend.app.test_client()
+
+    def send(method, path, body):
+        response = client.open(path, method=method, json=body)
+        return response.status_code, response.get_data()
+
+    return send, lambda: None
+
+
+def socket_sender(port):
+    """send(method, path, body) -> (status, body bytes) over one keep-alive HTTP connection"""
+    connections = [http.client.HTTPConnection('127.0.0.1', port, timeout=30)]
+
+    def send(method, path, body):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        try:
+            connections[0].request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = connections[0].getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            connections[0].close()
+            connections[0] = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            return 0, b''
+
+    return send, lambda: connections[0].close()
+
+
+def drive_traffic(traffic, concurrency, make_sender):
+    """Replay `traffic` from `concurrency` clients; returns ([(latency, status)] in traffic order, elapsed)"""
+    results = [None] * len(traffic)
+
+    def client(worker):
+        send, close = make_sender()
+        # Each client is one chat user: it keeps the session the server hands back
+        session_id = None
+        for index in range(worker, len(traffic), concurrency):
+            name, method, path, body = traffic[index]
+            if name == 'chat':
+                body = {**body, 'session_id': session_id}
+            start = time.perf_counter()
+            status, data = send(method, path, body)
+            results[index] = (time.perf_counter() - start, status)
+            if name == 'chat' and status == 200:
+                session_id = json.loads(data)['session_id']
+        close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(worker,)) for worker in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def latency_summary(samples, elapsed):
+    """Throughput, latency percentiles and error count for (latency, status) samples"""
+    latencies = sorted(latency for latency, _ in samples)
+    return {
+        'requests': len(samples),
+        'requests_per_sec': round(len(samples) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1e3, 3),
+        'p90_ms': round(percentile(latencies, 0.9) * 1e3, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1e3, 3),
+        'max_ms': round(latencies[-1] * 1e3, 3),
+        'errors': sum(1 for _, status in samples if not 200 <= status < 400),
+    }
+
+
+def compare_to_baseline(results, baseline, margin):
+    """Regressions beyond `margin` (0.25 = 25%) against a stored results file, as readable lines"""
+    regressions = []
+    for transport, current in results['transports'].items():
+        previous = baseline.get('transports', {}).get(transport)
+        if previous is None:
+            continue
+        endpoints = [('overall', current['overall'], previous['overall'])] + [
+            (name, stats, previous['endpoints'][name])
+            for name, stats in current['endpoints'].items() if name in previous['endpoints']
+        ]
+        for name, stats, before in endpoints:
+            keys = ('p50_ms', 'p99_ms') if stats['requests'] >= MIN_P99_SAMPLES else ('p50_ms',)
+            for key in keys:
+                if stats[key] > before[key] * (1 + margin):
+                    regressions.append(f"{transport} {name} {key}: {before[key]:.2f} -> {stats[key]:.2f}")
+            if stats['errors'] > before['errors']:
+                regressions.append(f"{transport} {name} errors: {before['errors']} -> {stats['errors']}")
+        before_rate = previous['overall']['requests_per_sec']
+        if current['overall']['requests_per_sec'] < before_rate / (1 + margin):
+            regressions.append(
+                f"{transport} overall requests_per_sec: {before_rate:.0f} -> {current['overall']['requests_per_sec']:.0f}"
+            )
+    return regressions
+
+
+def bench_regression(args):
+    """Realistic traffic against every endpoint, in-process and over a socket, checked against a baseline"""
+    rng = random.Random(args.seed)
+    kurals = [kural for kurals in KURALS_DATABASE.values() for kural in kurals]
+
+    # Seed the stores the listing and analytics endpoints read
+    quiz_responses = [make_quiz_response(rng) for _ in range(args.quiz)]
+    backend.quiz_store.add_many(quiz_responses)
+    backend.quiz_analytics.rebuild_from(backend.quiz_store)
+    feedback_records = [make_feedback_record(rng, kurals) for _ in range(args.feedback)]
+    backend.feedback_responses.extend(feedback_records)
+    kural_index = backend.content_registry.current.kural_index
+    for record in feedback_records:
+        backend.feedback_analytics.record(kural_index.number_of(record['kural']), record['feedback'])
+    quiz_session_ids = [response['session_id'] for response in quiz_responses] or ['missing']
+    del quiz_responses, feedback_records
+
+    results = {
+        'seed': args.seed,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'quiz_responses': args.quiz,
+        'feedback_records': args.feedback,
+        'timestamp': datetime.now().isoformat(),
+        'transports': {},
+    }
+    server = None
+    for transport in args.transports:
+        if transport == 'socket':
+            # No per-request access log lines from the development server
+            logging.getLogger('werkzeug').setLevel(logging.WARNING)
+            server = make_server('127.0.0.1', args.port, backend.app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            make_sender = lambda: socket_sender(args.port)
+        else:
+            make_sender = in_process_sender
+
+        drive_traffic(make_traffic(args.warmup, rng, quiz_session_ids, kurals), args.concurrency, make_sender)
+        traffic = make_traffic(args.requests, rng, quiz_session_ids, kurals)
+        samples, elapsed = drive_traffic(traffic, args.concurrency, make_sender)
+        if server is not None:
+            server.shutdown()
+            server = None
+
+        by_endpoint = {}
+        for request, sample in zip(traffic, samples):
+            by_endpoint.setdefault(request[0], []).append(sample)
+        results['transports'][transport] = {
+            'overall': latency_summary(samples, elapsed),
+            'endpoints': {name: latency_summary(by_endpoint[name], elapsed)
+                          for name, _ in TRAFFIC_MIX if name in by_endpoint},
+        }
+
+    for transport, report in results['transports'].items():
+        print(f"{transport}: {report['overall']['requests_per_sec']:.0f} requests/sec over {args.concurrency} clients")
+        print(f"  {'endpoint':<26} {'requests':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for name, stats in [('overall', report['overall'])] + list(report['endpoints'].items()):
+            print(f"  {name:<26} {stats['requests']:>9} {stats['p50_ms']:>8.2f} {stats['p90_ms']:>8.2f} "
+                  f"{stats['p99_ms']:>8.2f} {stats['errors']:>7}")
+
+    if args.results:
+        with open(args.results, 'w', encoding='utf-8') as target:
+            json.dump(results, target, indent=2)
+        print(f"results written to {args.results}")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as target:
+            json.dump(results, target, indent=2)
+        print(f"baseline saved to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline, encoding='utf-8') as source:
+            regressions = compare_to_baseline(results, json.load(source), args.margin)
+        errors = [f"{transport} errors: {report['overall']['errors']}"
+                  for transport, report in results['transports'].items() if report['overall']['errors']]
+        if regressions or errors:
+            print(f"regressions beyond {args.margin:.0%} of {args.baseline}:")
+            for line in regressions + errors:
+                print(f"  {line}")
+            raise SystemExit(1)
+        print(f"within {args.margin:.0%} of {args.baseline}")
+
+
+def rollup_windows(now):
+    """(name, since, until) windows a dashboard asks for, in wall_seconds"""
+    return (
+        ('last hour', now - 3600, None),
+        ('last day', now - 86400, None),
+        ('last 7 days', now - 7 * 86400, None),
+        ('last 30 days', now - 30 * 86400, None),
+        ('3 days, 2 weeks ago', now - 17 * 86400 - 1234, now - 14 * 86400 - 4321),
+    )
+
+
+def rollup_votes(rollup, kural_keys, kurals, positive, seconds):
+    """Merge feedback columns into a TimeRollup keyed the way FeedbackAnalytics.record keys votes"""
+    now = rollup.clock()
+    votes = ('negative', 'positive')
+    for granularity, width in GRANULARITIES.items():
+        indexes = seconds // width
+        kept = indexes >= now // width - rollup.retention[granularity] + 1
+        buckets, slots = np.unique(indexes[kept], return_inverse=True)
+        # One bincount over (bucket, Kural, vote) triples
+        pairs = np.bincount(
+            (slots * len(kural_keys) + kurals[kept]) * 2 + positive[kept], minlength=len(buckets) * len(kural_keys) * 2
+        ).reshape(len(buckets), -1)
+        for slot, index in enumerate(buckets.tolist()):
+            row = pairs[slot]
+            negative_votes, positive_votes = row.reshape(-1, 2).sum(axis=0).tolist()
+            counts = {'negative': negative_votes, 'positive': positive_votes}
+            for pair in np.flatnonzero(row).tolist():
+                kural, vote = divmod(pair, 2)
+                counts[kural_keys[kural], votes[vote]] = int(row[pair])
+            rollup.merge(granularity, index, negative_votes + positive_votes, counts)
+
+
+def scan_quiz_window(answers, types, seconds, start, end):
+    """Full-scan quiz analytics over [start, end): the work a window costs without rollups"""
+    rows = np.flatnonzero((seconds >= start) & (seconds < end))
+    return column_analytics(answers[rows], types[rows], QUESTION_IDS, ANSWER_LETTERS)
+
+
+def nonzero_counts(counts):
+    """Rollup-style counts without zero entries, so an empty window compares equal to {}"""
+    return {key: count for key, count in counts.items() if count}
+
+
+def scan_feedback_window(kural_keys, kurals, positive, seconds, start, end):
+    """Full-scan per-Kural votes over [start, end) as rollup counts"""
+    rows = (seconds >= start) & (seconds < end)
+    pairs = np.bincount(kurals[rows].astype(np.int64) * 2 + positive[rows], minlength=len(kural_keys) * 2)
+    counts = {'negative': int(pairs[0::2].sum()), 'positive': int(pairs[1::2].sum())}
+    for pair in np.flatnonzero(pairs).tolist():
+        counts[kural_keys[pair // 2], ('negative', 'positive')[pair % 2]] = int(pairs[pair])
+    return counts
+
+
+def bench_rollups(args):
+    """Windowed analytics from minute/hour/day rollups vs full scans over the raw events"""
+    np_rng = np.random.default_rng(args.seed)
+    rng = random.Random(args.seed)
+    now = wall_clock()
+    span = args.days * 86400
+    scorer = PersonalityScorer()
+    kural_keys = list(range(1, args.kurals + 1))
+
+    # Raw events spread evenly over the last `days`, folded into the rollups a chunk at a time
+    quiz_rollup = TimeRollup(clock=lambda: now)
+    feedback_rollup = TimeRollup(clock=lambda: now)
+    answers, types, quiz_seconds = [], [], []
+    kurals, positive, feedback_seconds = [], [], []
+    quiz_ingest = feedback_ingest = 0.0
+    for start in range(0, args.events, ROLLUP_CHUNK):
+        size = min(ROLLUP_CHUNK, args.events - start)
+        answers.append(np_rng.integers(1, len(ANSWER_LETTERS) + 1, (size, len(QUESTION_IDS)), dtype=np.uint8))
+        types.append((scorer.classify_columns(answers[-1]) + 1).astype(np.uint8))
+        quiz_seconds.append(now - np_rng.integers(0, span, size))
+        began = time.perf_counter()
+        rollup_columns(quiz_rollup, answers[-1], types[-1], quiz_seconds[-1] * 1_000_000)
+        quiz_ingest += time.perf_counter() - began
+
+        kurals.append(np_rng.integers(0, len(kural_keys), size, dtype=np.int16))
+        positive.append((np_rng.random(size) < 2 / 3).astype(np.int64))
+        feedback_seconds.append(now - np_rng.integers(0, span, size))
+        began = time.perf_counter()
+        rollup_votes(feedback_rollup, kural_keys, kurals[-1], positive[-1], feedback_seconds[-1])
+        feedback_ingest += time.perf_counter() - began
+    answers, types, quiz_seconds = np.concatenate(answers), np.concatenate(types), np.concatenate(quiz_seconds)
+    kurals, positive = np.concatenate(kurals), np.concatenate(positive)
+    feedback_seconds = np.concatenate(feedback_seconds)
+
+    quiz = QuizAnalytics(scorer, quiz_rollup)
+    feedback = FeedbackAnalytics(feedback_rollup)
+    print(f"events per stream:   {args.events} over {args.days} days")
+    print(f"buckets kept:        quiz {quiz_rollup.bucket_count()}, feedback {feedback_rollup.bucket_count()}")
+    print(f"bulk rollup:         quiz {quiz_ingest:.2f} s, feedback {feedback_ingest:.2f} s")
+    print(f"peak RSS:            {peak_rss_mb():.0f} MB")
+
+    # Each window must equal a full scan over exactly the span the rollup reports summing
+    windows = list(rollup_windows(now))
+    for _ in range(args.checks):
+        since, until = sorted(rng.randrange(now - span, now) for _ in range(2))
+        windows.append(('random', since, until))
+    for name, since, until in windows:
+        events, counts, start, end = quiz_rollup.query(since, until)
+        if (events, *split_rollup_counts(counts)) != scan_quiz_window(answers, types, quiz_seconds, start, end):
+            raise SystemExit(f"quiz rollup differs from a full scan for {name} [{start}, {end})")
+        _, counts, start, end = feedback_rollup.query(since, until)
+        expected = scan_feedback_window(kural_keys, kurals, positive, feedback_seconds, start, end)
+        if nonzero_counts(counts) != nonzero_counts(expected):
+            raise SystemExit(f"feedback rollup differs from a full scan for {name} [{start}, {end})")
+    print(f"{len(windows)} windows match full scans")
+
+    print(f"{'window':<22} {'stream':<9} {'p50 ms':>9} {'p99 ms':>9} {'scan ms':>9}")
+    for name, since, until in rollup_windows(now):
+        for stream, query, scan in (
+            ('quiz', lambda: quiz.window(since, until),
+             lambda: scan_quiz_window(answers, types, quiz_seconds, since, until or now + 1)),
+            ('feedback', lambda: feedback.window(since, until),
+             lambda: scan_feedback_window(kural_keys, kurals, positive, feedback_seconds, since, until or now + 1)),
+        ):
+            samples = []
+            for _ in range(args.queries):
+                began = time.perf_counter()
+                query()
+                samples.append(time.perf_counter() - began)
+            samples.sort()
+            scan_time = time_call(scan, (), 3)
+            print(f"{name:<22} {stream:<9} {percentile(samples, 0.5) * 1e3:>9.3f} "
+                  f"{percentile(samples, 0.99) * 1e3:>9.3f} {scan_time * 1e3:>9.1f}")
+
+    print(f"{'series':<22} {'stream':<9} {'p50 ms':>9} {'p99 ms':>9} {'points':>9}")
+    kural = kural_keys[0]
+    for name, granularity, since in (('minutes, last hour', 'minute', now - 3600),
+                                     ('hours, last day', 'hour', now - 86400),
+                                     ('days, all kept', 'day', None)):
+        for stream, query in (('quiz', lambda: quiz.window(since, None, granularity)),
+                              ('feedback', lambda: feedback.window(since, None, granularity)),
+                              ('1 Kural', lambda: feedback.window(since, None, granularity, kural_number=kural))):
+            samples = []
+            for _ in range(args.queries):
+                began = time.perf_counter()
+                points = len(query()['series'])
+                samples.append(time.perf_counter() - began)
+            samples.sort()
+            print(f"{name:<22} {stream:<9} {percentile(samples, 0.5) * 1e3:>9.3f} "
+                  f"{percentile(samples, 0.99) * 1e3:>9.3f} {points:>9}")
+
+    # Live submissions: the rollup's share of each record() call
+    live = TimeRollup()
+    keys = [f"Q{question_id}_A" for question_id in QUESTION_IDS] + [('personality', PERSONALITY_TYPES[0])]
+    add_time = time_call(live.add, (keys, None), args.iterations)
+    print(f"rollup add per quiz submit: {add_time * 1e6:.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thirukkural.Ai backend benchmarks")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("emotions", help="emotion detection latency").set_defaults(func=bench_emotions)
+
+    quiz_store = subparsers.add_parser("quiz-store", help="quiz session lookup latency")
+    quiz_store.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    quiz_store.set_defaults(func=bench_quiz_store)
+
+    quiz_analytics = subparsers.add_parser("quiz-analytics", help="incremental vs full quiz analytics")
+    quiz_analytics.add_argument("--size", type=int, default=100_000)
+    quiz_analytics.set_defaults(func=bench_quiz_analytics)
+
+    quiz_memory = subparsers.add_parser("quiz-memory", help="quiz store memory per session")
+    quiz_memory.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    quiz_memory.add_argument("--dict-max", type=int, default=200_000)
+    quiz_memory.set_defaults(func=bench_quiz_memory)
+
+    personality = subparsers.add_parser("personality", help="personality scoring accuracy and throughput")
+    personality.add_argument("--sessions", type=int, default=1_000_000)
+    personality.add_argument("--checks", type=int, default=10_000)
+    personality.set_defaults(func=bench_personality)
+
+    feedback_analytics = subparsers.add_parser("feedback-analytics", help="incremental vs full feedback analytics")
+    feedback_analytics.add_argument("--size", type=int, default=1_000_000)
+    feedback_analytics.set_defaults(func=bench_feedback_analytics)
+
+    stream = subparsers.add_parser("stream", help="NDJSON export memory use")
+    stream.add_argument("--size", type=int, default=1_000_000)
+    stream.set_defaults(func=bench_stream)
+
+    kural_endpoints = subparsers.add_parser("kural-endpoints", help="cached Kural endpoint throughput")
+    kural_endpoints.add_argument("--requests", type=int, default=20_000)
+    kural_endpoints.set_defaults(func=bench_kural_endpoints)
+
+    search = subparsers.add_parser("search", help="full-text search latency percentiles")
+    search.add_argument("--queries", type=int, default=10_000)
+    search.set_defaults(func=bench_search)
+
+    retrieval = subparsers.add_parser("retrieval", help="TF-IDF retrieval throughput")
+    retrieval.add_argument("--messages", type=int, default=2_000)
+    retrieval.add_argument("--batch-size", type=int, default=256)
+    retrieval.set_defaults(func=bench_retrieval)
+
+    chat_batch = subparsers.add_parser("chat-batch", help="batch vs individual chat throughput")
+    chat_batch.add_argument("--messages", type=int, default=1_000)
+    chat_batch.set_defaults(func=bench_chat_batch)
+
+    quiz_submit = subparsers.add_parser("quiz-submit", help="quiz submit latency with a large store")
+    quiz_submit.add_argument("--stored", type=int, default=100_000)
+    quiz_submit.add_argument("--submits", type=int, default=50)
+    quiz_submit.set_defaults(func=bench_quiz_submit)
+
+    metrics = subparsers.add_parser("metrics", help="request metrics overhead")
+    metrics.add_argument("--requests", type=int, default=20_000)
+    metrics.add_argument("--threads", type=int, default=8)
+    metrics.set_defaults(func=bench_metrics)
+
+    feedback_submit = subparsers.add_parser("feedback-submit", help="feedback persistence throughput")
+    feedback_submit.add_argument("--submissions", type=int, default=20_000)
+    feedback_submit.add_argument("--threads", type=int, default=8)
+    feedback_submit.add_argument("--disk-latency-ms", type=float, default=2.0)
+    feedback_submit.set_defaults(func=bench_feedback_submit)
+
+    chat_sessions = subparsers.add_parser("chat-sessions", help="chat cost with server-side sessions")
+    chat_sessions.add_argument("--sessions", type=int, default=100_000)
+    chat_sessions.add_argument("--turns", type=int, default=20)
+    chat_sessions.add_argument("--requests", type=int, default=5_000)
+    chat_sessions.set_defaults(func=bench_chat_sessions)
+
+    chat_cache = subparsers.add_parser("chat-cache", help="repeated chat message cache")
+    chat_cache.add_argument("--requests", type=int, default=20_000)
+    chat_cache.add_argument("--repeat-share", type=float, default=0.8)
+    chat_cache.set_defaults(func=bench_chat_cache)
+
+    rate_limit = subparsers.add_parser("rate-limit", help="write rate limit overhead and 429s")
+    rate_limit.add_argument("--requests", type=int, default=5_000)
+    rate_limit.set_defaults(func=bench_rate_limit)
+
+    content_reload = subparsers.add_parser("content-reload", help="chat consistency and latency during reloads")
+    content_reload.add_argument("--kurals", type=int, default=1330)
+    content_reload.add_argument("--duration", type=float, default=10.0)
+    content_reload.add_argument("--threads", type=int, default=8)
+    content_reload.add_argument("--poll-interval", type=float, default=0.1)
+    content_reload.add_argument("--rewrite-interval", type=float, default=0.5)
+    content_reload.add_argument("--max-p99-increase-ms", type=float, default=50.0)
+    content_reload.set_defaults(func=bench_content_reload)
+
+    regression = subparsers.add_parser("regression", help="traffic mix over every endpoint, checked against a baseline")
+    regression.add_argument("--requests", type=int, default=5_000)
+    regression.add_argument("--warmup", type=int, default=500)
+    regression.add_argument("--concurrency", type=int, default=8)
+    regression.add_argument("--quiz", type=int, default=100_000, help="synthetic quiz responses to seed")
+    regression.add_argument("--feedback", type=int, default=100_000, help="synthetic feedback records to seed")
+    regression.add_argument("--transports", nargs="+", choices=("in-process", "socket"), default=["in-process", "socket"])
+    regression.add_argument("--port", type=int, default=5200)
+    regression.add_argument("--results", help="write results JSON here")
+    regression.add_argument("--baseline", help="results JSON to compare against (or to write with --save-baseline)")
+    regression.add_argument("--save-baseline", action="store_true")
+    regression.add_argument("--margin", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    regression.set_defaults(func=bench_regression)
+
+    rollups = subparsers.add_parser("rollups", help="windowed analytics latency from time-bucketed rollups")
+    rollups.add_argument("--events", type=int, default=10_000_000)
+    rollups.add_argument("--days", type=int, default=30)
+    rollups.add_argument("--kurals", type=int, default=1330)
+    rollups.add_argument("--queries", type=int, default=200)
+    rollups.add_argument("--checks", type=int, default=100)
+    rollups.set_defaults(func=bench_rollups)
+
+    load = subparsers.add_parser("load", help="HTTP load test against serve.py modes")
+    load.add_argument("--modes", nargs="+", choices=("dev", "wsgi", "asgi"), default=["dev", "wsgi", "asgi"])
+    load.add_argument("--workers", type=int, default=4)
+    load.add_argument("--threads", type=int, default=4)
+    load.add_argument("--concurrency", type=int, default=16)
+    load.add_argument("--duration", type=float, default=10.0)
+    load.add_argument("--port", type=int, default=5100)
+    load.set_defaults(func=bench_load)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Build the binary Kural corpus read by KURAL_CORPUS_PATH
+
+Usage:
+    python build_corpus.py thirukkural.json kurals.bin
+    python build_corpus.py thirukkural.csv kurals.bin
+    python build_corpus.py --builtin kurals.bin
+
+JSON input is a list of objects; CSV input has one row per Kural. Recognised
+fields are number, tamil, english, relevance, category, emotion, chapter and
+section. Extra translations go in a 'translations' object (JSON) or in
+'translation_<language>' columns (CSV).
+"""
+
+import argparse
+import csv
+import json
+
+from kural_corpus import write_corpus
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+
+def read_csv(path):
+    kurals = []
+    with open(path, encoding='utf-8', newline='') as source:
+        for row in csv.DictReader(source):
+            kural = {}
+            translations = {}
+            for column, value in row.items():
+                if column.startswith('translation_'):
+                    if value:
+                        translations[column[len('translation_'):]] = value
+                else:
+                    kural[column] = value
+            if translations:
+                kural['translations'] = translations
+            kurals.append(kural)
+    return kurals
+
+
+def read_builtin():
+    """Flatten the sample KURALS_DATABASE shipped in app.py"""
+    from app import KURALS_DATABASE
+
+    kurals = []
+    for emotion, emotion_kurals in KURALS_DATABASE.items():
+        for kural in emotion_kurals:
+            kurals.append({**kural, 'emotion': emotion})
+    return kurals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the binary Kural corpus")
+    parser.add_argument("source", nargs="?", help="JSON or CSV source file")
+    parser.add_argument("output", help="binary corpus file to write")
+    parser.add_argument("--builtin", action="store_true", help="use the sample Kurals from app.py")
+    args = parser.parse_args()
+
+    if args.builtin:
+        kurals = read_builtin()
+    elif not args.source:
+        parser.error("a source file is required unless --builtin is given")
+    elif args.source.endswith('.csv'):
+        kurals = read_csv(args.source)
+    else:
+        kurals = read_json(args.source)
+
+    kurals.sort(key=lambda kural: int(kural.get('number') or 0))
+    write_corpus(kurals, args.output)
+    print(f"Wrote {len(kurals)} Kurals to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Versioned Kural corpus and reply templates, reloaded from disk without restarting workers
+
+Requests read `registry.current` once and use that snapshot throughout, so a reload
+never mixes Kurals or templates from two versions. A background thread polls the
+files, builds the next snapshot off the request path and swaps it in with a single
+reference assignment.
+"""
+
+import json
+import logging
+import os
+import threading
+
+from kural_corpus import load_corpus
+from kural_index import KuralIndex
+from structured_logging import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Seconds between checks of the content files for changes (0 disables watching)
+POLL_INTERVAL = float(os.environ.get('CONTENT_POLL_INTERVAL', '2'))
+
+# Times to re-read the files when one changes while they are being read
+READ_ATTEMPTS = 5
+
+# Template lists every reply file must provide
+RESPONSE_KINDS = ('greeting', 'general', 'follow_up')
+
+
+def file_signature(path):
+    """What changes when a file is rewritten or replaced, or None when it is missing"""
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def load_responses(path, default):
+    """Reply templates from a JSON file of {kind: [template, ...]}, or `default` without one"""
+    if not path:
+        return default
+    with open(path, encoding='utf-8') as source:
+        responses = json.load(source)
+    for kind in RESPONSE_KINDS:
+        templates = responses.get(kind) if isinstance(responses, dict) else None
+        if not isinstance(templates, list) or not templates or \
+                not all(isinstance(template, str) for template in templates):
+            raise ValueError(f"{path}: '{kind}' must be a non-empty list of strings")
+    return {kind: tuple(responses[kind]) for kind in RESPONSE_KINDS}
+
+
+class ContentSnapshot:
+    """One immutable version of the Kural index and reply templates"""
+
+    __slots__ = ('version', 'kural_index', 'responses', 'signature')
+
+    def __init__(self, version, kural_index, responses, signature):
+        self.version = version
+        self.kural_index = kural_index
+        self.responses = responses
+        self.signature = signature
+
+
+class ContentRegistry:
+    """Holds the current ContentSnapshot and rebuilds it when the content files change"""
+
+    def __init__(self, database, responses, corpus_path=None, responses_path=None,
+                 poll_interval=POLL_INTERVAL):
+        self.database = database
+        self.default_responses = responses
+        self.corpus_path = corpus_path
+        self.responses_path = responses_path
+        self.poll_interval = poll_interval
+        self.reloads = 0
+        self.failures = 0
+        self._failed_signature = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # A broken file at startup is fatal; later ones keep the last good version
+        self.current = self._build(1)
+        os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def _signature(self):
+        return file_signature(self.corpus_path), file_signature(self.responses_path)
+
+    def _read(self):
+        """(corpus, responses, signature) read from files that did not change in between"""
+        for _ in range(READ_ATTEMPTS):
+            signature = self._signature()
+            # The corpus is mapped on open, so what was read stays fixed however long the build takes
+            corpus = load_corpus(self.database, self.corpus_path)
+            responses = load_responses(self.responses_path, self.default_responses)
+            if self._signature() == signature:
+                return corpus, responses, signature
+        raise RuntimeError('content files kept changing while being read')
+
+    def _build(self, version):
+        corpus, responses, signature = self._read()
+        kural_index = KuralIndex(corpus)
+        if not len(kural_index):
+            raise ValueError(f"{self.corpus_path} has no Kurals")
+        # Serialize the read-only payloads now rather than on the first request after the swap
+        for emotion in kural_index.emotions:
+            kural_index.emotion_payload(emotion)
+        return ContentSnapshot(version, kural_index, responses, signature)
+
+    def changed(self):
+        """Whether the files differ from the current snapshot and from the last failed attempt"""
+        signature = self._signature()
+        return signature != self.current.signature and signature != self._failed_signature
+
+    def reload(self):
+        """Build a snapshot from the files and swap it in; False (keeping the old one) on error"""
+        with self._reload_lock:
+            version = self.current.version + 1
+            try:
+                snapshot = self._build(version)
+            except Exception:
+                self.failures += 1
+                self._failed_signature = self._signature()
+                logger.exception('content reload failed', extra={'fields': {'version': version - 1}})
+                return False
+            self.current = snapshot
+            self.reloads += 1
+        logger.info('content reloaded', extra={'fields': {'version': version, 'kurals': len(snapshot.kural_index)}})
+        return True
+
+    def start(self):
+        """Watch the content files from a background thread; a no-op without any"""
+        if self.poll_interval <= 0 or not (self.corpus_path or self.responses_path):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='content-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _restart_in_child(self):
+        # The watcher does not survive fork (gunicorn --preload); each worker gets its own
+        if self._thread is not None and not self._stop.is_set():
+            self.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            if self.changed():
+                self.reload()
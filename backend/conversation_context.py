@@ -0,0 +1,140 @@
+"""
+Server-side chat session state: a rolling emotion trend and recently shown Kurals
+"""
+
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from emotions import EMOTIONS, NEUTRAL, emotion_distribution, top_emotion
+
+# Weight an earlier turn keeps each time a new message arrives
+TREND_DECAY = 0.6
+
+# Minimum decayed score for the trend to pick the emotion of a message without keywords
+TREND_THRESHOLD = 0.5
+
+# Kurals remembered per session so they are not shown again soon
+RECENT_KURALS = 12
+
+# Idle sessions expire after CHAT_SESSION_TTL seconds; beyond CHAT_MAX_SESSIONS
+# the least recently used are dropped
+SESSION_TTL = float(os.environ.get('CHAT_SESSION_TTL', '1800'))
+MAX_SESSIONS = int(os.environ.get('CHAT_MAX_SESSIONS', '100000'))
+
+# Longest client-supplied session token accepted
+MAX_SESSION_ID_LENGTH = 64
+
+
+class ConversationContext:
+    """Compact per-session state, a few hundred bytes regardless of conversation length"""
+
+    __slots__ = ('trend', 'recent', 'turns', 'expires', 'content_version')
+
+    def __init__(self):
+        self.trend = array('f', bytes(4 * len(EMOTIONS)))
+        self.recent = ()
+        self.turns = 0
+        self.expires = 0.0
+        # Corpus version the positions in `recent` refer to
+        self.content_version = None
+
+    def observe(self, distribution):
+        """Fold one message's emotion distribution into the decayed emotion trend"""
+        trend = self.trend
+        for slot, emotion in enumerate(EMOTIONS):
+            trend[slot] = trend[slot] * TREND_DECAY + distribution[emotion]
+        self.turns += 1
+
+    def trending_emotion(self):
+        """Emotion the conversation has been leaning towards, or general when there is none"""
+        best = max(range(len(self.trend)), key=self.trend.__getitem__)
+        return EMOTIONS[best] if self.trend[best] >= TREND_THRESHOLD else NEUTRAL
+
+    def emotion_for(self, message):
+        """Record a message and pick its emotion, following the trend when it has no keywords"""
+        return self.emotion_for_distribution(emotion_distribution(message))
+
+    def emotion_for_distribution(self, distribution):
+        """emotion_for with the message's emotion_distribution already computed"""
+        self.observe(distribution)
+        return self.trending_emotion() if distribution[NEUTRAL] else top_emotion(distribution)
+
+    def remember(self, position):
+        """Note a Kural as shown in this conversation"""
+        if position is not None:
+            # Oldest first without duplicates, so a repeat moves to the end
+            earlier = tuple(shown for shown in self.recent if shown != position)
+            self.recent = earlier[max(0, len(earlier) - RECENT_KURALS + 1):] + (position,)
+
+    def rebase(self, version):
+        """Move to a reloaded corpus, forgetting Kural positions that referred to the old one"""
+        if self.content_version != version:
+            if self.content_version is not None:
+                self.recent = ()
+            self.content_version = version
+
+    def seed(self, history, kural_index):
+        """Rebuild state from a client-sent history, for clients without a session token"""
+        for entry in history[-2 * RECENT_KURALS:]:
+            if not isinstance(entry, dict):
+                continue
+            if entry.get('type') == 'user' and isinstance(entry.get('message'), str):
+                self.observe(emotion_distribution(entry['message']))
+            self.remember(kural_index.position_of(entry.get('kural')))
+
+
+class ContextStore:
+    """Sessions in an LRU keyed by token; idle ones expire after `ttl` seconds"""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, ttl=SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.evicted = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, session_id):
+        """Return (context, created), starting a fresh context for unknown or expired tokens"""
+        now = time.monotonic()
+        with self._lock:
+            context = self._sessions.get(session_id)
+            created = context is None or context.expires <= now
+            if created:
+                context = self._sessions[session_id] = ConversationContext()
+            self._sessions.move_to_end(session_id)
+            context.expires = now + self.ttl
+            if created:
+                self._evict(now)
+        return context, created
+
+    def find(self, session_id):
+        """Return the live context for a token, refreshing its expiry, or None without starting one"""
+        now = time.monotonic()
+        with self._lock:
+            context = self._sessions.get(session_id)
+            if context is None or context.expires <= now:
+                return None
+            self._sessions.move_to_end(session_id)
+            context.expires = now + self.ttl
+        return context
+
+    def _evict(self, now):
+        # Least recently used first, which is also the earliest to expire
+        sessions = self._sessions
+        while sessions:
+            oldest = next(iter(sessions.values()))
+            if len(sessions) <= self.max_sessions and oldest.expires > now:
+                break
+            sessions.popitem(last=False)
+            self.evicted += 1
+
+
+def valid_session_id(session_id):
+    """Whether a client-sent session token is usable as a store key"""
+    return isinstance(session_id, str) and 0 < len(session_id) <= MAX_SESSION_ID_LENGTH
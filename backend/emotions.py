@@ -0,0 +1,196 @@
+"""
+Emotion detection for chat messages
+"""
+
+import string
+from array import array
+
+EMOTION_KEYWORDS = {
+    "joy": ["happy", "joy", "cheerful", "excited", "celebrate", "smile", "laugh"],
+    "sadness": ["sad", "depressed", "down", "blue", "cry", "tears", "grief", "mourn"],
+    "anger": ["angry", "mad", "furious", "rage", "irritated", "annoyed", "frustrated"],
+    "fear": ["afraid", "scared", "fear", "anxious", "worried", "nervous", "panic"],
+    "love": ["love", "adore", "cherish", "romance", "affection", "care", "devotion"],
+    "forgiveness": ["forgive", "forgiveness", "pardon", "excuse", "apologize", "sorry"],
+    "strength": ["strong", "power", "courage", "brave", "mighty", "resilient", "tough"],
+    "peace": ["peace", "calm", "serene", "tranquil", "quiet", "still", "harmony"],
+    "gratitude": ["grateful", "thankful", "appreciate", "blessed", "gratitude", "thanks"],
+    "hope": ["hope", "hopeful", "optimistic", "positive", "future", "dream", "aspire"]
+}
+
+# Extra words and non-default weights on top of EMOTION_KEYWORDS (whose words weigh 1.0);
+# weak or ambiguous words count for less, strong ones for more
+KEYWORD_WEIGHTS = {
+    "joy": {"happiness": 1.0, "glad": 0.8, "delighted": 1.5, "thrilled": 1.5, "ecstatic": 2.0, "smile": 0.7},
+    "sadness": {"sadness": 1.0, "unhappy": 1.0, "lonely": 1.0, "hurt": 0.8, "miserable": 1.5,
+                "heartbroken": 2.0, "hopeless": 1.2, "grief": 1.5, "down": 0.5, "blue": 0.5},
+    "anger": {"anger": 1.0, "hate": 1.2, "furious": 1.5, "rage": 1.5, "mad": 0.8, "irritated": 0.8,
+              "annoyed": 0.7},
+    "fear": {"fearful": 1.0, "terrified": 2.0, "panic": 1.5, "stressed": 0.8, "worried": 0.8, "worry": 0.8},
+    "love": {"loving": 1.0, "romance": 0.8, "care": 0.6},
+    "forgiveness": {"regret": 0.8, "sorry": 0.7, "excuse": 0.5},
+    "strength": {"determined": 1.0, "power": 0.7, "tough": 0.7},
+    "peace": {"peaceful": 1.0, "relaxed": 1.0, "quiet": 0.5, "still": 0.3},
+    "gratitude": {"thank": 1.0, "blessed": 0.8},
+    "hope": {"wish": 0.6, "dream": 0.7, "positive": 0.5, "future": 0.4},
+}
+
+# Words that cancel an emotion keyword up to NEGATION_WINDOW words after them
+# (apostrophes are dropped before lookup, so "don't" is "dont"); "never" followed by
+# an intensifier ("never been so happy") and any negation followed by a persistence
+# verb ("can't stop crying") intensify instead
+NEGATIONS = (
+    "not", "no", "never", "nor", "neither", "without", "hardly", "barely", "cannot",
+    "dont", "doesnt", "didnt", "isnt", "wasnt", "arent", "werent", "cant", "couldnt",
+    "wont", "wouldnt", "shouldnt", "havent", "hasnt", "aint",
+)
+NEGATION_WINDOW = 3
+
+# Words that scale an emotion keyword up to INTENSIFIER_WINDOW words after them
+INTENSIFIERS = {
+    "very": 1.5, "so": 1.5, "really": 1.5, "extremely": 2.0, "deeply": 1.5, "too": 1.3,
+    "totally": 1.5, "incredibly": 2.0, "truly": 1.5,
+    "slightly": 0.5, "somewhat": 0.5, "little": 0.6, "bit": 0.6, "kinda": 0.6,
+}
+INTENSIFIER_WINDOW = 2
+
+# Verbs that turn a negation before them into emphasis ("can't stop crying", "couldn't
+# help smiling"), scaling keywords up to PERSISTENCE_WINDOW words after them
+PERSISTENCE_VERBS = ("stop", "help", "quit")
+PERSISTENCE_FACTOR = 1.5
+PERSISTENCE_WINDOW = 3
+
+# Common English inflections accepted after a keyword ("laughing", "dreams", "sadness")
+_SUFFIXES = ("", "s", "es", "d", "ed", "ing", "ness", "ly")
+
+# Clause punctuation becomes a "," token that ends negation and intensifier windows;
+# apostrophes are dropped ("don't" -> "dont") and other punctuation splits words.
+# One-to-one translate then replace keeps tokenizing in C's fast paths
+CLAUSE_BREAK = ","
+_CLAUSE_MARKS = ".,;:!?"
+_OTHER_PUNCTUATION = "".join(mark for mark in string.punctuation if mark not in _CLAUSE_MARKS + "'")
+_TOKENIZE_TABLE = str.maketrans(
+    _CLAUSE_MARKS + _OTHER_PUNCTUATION,
+    CLAUSE_BREAK * len(_CLAUSE_MARKS) + " " * len(_OTHER_PUNCTUATION),
+    "'\u2019"
+)
+
+EMOTIONS = tuple(EMOTION_KEYWORDS)
+
+# Emotion of a message that names none; the whole distribution sits on it
+NEUTRAL = "general"
+_NEUTRAL_DISTRIBUTION = {**dict.fromkeys(EMOTIONS, 0.0), NEUTRAL: 1.0}
+
+_KEYWORD, _NEGATION, _INTENSIFIER, _PERSISTENCE, _BREAK = range(5)
+
+
+def tokenize(text):
+    """Lowercase words with clause punctuation kept as "," tokens"""
+    return text.lower().translate(_TOKENIZE_TABLE).replace(CLAUSE_BREAK, " , ").split()
+
+
+def _build_lexicon():
+    """Token -> id table plus arrays of each id's kind, emotion slot and weight"""
+    token_ids = {}
+    kinds = array('b')
+    emotion_slots = array('b')
+    weights = array('d')
+
+    def add(token, kind, slot=-1, weight=1.0):
+        if token not in token_ids:
+            token_ids[token] = len(kinds)
+            kinds.append(kind)
+            emotion_slots.append(slot)
+            weights.append(weight)
+
+    add(CLAUSE_BREAK, _BREAK)
+    for token in NEGATIONS:
+        add(token, _NEGATION)
+    for token, factor in INTENSIFIERS.items():
+        add(token, _INTENSIFIER, weight=factor)
+    for token in PERSISTENCE_VERBS:
+        add(token, _PERSISTENCE, weight=PERSISTENCE_FACTOR)
+    # Exact keywords first so an inflected form never shadows a real keyword
+    for suffix in _SUFFIXES:
+        for slot, emotion in enumerate(EMOTIONS):
+            words = dict.fromkeys(EMOTION_KEYWORDS[emotion], 1.0)
+            words.update(KEYWORD_WEIGHTS.get(emotion, {}))
+            for word, weight in words.items():
+                add(word + suffix, _KEYWORD, slot, weight)
+                if word.endswith("e") and suffix == "ing":
+                    # "smile" -> "smiling", "celebrate" -> "celebrating"
+                    add(word[:-1] + suffix, _KEYWORD, slot, weight)
+    return token_ids, kinds, emotion_slots, weights
+
+
+_TOKEN_IDS, _TOKEN_KINDS, _TOKEN_EMOTIONS, _TOKEN_WEIGHTS = _build_lexicon()
+_NEVER = _TOKEN_IDS["never"]
+_KEYWORDS = frozenset(token for token, token_id in _TOKEN_IDS.items() if _TOKEN_KINDS[token_id] == _KEYWORD)
+
+
+def score_emotions(text):
+    """Weighted keyword scores per emotion, with negated keywords dropped and intensifiers applied"""
+    tokens = tokenize(text)
+    # Most messages name no emotion at all; that check runs in C
+    if _KEYWORDS.isdisjoint(tokens):
+        return {}
+
+    token_ids = _TOKEN_IDS
+    kinds = _TOKEN_KINDS
+    totals = [0.0] * len(EMOTIONS)
+    negated_until = -1
+    negation = None
+    factor = 1.0
+    factor_until = -1
+    # Only lexicon tokens reach the loop; positions keep the window arithmetic exact
+    hits = [(position, token_ids[token]) for position, token in enumerate(tokens) if token in token_ids]
+    for position, token_id in hits:
+        kind = kinds[token_id]
+        if kind == _KEYWORD:
+            if position > negated_until:
+                weight = _TOKEN_WEIGHTS[token_id]
+                totals[_TOKEN_EMOTIONS[token_id]] += weight * factor if position <= factor_until else weight
+        elif kind == _NEGATION:
+            negated_until = position + NEGATION_WINDOW
+            negation = token_id
+        elif kind == _INTENSIFIER:
+            factor = _TOKEN_WEIGHTS[token_id]
+            factor_until = position + INTENSIFIER_WINDOW
+            if negation == _NEVER and position <= negated_until:
+                negated_until = -1
+        elif kind == _PERSISTENCE:
+            if position <= negated_until:
+                negated_until = -1
+                factor = _TOKEN_WEIGHTS[token_id]
+                factor_until = position + PERSISTENCE_WINDOW
+        else:
+            negated_until = factor_until = -1
+
+    return {EMOTIONS[slot]: total for slot, total in enumerate(totals) if total > 0}
+
+
+def emotion_distribution(text):
+    """Each emotion's share of the message's keyword weight, over every emotion plus NEUTRAL, summing to 1
+
+    A message without emotion keywords puts all of it on NEUTRAL.
+    """
+    scores = score_emotions(text)
+    if not scores:
+        return dict(_NEUTRAL_DISTRIBUTION)
+    total = sum(scores.values())
+    distribution = {emotion: scores.get(emotion, 0.0) / total for emotion in EMOTIONS}
+    distribution[NEUTRAL] = 0.0
+    return distribution
+
+
+def top_emotion(distribution):
+    """Emotion with the largest share, ties keeping the keyword table order, or NEUTRAL for a neutral message"""
+    if distribution[NEUTRAL]:
+        return NEUTRAL
+    # max keeps the first of equal shares, which is the keyword table order
+    return max(EMOTIONS, key=distribution.__getitem__)
+
+
+def get_emotion_from_text(text):
+    """Extract emotion from user input using keyword matching"""
+    return top_emotion(emotion_distribution(text))
@@ -0,0 +1,144 @@
+"""
+Running feedback analytics, updated once per submission
+"""
+
+import heapq
+import threading
+
+from rollups import TimeRollup, iso_time, wall_seconds
+
+
+VOTES = ('positive', 'negative')
+
+
+def helpfulness(item):
+    """Ranking score for a (Kural number, counts) pair: positive minus negative votes"""
+    counts = item[1]
+    return counts['positive'] - counts['negative']
+
+
+def vote_totals(positive, negative):
+    """Feedback totals and positive share, as the analytics endpoint reports them"""
+    total = positive + negative
+    return {
+        'total_feedback': total,
+        'positive_feedback': positive,
+        'negative_feedback': negative,
+        'feedback_rate': round((positive / total) * 100, 2) if total > 0 else 0
+    }
+
+
+class FeedbackAnalytics:
+    """Positive/negative totals and per-Kural vote counters, all-time and per time bucket"""
+
+    def __init__(self, rollup=None):
+        self._lock = threading.Lock()
+        self.total_feedback = 0
+        self.positive_feedback = 0
+        self.negative_feedback = 0
+        # Kural number -> {'positive': n, 'negative': n}, in order of first feedback
+        self.kural_feedback = {}
+        self._version = 0
+        self._top_cache = {}
+        # Rollup keys: the vote, plus (Kural number, vote) for feedback on a Kural
+        self.rollup = rollup or TimeRollup()
+        # Position in a feedback store shared with other workers (see refresh_from)
+        self._refresh_lock = threading.Lock()
+        self.cursor = 0
+
+    def record(self, kural_number, feedback, timestamp=None):
+        """Fold one 'positive' or 'negative' vote into the running totals
+
+        `kural_number` is the corpus number of the Kural voted on, or None when the
+        feedback names no Kural of the corpus; such votes only count in the totals.
+        """
+        if feedback not in VOTES:
+            raise ValueError(f"Invalid feedback type: {feedback!r}")
+        with self._lock:
+            self.total_feedback += 1
+            if feedback == 'positive':
+                self.positive_feedback += 1
+            else:
+                self.negative_feedback += 1
+            if kural_number is not None:
+                counts = self.kural_feedback.get(kural_number)
+                if counts is None:
+                    counts = self.kural_feedback[kural_number] = {'positive': 0, 'negative': 0}
+                counts[feedback] += 1
+            self._version += 1
+        keys = (feedback,) if kural_number is None else (feedback, (kural_number, feedback))
+        self.rollup.add(keys, wall_seconds(timestamp))
+
+    def refresh_from(self, store, number_of, listing=None):
+        """Fold in the records any worker wrote to a shared feedback store since the last refresh
+
+        `number_of` maps a record's Kural to its corpus number, or None, as record() expects.
+        The new records are also appended, in store order, to `listing` when given.
+        """
+        with self._refresh_lock:
+            self.cursor, records = store.changes(self.cursor)
+            for record in records:
+                self.record(number_of(record['kural']), record['feedback'], record.get('timestamp'))
+            if listing is not None:
+                listing.extend(records)
+
+    def _top_k(self, k):
+        """Top-k (Kural number, counts) pairs; caller must hold the lock"""
+        cached = self._top_cache.get(k)
+        if cached is not None and cached[0] == self._version:
+            return cached[1]
+
+        # Heap selection over distinct Kurals only, independent of feedback volume;
+        # nlargest keeps first-feedback order for ties, like a stable sort
+        top = [
+            (key, dict(counts))
+            for key, counts in heapq.nlargest(k, self.kural_feedback.items(), key=helpfulness)
+        ]
+        if len(self._top_cache) >= 8:
+            self._top_cache.clear()
+        self._top_cache[k] = (self._version, top)
+        return top
+
+    def snapshot(self, k=5):
+        """Return a consistent copy of the totals with the top-k Kurals"""
+        with self._lock:
+            return {
+                **vote_totals(self.positive_feedback, self.negative_feedback),
+                'most_helpful_kurals': self._top_k(k)
+            }
+
+    def window(self, since=None, until=None, granularity=None, k=5, kural_number=None):
+        """Totals over a time window (wall_seconds bounds) from the rollup, for every Kural or one by number
+
+        With `granularity` the totals cover the same whole buckets as the per-bucket points.
+        """
+        keys = ((kural_number, 'positive'), (kural_number, 'negative')) if kural_number is not None else ('positive', 'negative')
+        series = None
+        if granularity:
+            points, start, end = self.rollup.series(granularity, since, until, keys)
+            series = [
+                {'start': iso_time(bucket_start), **vote_totals(counts.get(keys[0], 0), counts.get(keys[1], 0))}
+                for bucket_start, _, counts in points
+                if counts
+            ]
+            since, until = start, end - 1
+        _, counts, start, end = self.rollup.query(since, until, keys if kural_number is not None else None)
+        analytics = vote_totals(counts.get(keys[0], 0), counts.get(keys[1], 0))
+        if kural_number is not None:
+            analytics['kural'] = kural_number
+        else:
+            # Per-Kural votes in the window, in order of first appearance for stable ties
+            kural_feedback = {}
+            for key, count in counts.items():
+                if isinstance(key, tuple):
+                    votes = kural_feedback.get(key[0])
+                    if votes is None:
+                        votes = kural_feedback[key[0]] = {'positive': 0, 'negative': 0}
+                    votes[key[1]] += count
+            analytics['most_helpful_kurals'] = heapq.nlargest(k, kural_feedback.items(), key=helpfulness)
+        analytics['from'] = iso_time(start)
+        analytics['to'] = iso_time(end)
+        if series is not None:
+            analytics['granularity'] = granularity
+            analytics['series'] = series
+        return analytics
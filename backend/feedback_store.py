@@ -0,0 +1,286 @@
+"""
+Write-behind persistence for feedback submissions
+
+Requests only enqueue a record; a background thread writes them to SQLite or
+an append-only JSONL file in batches, so a slow disk never delays the response.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from structured_logging import LOGGER_NAME
+
+# Records waiting to be written; a full queue pushes back on submitters
+QUEUE_SIZE = 10000
+
+# A batch is written once it holds this many records or has waited this long
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.5
+
+# How long a submitter waits for queue space before being turned away
+PUT_TIMEOUT = 0.05
+
+# Longest shutdown waits for the queue to be written out
+CLOSE_TIMEOUT = 30
+
+# Errors a retry cannot fix: the records themselves cannot be stored
+PERMANENT_ERRORS = (sqlite3.InterfaceError, sqlite3.ProgrammingError, TypeError, ValueError)
+
+logger = logging.getLogger(LOGGER_NAME)
+
+_STOP = object()
+
+
+class SQLiteFeedbackStore:
+    """Feedback records in an SQLite table, one transaction per batch"""
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = None
+        self._pid = None
+        self._local = threading.local()
+        connection = self._connect()
+        with connection:
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS feedback_responses (
+                    feedback_id TEXT PRIMARY KEY,
+                    user_message TEXT,
+                    bot_response TEXT,
+                    kural TEXT,
+                    feedback TEXT NOT NULL,
+                    timestamp TEXT
+                )
+            ''')
+        connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def write_batch(self, records):
+        # Only the writer thread gets here; reopen after a fork rather than share the parent's handle
+        if self._pid != os.getpid():
+            self._connection = self._connect()
+            self._pid = os.getpid()
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO feedback_responses VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    (
+                        record['feedback_id'],
+                        record['user_message'],
+                        record['bot_response'],
+                        json.dumps(record['kural'], ensure_ascii=False),
+                        record['feedback'],
+                        record['timestamp'],
+                    )
+                    for record in records
+                )
+            )
+
+    @staticmethod
+    def _from_row(row):
+        feedback_id, user_message, bot_response, kural, feedback, timestamp = row
+        return {
+            'feedback_id': feedback_id,
+            'user_message': user_message,
+            'bot_response': bot_response,
+            'kural': json.loads(kural) if kural else {},
+            'feedback': feedback,
+            'timestamp': timestamp
+        }
+
+    def load(self):
+        """Every stored record, oldest first"""
+        connection = self._connect()
+        try:
+            rows = connection.execute('SELECT * FROM feedback_responses ORDER BY rowid').fetchall()
+        finally:
+            connection.close()
+        return [self._from_row(row) for row in rows]
+
+    def changes(self, cursor=0):
+        """(cursor, records) for the records any worker wrote after rowid `cursor`, oldest first"""
+        # One reading connection per thread, reopened after a fork like the writer's
+        reader = getattr(self._local, 'reader', None)
+        if reader is None or reader[0] != os.getpid():
+            reader = self._local.reader = (os.getpid(), self._connect())
+        rows = reader[1].execute(
+            'SELECT rowid, * FROM feedback_responses WHERE rowid > ? ORDER BY rowid', (cursor,)
+        ).fetchall()
+        return (rows[-1][0] if rows else cursor), [self._from_row(row[1:]) for row in rows]
+
+
+class JSONLFeedbackStore:
+    """Feedback records appended to a JSON-lines file, one write() per batch"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._pid = None
+
+    def write_batch(self, records):
+        if self._pid != os.getpid():
+            # O_APPEND keeps whole-batch writes from different workers from overwriting each other
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        lines = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        os.write(self._fd, lines.encode('utf-8'))
+
+    def load(self):
+        """Every stored record, oldest first; a torn last line from a crash is skipped"""
+        if not os.path.exists(self.path):
+            return []
+        records = []
+        with open(self.path, encoding='utf-8') as segment:
+            for line in segment:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning('skipping unreadable feedback line', extra={'fields': {'path': self.path}})
+        return records
+
+    def changes(self, cursor=0):
+        """(cursor, records) for the lines any worker appended after byte offset `cursor`, oldest first"""
+        if not os.path.exists(self.path):
+            return cursor, []
+        with open(self.path, 'rb') as segment:
+            segment.seek(cursor)
+            data = segment.read()
+        # A batch still being appended ends without a newline; it is read on a later call
+        data = data[:data.rfind(b'\n') + 1]
+        records = []
+        for line in data.splitlines():
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning('skipping unreadable feedback line', extra={'fields': {'path': self.path}})
+        return cursor + len(data), records
+
+
+class WriteBehindWriter:
+    """Bounded queue drained in batches by a background thread"""
+
+    def __init__(self, store, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, put_timeout=PUT_TIMEOUT):
+        self.store = store
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.written = 0
+        self.rejected = 0
+        self.dead_lettered = 0
+        self._closed = False
+        self._start()
+        atexit.register(self.close)
+        os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def _start(self):
+        self._queue = queue.Queue(self.queue_size)
+        self._thread = threading.Thread(target=self._run, name='feedback-writer', daemon=True)
+        self._thread.start()
+
+    def _restart_in_child(self):
+        # The writer thread does not survive fork (gunicorn --preload); each worker gets its own
+        if not self._closed:
+            self._start()
+
+    def submit(self, record):
+        """Queue a record for writing; False when the queue stayed full for put_timeout"""
+        try:
+            self._queue.put(record, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            self.rejected += 1
+            return False
+
+    def _next_batch(self):
+        """Block for one record, then collect more until the batch is full or the window closes
+
+        Returns (batch, stop) where stop means close() was called and nothing follows the batch.
+        """
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, batch):
+        while True:
+            try:
+                self.store.write_batch(batch)
+                self.written += len(batch)
+                return
+            except PERMANENT_ERRORS as e:
+                error = e
+                break
+            except Exception:
+                # Keep the batch and retry; meanwhile the queue fills and submitters back off
+                logger.exception('feedback batch write failed', extra={'fields': {'batch_size': len(batch)}})
+                time.sleep(self.flush_interval)
+        self._split(batch, error)
+
+    def _split(self, batch, error):
+        """Write the halves of a batch holding unstorable records; those alone are dead-lettered"""
+        if len(batch) > 1:
+            middle = len(batch) // 2
+            self._write(batch[:middle])
+            self._write(batch[middle:])
+            return
+        # The log line is the dead-letter copy, so the record can still be recovered
+        self.dead_lettered += 1
+        logger.error('feedback record cannot be stored', extra={'fields': {'record': repr(batch[0]), 'error': str(error)}})
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                self._write(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        self._queue.join()
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """Write out the queue and stop the thread; safe to call more than once"""
+        self._closed = True
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                logger.error('feedback writer did not drain before shutdown')
+                return
+            self._thread.join(timeout)
+
+
+def create_feedback_store(url=None):
+    """Build a feedback store from 'sqlite:///path' or 'jsonl:///path', or None for memory only"""
+    if not url or url == 'memory://':
+        return None
+    if url.startswith('sqlite:///'):
+        return SQLiteFeedbackStore(url[len('sqlite:///'):])
+    if url.startswith('jsonl:///'):
+        return JSONLFeedbackStore(url[len('jsonl:///'):])
+    raise ValueError(f"Unsupported feedback store URL: {url}")
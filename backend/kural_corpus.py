@@ -0,0 +1,213 @@
+"""
+Kural corpus sources: the built-in dict database and a memory-mapped binary file
+
+Binary layout (little-endian, sections padded to 4 bytes):
+
+    magic        8 bytes  b'KURALDB1'
+    count        uint32   number of Kurals
+    field_count  uint32   number of string columns
+    field names  field_count x (uint32 length + UTF-8 bytes)
+    numbers      count x uint32   Kural numbers
+    per column   (count + 1) x uint32 offsets, then the UTF-8 blob they index
+
+Only the offset tables are touched at load time; a Kural dict is decoded from
+the shared pages the first time it is requested.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+MAGIC = b'KURALDB1'
+
+# String columns written by write_corpus, in file order
+STRING_FIELDS = (
+    'tamil', 'english', 'relevance', 'category', 'emotion',
+    'chapter', 'section', 'translations'
+)
+
+# Columns that only exist in the full corpus and are omitted from responses when empty
+OPTIONAL_FIELDS = ('chapter', 'section', 'translations')
+
+_UINT32 = struct.Struct('<I')
+
+
+def _pad(length):
+    return (-length) % 4
+
+
+class DictCorpus:
+    """Corpus backed by an emotion -> list of Kural dicts database"""
+
+    def __init__(self, database):
+        kurals = []
+        records = []
+        emotions = []
+        categories = []
+        for emotion, emotion_kurals in database.items():
+            for kural in emotion_kurals:
+                record = dict(kural)
+                record['emotion'] = emotion
+                kurals.append(kural)
+                records.append(record)
+                emotions.append(emotion)
+                categories.append(kural.get('category'))
+
+        self._kurals = tuple(kurals)
+        self._records = tuple(records)
+        self.emotion_column = tuple(emotions)
+        self.category_column = tuple(categories)
+
+    def __len__(self):
+        return len(self._kurals)
+
+    def kural(self, position):
+        """Kural dict as returned by the chat endpoint"""
+        return self._kurals[position]
+
+    def field(self, position, name):
+        """One text field of a Kural"""
+        return self._kurals[position].get(name)
+
+    def number(self, position):
+        """Kural number, or the 1-based position for Kurals without one (as write_corpus stores them)"""
+        return self._kurals[position].get('number') or position + 1
+
+    def record(self, position):
+        """Kural dict with its emotion attached, as returned by /api/random"""
+        return self._records[position]
+
+
+class MappedCorpus:
+    """Corpus read from a binary file through a shared, read-only mmap"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as corpus_file:
+            self._map = mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = memoryview(self._map)
+        if self._map[:8] != MAGIC:
+            raise ValueError(f"{path} is not a Kural corpus file")
+        count, field_count = struct.unpack_from('<II', self._map, 8)
+        position = 16
+
+        fields = []
+        for _ in range(field_count):
+            (length,) = _UINT32.unpack_from(self._map, position)
+            position += 4
+            fields.append(self._map[position:position + length].decode('utf-8'))
+            position += length + _pad(length)
+
+        self._count = count
+        self._numbers = buffer[position:position + 4 * count].cast('I')
+        position += 4 * count
+
+        # field -> (offset table, blob start)
+        self._columns = {}
+        for field in fields:
+            offsets = buffer[position:position + 4 * (count + 1)].cast('I')
+            position += 4 * (count + 1)
+            self._columns[field] = (offsets, position)
+            blob_length = offsets[count]
+            position += blob_length + _pad(blob_length)
+
+        self.emotion_column = tuple(self._column_values('emotion'))
+        self.category_column = tuple(self._column_values('category'))
+
+        self._kurals = [None] * count
+        self._records = [None] * count
+
+    def __len__(self):
+        return self._count
+
+    def _string(self, field, position):
+        column = self._columns.get(field)
+        if column is None:
+            return ''
+        offsets, start = column
+        return self._map[start + offsets[position]:start + offsets[position + 1]].decode('utf-8')
+
+    def field(self, position, name):
+        """One text field of a Kural, decoded without materializing the whole dict"""
+        return self._string(name, position)
+
+    def _column_values(self, field):
+        return [self._string(field, position) or None for position in range(self._count)]
+
+    def number(self, position):
+        """Kural number"""
+        return self._numbers[position]
+
+    def kural(self, position):
+        """Kural dict as returned by the chat endpoint, decoded on first use"""
+        kural = self._kurals[position]
+        if kural is None:
+            kural = {'number': self._numbers[position]}
+            for field in STRING_FIELDS:
+                if field == 'emotion':
+                    continue
+                value = self._string(field, position)
+                if field == 'translations':
+                    if value:
+                        kural[field] = json.loads(value)
+                elif value or field not in OPTIONAL_FIELDS:
+                    kural[field] = value
+            self._kurals[position] = kural
+        return kural
+
+    def record(self, position):
+        """Kural dict with its emotion attached, as returned by /api/random"""
+        record = self._records[position]
+        if record is None:
+            record = dict(self.kural(position))
+            record['emotion'] = self.emotion_column[position]
+            self._records[position] = record
+        return record
+
+
+def write_corpus(kurals, path):
+    """Write an iterable of Kural dicts to the binary corpus format
+
+    The file is written next to `path` and renamed over it, so running servers
+    (which map the file and reload it when it changes) never see a partial corpus.
+    """
+    kurals = list(kurals)
+    count = len(kurals)
+
+    def encode(kural, field):
+        value = kural.get(field)
+        if value is None:
+            return b''
+        if field == 'translations':
+            return json.dumps(value, ensure_ascii=False, sort_keys=True).encode('utf-8') if value else b''
+        return str(value).encode('utf-8')
+
+    partial_path = f'{path}.{os.getpid()}.tmp'
+    with open(partial_path, 'wb') as corpus_file:
+        corpus_file.write(MAGIC)
+        corpus_file.write(struct.pack('<II', count, len(STRING_FIELDS)))
+        for field in STRING_FIELDS:
+            name = field.encode('utf-8')
+            corpus_file.write(_UINT32.pack(len(name)) + name + b'\0' * _pad(len(name)))
+
+        numbers = [int(kural.get('number') or position + 1) for position, kural in enumerate(kurals)]
+        corpus_file.write(struct.pack(f'<{count}I', *numbers))
+
+        for field in STRING_FIELDS:
+            values = [encode(kural, field) for kural in kurals]
+            offsets = [0]
+            for value in values:
+                offsets.append(offsets[-1] + len(value))
+            blob = b''.join(values)
+            corpus_file.write(struct.pack(f'<{count + 1}I', *offsets))
+            corpus_file.write(blob + b'\0' * _pad(len(blob)))
+    os.replace(partial_path, path)
+
+
+def load_corpus(database, path=None):
+    """Open the binary corpus at `path`, or wrap the built-in database"""
+    if path:
+        return MappedCorpus(path)
+    return DictCorpus(database)
@@ -0,0 +1,144 @@
+"""
+Precomputed lookup structures over the Kural corpus
+"""
+
+import random
+import threading
+
+import numpy as np
+
+from kural_retrieval import KuralRetriever
+from kural_search import SearchIndex
+from payload_cache import CachedPayload
+
+# Fewer messages than this are ranked one search() at a time, which is faster for them
+MIN_BATCH = 8
+
+
+class KuralIndex:
+    """Immutable position index over a Kural corpus, built once per corpus"""
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        positions = tuple(range(len(corpus)))
+        by_emotion = {}
+        by_category = {}
+
+        for position in positions:
+            emotion = corpus.emotion_column[position]
+            if emotion:
+                by_emotion.setdefault(emotion, []).append(position)
+            by_category.setdefault(corpus.category_column[position], []).append(position)
+
+        # Kural positions, so picks stay O(1) and only the chosen Kural is materialized
+        self.positions = positions
+        self.by_emotion = {emotion: tuple(items) for emotion, items in by_emotion.items()}
+        self.by_category = {category: tuple(items) for category, items in by_category.items()}
+        self.emotions = tuple(by_emotion)
+        # Tamil text -> position, to recognise Kurals echoed back in a client's chat history
+        self._position_by_tamil = {}
+        for position in positions:
+            self._position_by_tamil.setdefault(corpus.field(position, 'tamil'), position)
+        # Kural number -> position; numbers identify Kurals across corpus reloads
+        self._position_by_number = {}
+        for position in positions:
+            self._position_by_number.setdefault(corpus.number(position), position)
+        self.search_index = SearchIndex(corpus)
+        self.retriever = KuralRetriever(corpus)
+        self._emotion_masks = {}
+        for emotion, items in self.by_emotion.items():
+            mask = np.zeros(len(positions), dtype=bool)
+            mask[list(items)] = True
+            self._emotion_masks[emotion] = mask
+
+        # Read-only endpoint bodies, serialized once per corpus (per emotion on first use)
+        self.emotions_payload = CachedPayload({'emotions': list(self.emotions)})
+        self._emotion_payloads = {}
+        self._payload_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.positions)
+
+    def random_kural(self):
+        """Pick a Kural from the whole corpus"""
+        return self.corpus.kural(random.choice(self.positions))
+
+    def random_record(self):
+        """Pick a Kural from the whole corpus with its emotion attached"""
+        return self.corpus.record(random.choice(self.positions))
+
+    def random_position(self, emotion=None, exclude=()):
+        """Random position for an emotion (or the whole corpus), avoiding the `exclude` sequence"""
+        positions = self.by_emotion.get(emotion) or self.positions
+        # A few tries are enough while the excluded Kurals are a small part of the bucket
+        for _ in range(8):
+            position = random.choice(positions)
+            if position not in exclude:
+                return position
+        fresh = [position for position in positions if position not in exclude]
+        if fresh:
+            return random.choice(fresh)
+        # Everything here was shown recently (exclude is oldest first): repeat the oldest
+        return min(positions, key=list(exclude).index)
+
+    def matches_for_message(self, message, emotion=None, k=3):
+        """Top-k (position, score) retrieval matches for a message, within its emotion when known"""
+        return self.retriever.search(message, k, self._emotion_masks.get(emotion))
+
+    def pick_position(self, matches, emotion=None, exclude=(), candidates=3):
+        """Random pick among the best `candidates` matches not in `exclude`, else from the emotion bucket"""
+        fresh = [position for position, _ in matches if position not in exclude][:candidates]
+        if fresh:
+            return random.choice(fresh)
+        return self.random_position(emotion, exclude)
+
+    def position_of(self, kural):
+        """Position of a Kural dict by its Tamil text, or None"""
+        tamil = kural.get('tamil') if isinstance(kural, dict) else None
+        if not isinstance(tamil, str):
+            return None
+        return self._position_by_tamil.get(tamil)
+
+    def number_of(self, kural):
+        """Number of a Kural dict by its Tamil text, or None for one not in the corpus"""
+        position = self.position_of(kural)
+        return None if position is None else self.corpus.number(position)
+
+    def by_number(self, number):
+        """Kural dict with a given number, or None"""
+        position = self._position_by_number.get(number)
+        return None if position is None else self.corpus.kural(position)
+
+    def matches_for_messages(self, messages, emotions, k=3):
+        """matches_for_message for a batch, scored together once it is large enough to pay off"""
+        if len(messages) < MIN_BATCH:
+            return [self.matches_for_message(message, emotion, k) for message, emotion in zip(messages, emotions)]
+        masks = [self._emotion_masks.get(emotion) for emotion in emotions]
+        return self.retriever.search_batch(messages, k, masks)
+
+    def kurals_for_emotion(self, emotion):
+        """All Kurals tagged with an emotion"""
+        return [self.corpus.kural(position) for position in self.by_emotion.get(emotion, ())]
+
+    def emotion_payload(self, emotion):
+        """Serialized /api/kurals/<emotion> body, or None for an unknown emotion"""
+        payload = self._emotion_payloads.get(emotion)
+        if payload is None and emotion in self.by_emotion:
+            with self._payload_lock:
+                payload = self._emotion_payloads.get(emotion)
+                if payload is None:
+                    payload = CachedPayload({'emotion': emotion, 'kurals': self.kurals_for_emotion(emotion)})
+                    self._emotion_payloads[emotion] = payload
+        return payload
+
+    def search(self, query, k=10, emotion=None):
+        """Top-k BM25 matches as (record, score) pairs, optionally within one emotion"""
+        if emotion is None:
+            matches = self.search_index.search(query, k)
+        else:
+            allowed = set(self.by_emotion.get(emotion, ()))
+            matches = [
+                match for match in self.search_index.search(query, len(self.positions))
+                if match[0] in allowed
+            ][:k]
+        return [(self.corpus.record(position), score) for position, score in matches]
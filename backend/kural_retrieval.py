@@ -0,0 +1,150 @@
+"""
+Hashed TF-IDF retrieval: rank Kurals against chat messages with NumPy
+"""
+
+import itertools
+import zlib
+
+import numpy as np
+
+from kural_search import SEARCH_FIELDS, tokenize
+
+# Width of the hashed feature space; the Kural matrix is len(corpus) x N_FEATURES float32
+N_FEATURES = 1 << 12
+
+# Messages scored together by search_batch; bounds the dense score block to a few MB
+SCORE_CHUNK = 256
+
+
+def _features(text):
+    """Hashed unigram and bigram feature ids for a piece of text"""
+    terms = tokenize(text)
+    grams = terms + [f"{first} {second}" for first, second in zip(terms, terms[1:])]
+    # crc32 rather than hash() so feature ids are the same in every worker process
+    return [zlib.crc32(gram.encode('utf-8')) & (N_FEATURES - 1) for gram in grams]
+
+
+def _term_counts(feature_ids):
+    ids, counts = np.unique(np.asarray(feature_ids, dtype=np.int64), return_counts=True)
+    # Sublinear term frequency so repeated words do not dominate
+    return ids, 1.0 + np.log(counts)
+
+
+class KuralRetriever:
+    """L2-normalized TF-IDF vectors of every Kural, scored with one matrix product"""
+
+    def __init__(self, corpus):
+        count = len(corpus)
+        matrix = np.zeros((count, N_FEATURES), dtype=np.float32)
+        for position in range(count):
+            text = " ".join(corpus.field(position, field) or '' for field in SEARCH_FIELDS)
+            feature_ids = _features(text)
+            if feature_ids:
+                ids, weights = _term_counts(feature_ids)
+                matrix[position, ids] = weights
+
+        document_frequency = np.count_nonzero(matrix, axis=0)
+        self.idf = (np.log((1.0 + count) / (1.0 + document_frequency)) + 1.0).astype(np.float32)
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        # Stored feature-major so a single query only gathers the rows of its own terms
+        self.matrix = np.ascontiguousarray(matrix.T)
+        # The same matrix as CSR postings (feature -> Kurals containing it, with their weights)
+        # for batches, whose cost then follows the Kurals their terms actually occur in
+        features, positions = np.nonzero(self.matrix)
+        self.postings_start = np.searchsorted(features, np.arange(N_FEATURES + 1)).astype(np.int64)
+        self.postings = positions.astype(np.int64)
+        self.postings_weight = self.matrix[features, positions]
+
+    def _query(self, message):
+        """Sparse (feature ids, normalized weights) for one message"""
+        feature_ids = _features(message)
+        if not feature_ids:
+            return None, None
+        ids, weights = _term_counts(feature_ids)
+        weights = weights.astype(np.float32) * self.idf[ids]
+        return ids, weights / np.linalg.norm(weights)
+
+    def _queries(self, messages):
+        """Sparse queries for a batch as parallel (message row, feature id, normalized weight) arrays"""
+        features = [_features(message) for message in messages]
+        lengths = np.fromiter(map(len, features), dtype=np.int64, count=len(features))
+        rows = np.repeat(np.arange(len(messages), dtype=np.int64), lengths)
+        feature_ids = np.fromiter(itertools.chain.from_iterable(features), dtype=np.int64, count=int(lengths.sum()))
+        # One unique over (row, feature) keys counts the terms of every message at once
+        keys, counts = np.unique(rows * N_FEATURES + feature_ids, return_counts=True)
+        rows, ids = np.divmod(keys, N_FEATURES)
+        weights = (1.0 + np.log(counts)).astype(np.float32) * self.idf[ids]
+        norms = np.sqrt(np.bincount(rows, weights * weights, minlength=len(messages))).astype(np.float32)
+        return rows, ids, weights / norms[rows]
+
+    def score(self, messages):
+        """Cosine similarity of every message against every Kural (messages x Kurals)
+
+        Sparse on both sides: each query term adds its weight times the postings of
+        that feature, and one bincount sums them per (message, Kural).
+        """
+        count = self.matrix.shape[1]
+        rows, ids, weights = self._queries(messages)
+        starts = self.postings_start[ids]
+        lengths = self.postings_start[ids + 1] - starts
+        # Indexes into the postings arrays for every (query term, Kural) pair
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(int(lengths.sum()))
+        scores = np.bincount(
+            np.repeat(rows, lengths) * count + self.postings[offsets],
+            weights=self.postings_weight[offsets] * np.repeat(weights, lengths),
+            minlength=len(messages) * count
+        )
+        return scores.reshape(len(messages), count)
+
+    def top_k(self, scores, k=5, mask=None):
+        """(position, score) pairs with positive scores, best first, for one score row"""
+        if mask is not None:
+            scores = np.where(mask, scores, 0.0)
+        k = min(k, scores.shape[0])
+        if k == 0:
+            return []
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(position), float(scores[position])) for position in candidates if scores[position] > 0]
+
+    def search(self, message, k=5, mask=None):
+        """Top-k Kurals for a single message"""
+        ids, weights = self._query(message)
+        if ids is None:
+            return []
+        return self.top_k(weights @ self.matrix[ids], k, mask)
+
+    def search_batch(self, messages, k=5, masks=None):
+        """Top-k Kurals for each message, scored SCORE_CHUNK messages at a time"""
+        results = []
+        for offset in range(0, len(messages), SCORE_CHUNK):
+            chunk_masks = None if masks is None else masks[offset:offset + SCORE_CHUNK]
+            results.extend(self._search_chunk(messages[offset:offset + SCORE_CHUNK], k, chunk_masks))
+        return results
+
+    def _search_chunk(self, messages, k, masks):
+        scores = self.score(messages)
+        if masks is not None:
+            # Masks are shared per emotion, so apply each one to all of its rows at once
+            rows_by_mask = {}
+            for row, mask in enumerate(masks):
+                if mask is not None:
+                    rows_by_mask.setdefault(id(mask), (mask, []))[1].append(row)
+            for mask, rows in rows_by_mask.values():
+                scores[rows] *= mask
+
+        k = min(k, scores.shape[1])
+        if k == 0:
+            return [[] for _ in messages]
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        candidates = np.take_along_axis(candidates, order, axis=1).tolist()
+        candidate_scores = np.take_along_axis(candidate_scores, order, axis=1).tolist()
+        return [
+            [(position, score) for position, score in zip(row_positions, row_scores) if score > 0]
+            for row_positions, row_scores in zip(candidates, candidate_scores)
+        ]
@@ -0,0 +1,108 @@
+"""
+BM25 full-text search over Kural text, built once per corpus
+"""
+
+import heapq
+import math
+import re
+
+# Latin words, or runs of the Tamil block (U+0B80-U+0BFF) including its vowel
+# signs and virama, which str.isalnum() and therefore \w do not treat as letters
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[\u0b80-\u0bff]+")
+
+# Fields searched, with their weight in the term frequency
+SEARCH_FIELDS = {
+    'tamil': 1.0,
+    'english': 1.0,
+    'relevance': 0.5
+}
+
+ENGLISH_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "its", "of", "on", "or", "that", "the", "to", "was", "we", "with", "i", "my"
+})
+
+# Common Tamil case markers and plural/clitic endings, longest first
+TAMIL_SUFFIXES = (
+    "களுக்கு", "களின்", "களை", "களில்", "கள்",
+    "த்தின்", "த்தை", "த்தில்", "த்து",
+    "க்கு", "ுக்கு", "ின்", "ில்", "ால்", "ும்", "ோடு",
+    "ை", "ு", "ே", "ா"
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _stem_tamil(token):
+    for suffix in TAMIL_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            return token[:-len(suffix)]
+    return token
+
+
+def _stem_english(token):
+    for suffix in ("ness", "ing", "ed", "es", "s"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+    # "forgive", "forgiving" and "forgiveness" share one stem
+    if token.endswith("e") and len(token) >= 4:
+        token = token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Split text into normalized search terms (stemmed Tamil and English words)"""
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if '\u0b80' <= token[0] <= '\u0bff':
+            terms.append(_stem_tamil(token))
+        elif token not in ENGLISH_STOPWORDS:
+            terms.append(_stem_english(token))
+    return terms
+
+
+class SearchIndex:
+    """Inverted index whose postings hold precomputed BM25 term weights"""
+
+    def __init__(self, corpus):
+        count = len(corpus)
+        frequencies = []
+        lengths = []
+        for position in range(count):
+            weights = {}
+            length = 0.0
+            for field, boost in SEARCH_FIELDS.items():
+                for term in tokenize(corpus.field(position, field) or ''):
+                    weights[term] = weights.get(term, 0.0) + boost
+                    length += boost
+            frequencies.append(weights)
+            lengths.append(length)
+
+        average_length = (sum(lengths) / count) if count else 0.0
+        document_frequency = {}
+        for weights in frequencies:
+            for term in weights:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+
+        # Corpus statistics are fixed per index, so each (term, Kural) score is
+        # computed here and a query only has to add them up
+        postings = {}
+        for position, weights in enumerate(frequencies):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[position] / average_length) if average_length else BM25_K1
+            for term, tf in weights.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                postings.setdefault(term, []).append((position, idf * tf * (BM25_K1 + 1) / (tf + norm)))
+
+        self.postings = {term: tuple(entries) for term, entries in postings.items()}
+        self.size = count
+
+    def search(self, query, k=10):
+        """Return up to k (position, score) pairs, best first"""
+        scores = {}
+        for term in set(tokenize(query)):
+            for position, weight in self.postings.get(term, ()):
+                scores[position] = scores.get(position, 0.0) + weight
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
@@ -0,0 +1,90 @@
+"""
+Memoized analysis of repeated chat messages ("hi", "I feel sad", suggestion chips)
+
+Only the deterministic work is cached: greeting check, emotion distribution and
+the ranked Kural candidates. The Kural and reply template are still picked at
+random from the cached candidates on every request.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from emotions import CLAUSE_BREAK, tokenize
+from metrics import metrics
+
+# Entries kept, and how long one may be reused before it is recomputed
+MAX_ENTRIES = int(os.environ.get('CHAT_CACHE_SIZE', '10000'))
+TTL = float(os.environ.get('CHAT_CACHE_TTL', '3600'))
+
+# Longer messages are rarely repeated, so they are analyzed without being cached
+MAX_MESSAGE_LENGTH = 200
+
+def normalize_message(text):
+    """Cache key for a message: its emotion tokens, single-spaced, without trailing punctuation"""
+    tokens = tokenize(text)
+    while tokens and tokens[-1] == CLAUSE_BREAK:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+class AnalyzedMessage:
+    """What a message maps to, independent of who sent it"""
+
+    __slots__ = ('text', 'greeting', 'distribution', 'matches', 'expires')
+
+    def __init__(self, text, greeting, distribution, expires):
+        self.text = text
+        self.greeting = greeting
+        self.distribution = distribution
+        # (content version, emotion or None) -> ranked (position, score) candidates, filled on first use
+        self.matches = {}
+        self.expires = expires
+
+
+class MessageCache:
+    """LRU of AnalyzedMessage by normalized text, with a TTL and hit/miss counters"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached entry for a normalized message, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.inc('thirukkural_chat_cache_total', (('result', 'hit'),))
+                return entry
+            self.misses += 1
+        metrics.inc('thirukkural_chat_cache_total', (('result', 'miss'),))
+        return None
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def analyze(self, message, compute):
+        """Cached analysis of a message, built with compute(normalized_message, expires) on a miss"""
+        # Hits and misses both analyze the normalized text, so a hit answers exactly like a miss
+        key = normalize_message(message)
+        if len(key) > MAX_MESSAGE_LENGTH:
+            return compute(key, 0.0)
+        entry = self.get(key)
+        if entry is None:
+            entry = compute(key, time.monotonic() + self.ttl)
+            self.put(key, entry)
+        return entry
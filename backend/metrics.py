@@ -0,0 +1,170 @@
+"""
+In-process request metrics with Prometheus text exposition
+
+Each thread records into its own shard, so the request path takes no locks;
+shards are only summed when /api/metrics is scraped. When a thread exits its
+shard is folded into a running total, so short-lived threads do not pile up.
+"""
+
+import bisect
+import functools
+import threading
+import time
+import weakref
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+METRIC_HELP = {
+    'thirukkural_http_requests_total': ('counter', 'HTTP requests by endpoint, method and status'),
+    'thirukkural_http_errors_total': ('counter', 'HTTP requests answered with a 5xx status'),
+    'thirukkural_http_request_duration_seconds': ('histogram', 'Time spent handling a request'),
+    'thirukkural_http_response_bytes': ('histogram', 'Response body size'),
+    'thirukkural_http_request_bytes': ('histogram', 'Request body size'),
+    'thirukkural_function_duration_seconds': ('histogram', 'Time spent in hot-path functions'),
+    'thirukkural_chat_cache_total': ('counter', 'Chat message analysis cache lookups by result'),
+    'thirukkural_rate_limited_total': ('counter', 'Write requests refused by the rate limiter, by endpoint'),
+}
+
+
+class _Shard:
+    __slots__ = ('counters', 'histograms')
+
+    def __init__(self):
+        self.counters = {}
+        # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self.histograms = {}
+
+
+class _ThreadToken:
+    """Lives in a thread's local storage only, so it is collected when the thread exits"""
+    __slots__ = ('__weakref__',)
+
+
+def _merge(counters, histograms, shard):
+    """Add a shard's counts into counter and histogram totals"""
+    for key, value in list(shard.counters.items()):
+        counters[key] = counters.get(key, 0) + value
+    for key, series in list(shard.histograms.items()):
+        total = histograms.get(key)
+        if total is None:
+            histograms[key] = list(series)
+        else:
+            for index, value in enumerate(series):
+                total[index] += value
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by (metric name, label tuple)"""
+
+    def __init__(self):
+        self._local = threading.local()
+        # Shards of live threads, plus the folded totals of threads that have exited
+        self._shards = set()
+        self._retired = _Shard()
+        # Shards whose thread has exited, waiting to be folded into _retired; appends need no lock
+        self._exited = []
+        self._shards_lock = threading.Lock()
+        self._buckets = {}
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            token = self._local.token = _ThreadToken()
+            weakref.finalize(token, self._exited.append, shard)
+            with self._shards_lock:
+                self._fold_exited()
+                self._shards.add(shard)
+        return shard
+
+    def _fold_exited(self):
+        """Fold the shards of exited threads into the retired totals; caller must hold the lock"""
+        while self._exited:
+            shard = self._exited.pop()
+            self._shards.discard(shard)
+            _merge(self._retired.counters, self._retired.histograms, shard)
+
+    def inc(self, name, labels=(), value=1):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        series = histograms.get(key)
+        if series is None:
+            series = histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            self._buckets[name] = buckets
+        series[bisect.bisect_left(buckets, value)] += 1
+        series[-1] += value
+
+    def timed(self, function_name):
+        """Decorator recording a function's wall time in thirukkural_function_duration_seconds"""
+        labels = (('function', function_name),)
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe('thirukkural_function_duration_seconds', labels, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def _collect(self):
+        counters = {}
+        histograms = {}
+        with self._shards_lock:
+            self._fold_exited()
+            _merge(counters, histograms, self._retired)
+            shards = list(self._shards)
+        for shard in shards:
+            _merge(counters, histograms, shard)
+        return counters, histograms
+
+    def shard_count(self):
+        """Shards still kept per thread, after folding those of exited threads"""
+        with self._shards_lock:
+            self._fold_exited()
+            return len(self._shards)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        counters, histograms = self._collect()
+        lines = []
+        for name in sorted({key[0] for key in counters} | {key[0] for key in histograms}):
+            metric_type, help_text = METRIC_HELP.get(name, ('untyped', name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (metric, labels), series in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self._buckets[name] + (float('inf'),), series[:-1]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {series[-1]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+metrics = MetricsRegistry()
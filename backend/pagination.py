@@ -0,0 +1,120 @@
+"""
+Cursor pagination and NDJSON streaming helpers for the listing endpoints
+"""
+
+import json
+import threading
+
+from flask import Response, stream_with_context
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 1000
+
+
+def parse_page_args(args):
+    """Read limit/cursor/from/to query parameters; raises ValueError on bad input"""
+    limit = args.get('limit', default=DEFAULT_PAGE_SIZE, type=int)
+    if limit is None or limit < 1:
+        raise ValueError('limit must be a positive integer')
+
+    cursor = args.get('cursor', '0')
+    if not cursor.isdigit():
+        raise ValueError('Invalid cursor')
+
+    return {
+        'limit': min(limit, MAX_PAGE_SIZE),
+        'cursor': int(cursor),
+        'since': args.get('from'),
+        'until': args.get('to')
+    }
+
+
+def in_time_range(record, since, until):
+    """Whether a record's ISO timestamp falls inside [since, until]"""
+    timestamp = record.get('timestamp') or ''
+    if since and timestamp < since:
+        return False
+    if until and timestamp > until:
+        return False
+    return True
+
+
+def paginate_list(records, cursor=0, limit=DEFAULT_PAGE_SIZE, since=None, until=None):
+    """Page through an append-only list; the cursor is the next list position"""
+    page = []
+    position = cursor
+    end = len(records)
+    while position < end and len(page) < limit:
+        record = records[position]
+        position += 1
+        if in_time_range(record, since, until):
+            page.append(record)
+    next_cursor = str(position) if position < end else None
+    return page, next_cursor
+
+
+class CappedRecords:
+    """Append-only records that drop their oldest entries beyond `max_records`
+
+    Cursors are absolute positions, so they stay valid as old records roll off.
+    """
+
+    def __init__(self, records=(), max_records=None):
+        self.max_records = max_records
+        self.dropped = 0
+        self._records = []
+        self._lock = threading.Lock()
+        self.extend(records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(list(self._records))
+
+    def append(self, record):
+        self.extend([record])
+
+    def extend(self, records):
+        with self._lock:
+            self._records.extend(records)
+            if self.max_records and len(self._records) > self.max_records:
+                # Drop 1% at a time so the list copy is amortized over many appends
+                excess = len(self._records) - self.max_records + max(1, self.max_records // 100)
+                excess = min(excess, len(self._records) - 1)
+                # A new list rather than an in-place delete, so pages being read keep their positions
+                self._records = self._records[excess:]
+                self.dropped += excess
+
+    def clear(self):
+        with self._lock:
+            self.dropped += len(self._records)
+            self._records = []
+
+    def page(self, cursor=0, limit=DEFAULT_PAGE_SIZE, since=None, until=None):
+        """paginate_list over absolute positions; cursors from before a rollover resume at the oldest record"""
+        with self._lock:
+            records, dropped = self._records, self.dropped
+        page, next_cursor = paginate_list(records, max(0, cursor - dropped), limit, since, until)
+        return page, None if next_cursor is None else str(int(next_cursor) + dropped)
+
+
+def iter_pages(fetch_page, since=None, until=None):
+    """Yield every record from a page function, one bounded chunk at a time"""
+    cursor = 0
+    while True:
+        page, next_cursor = fetch_page(cursor=cursor, limit=STREAM_CHUNK_SIZE, since=since, until=until)
+        yield from page
+        if next_cursor is None:
+            return
+        cursor = int(next_cursor)
+
+
+def ndjson_response(records):
+    """Stream records as newline-delimited JSON without building the full payload"""
+    def generate():
+        for record in records:
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
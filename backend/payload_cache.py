@@ -0,0 +1,31 @@
+"""
+Pre-serialized JSON payloads with ETag / conditional GET support
+"""
+
+import hashlib
+import json
+
+from flask import Response, request
+
+# Browsers and the CDN may reuse Kural payloads for this long before revalidating
+CACHE_MAX_AGE = 300
+
+
+class CachedPayload:
+    """JSON body serialized once, with a strong ETag derived from its bytes"""
+
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, data):
+        self.body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()
+
+    def response(self):
+        """Serve the payload, or an empty 304 when the client already has it"""
+        if request.if_none_match.contains_weak(self.etag):
+            response = Response(status=304)
+        else:
+            response = Response(self.body, mimetype='application/json')
+        response.set_etag(self.etag)
+        response.headers['Cache-Control'] = f'public, max-age={CACHE_MAX_AGE}'
+        return response
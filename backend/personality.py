@@ -0,0 +1,136 @@
+"""
+Personality typing from quiz answers with a precomputed question x answer -> dimension table
+
+The default weights are the rules of analyzePersonality in project/src/utils/quizLogic.js.
+"""
+
+import json
+
+import numpy as np
+
+from quiz_store import ANSWER_LETTERS, PERSONALITY_TYPES, QUESTION_IDS
+
+# Score dimensions, one per entry of PERSONALITY_TYPES; ties go to the earliest
+DIMENSIONS = ('wisdom', 'compassion', 'strength', 'harmony')
+
+PERSONALITY_PROFILES = {
+    'The Wise Seeker': {
+        'description': 'You value knowledge, truth, and ethical decision-making',
+        'traits': ['Analytical', 'Ethical', 'Thoughtful']
+    },
+    'The Compassionate Heart': {
+        'description': 'You prioritize relationships, empathy, and understanding',
+        'traits': ['Empathetic', 'Kind', 'Understanding']
+    },
+    'The Strong Leader': {
+        'description': 'You embody courage, determination, and leadership',
+        'traits': ['Courageous', 'Determined', 'Leadership']
+    },
+    'The Peaceful Soul': {
+        'description': 'You seek balance, harmony, and inner peace',
+        'traits': ['Balanced', 'Peaceful', 'Harmonious']
+    },
+}
+
+# Points an answer adds to each dimension; questions not listed use DEFAULT_WEIGHTS
+QUESTION_WEIGHTS = {
+    '1': {'A': {'wisdom': 2}, 'B': {'compassion': 2}, 'D': {'harmony': 1}},
+    '2': {'A': {'wisdom': 2}, 'B': {'compassion': 1}},
+    '3': {'A': {'wisdom': 2}, 'D': {'compassion': 2}},
+    '4': {'A': {'compassion': 2}, 'B': {'wisdom': 1}},
+    '5': {'A': {'strength': 2}, 'B': {'harmony': 2}},
+}
+DEFAULT_WEIGHTS = {'A': {'wisdom': 1}, 'B': {'compassion': 1}, 'C': {'strength': 1}, 'D': {'harmony': 1}}
+
+# Sessions scored per NumPy pass when re-scoring a whole store
+SCORE_CHUNK = 1 << 20
+
+_DIMENSION_SLOTS = {dimension: slot for slot, dimension in enumerate(DIMENSIONS)}
+
+
+def load_weights(path):
+    """(question weights, default weights) from a JSON file of {"questions": {...}, "default": {...}}"""
+    with open(path, encoding='utf-8') as source:
+        weights = json.load(source)
+    return weights.get('questions', {}), weights.get('default', {})
+
+
+class PersonalityScorer:
+    """Scores quiz answers through one weights[question, answer code, dimension] array"""
+
+    def __init__(self, question_weights=QUESTION_WEIGHTS, default_weights=DEFAULT_WEIGHTS):
+        self.question_weights = question_weights
+        self.default_weights = default_weights
+        self._columns = {question_id: column for column, question_id in enumerate(QUESTION_IDS)}
+        self._codes = {letter: code for code, letter in enumerate(ANSWER_LETTERS, 1)}
+        # Code 0 (unanswered) and answers without a rule add nothing
+        self.weights = np.zeros((len(QUESTION_IDS), len(ANSWER_LETTERS) + 1, len(DIMENSIONS)), dtype=np.float32)
+        for column, question_id in enumerate(QUESTION_IDS):
+            self.weights[column] = self._answer_table(question_weights.get(question_id, default_weights))
+        # The same table as (question id, letter) -> nonzero (dimension slot, points), for
+        # scoring one session without NumPy call overhead
+        self._points = {
+            (question_id, letter): self._nonzero(self.weights[column, code])
+            for column, question_id in enumerate(QUESTION_IDS)
+            for letter, code in self._codes.items()
+        }
+        # Question ids outside the quiz only ever get the default rules
+        default_table = self._answer_table(default_weights)
+        self._default_points = {letter: self._nonzero(default_table[code]) for letter, code in self._codes.items()}
+
+    def _answer_table(self, rules):
+        table = np.zeros((len(ANSWER_LETTERS) + 1, len(DIMENSIONS)), dtype=np.float32)
+        for letter, points in rules.items():
+            for dimension, weight in points.items():
+                table[self._codes[letter], _DIMENSION_SLOTS[dimension]] = weight
+        return table
+
+    @staticmethod
+    def _nonzero(row):
+        return tuple((slot, float(points)) for slot, points in enumerate(row) if points)
+
+    def score(self, answers):
+        """Score per dimension, in DIMENSIONS order, for one {question_id: letter} dict"""
+        scores = [0.0] * len(DIMENSIONS)
+        if not isinstance(answers, dict):
+            return scores
+        for question_id, answer in answers.items():
+            if not isinstance(answer, str):
+                continue
+            question_id = str(question_id)
+            if question_id in self._columns:
+                points = self._points.get((question_id, answer), ())
+            else:
+                points = self._default_points.get(answer, ())
+            for slot, weight in points:
+                scores[slot] += weight
+        return scores
+
+    def classify(self, answers):
+        """Personality type name for one set of answers"""
+        scores = self.score(answers)
+        # First maximum wins, the same tie-break as analyzePersonality
+        return PERSONALITY_TYPES[scores.index(max(scores))]
+
+    def result(self, answers):
+        """Type, description, traits and dimension scores, as /api/quiz/score returns them"""
+        scores = self.score(answers)
+        personality_type = PERSONALITY_TYPES[scores.index(max(scores))]
+        return {
+            'type': personality_type,
+            **PERSONALITY_PROFILES[personality_type],
+            'scores': dict(zip(DIMENSIONS, scores))
+        }
+
+    def classify_columns(self, answers):
+        """Index into PERSONALITY_TYPES per row of a sessions x QUESTION_IDS answer code matrix"""
+        types = np.empty(len(answers), dtype=np.uint8)
+        for start in range(0, len(answers), SCORE_CHUNK):
+            chunk = answers[start:start + SCORE_CHUNK]
+            scores = np.zeros((len(chunk), len(DIMENSIONS)), dtype=np.float32)
+            # One gather per question: each answer code picks its row of dimension points
+            for column in range(chunk.shape[1]):
+                scores += self.weights[column][chunk[:, column]]
+            # argmax keeps the first maximum, the same tie-break as analyzePersonality
+            types[start:start + len(chunk)] = np.argmax(scores, axis=1)
+        return types
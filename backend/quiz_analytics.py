@@ -0,0 +1,235 @@
+"""
+Running quiz analytics, updated once per submission
+"""
+
+import logging
+import threading
+
+import numpy as np
+
+from personality import PersonalityScorer
+from quiz_store import ANSWER_LETTERS, PERSONALITY_TYPES, QUESTION_IDS, valid_answers
+from rollups import GRANULARITIES, TimeRollup, iso_time, wall_seconds
+from structured_logging import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Rollup keys: answer keys as they are, personality types under ('personality', name)
+PERSONALITY_KEYS = tuple(('personality', name) for name in PERSONALITY_TYPES)
+
+
+def column_analytics(answers, types, question_ids, answer_letters):
+    """Answer and personality counts for a sessions x questions matrix of answer codes
+
+    Code 0 is unanswered and code i is answer_letters[i - 1]; column j is question_ids[j].
+    `types` holds each session's personality code, i for PERSONALITY_TYPES[i - 1].
+    """
+    sessions, questions = answers.shape
+    codes = len(answer_letters) + 1
+    # One bincount over (question, code) pairs gives every answer frequency at once
+    pair_counts = np.bincount(
+        (answers.astype(np.int64) + np.arange(questions) * codes).ravel(), minlength=questions * codes
+    ).reshape(questions, codes)
+    answer_counts = {
+        f"Q{question_id}_{letter}": int(pair_counts[column, code])
+        for column, question_id in enumerate(question_ids)
+        for code, letter in enumerate(answer_letters, 1)
+        if pair_counts[column, code]
+    }
+
+    type_counts = np.bincount(types, minlength=len(PERSONALITY_TYPES) + 1)
+    personality_counts = {
+        name: int(count) for name, count in zip(PERSONALITY_TYPES, type_counts[1:]) if count
+    }
+
+    return sessions, answer_counts, personality_counts
+
+
+def rollup_columns(rollup, answers, types, timestamps):
+    """Merge sessions given as column_analytics() inputs plus microsecond timestamps into a TimeRollup"""
+    now = rollup.clock()
+    # Future timestamps count as now, as TimeRollup.add does
+    seconds = np.minimum(timestamps // 1_000_000, now)
+    for granularity, width in GRANULARITIES.items():
+        indexes = seconds // width
+        kept = np.flatnonzero(indexes >= now // width - rollup.retention[granularity] + 1)
+        order = kept[np.argsort(indexes[kept], kind='stable')]
+        buckets, starts = np.unique(indexes[order], return_index=True)
+        # One column_analytics() per bucket, over that bucket's rows only
+        for index, rows in zip(buckets.tolist(), np.split(order, starts[1:])):
+            sessions, answer_counts, personality_counts = column_analytics(
+                answers[rows], types[rows], QUESTION_IDS, ANSWER_LETTERS
+            )
+            for name, count in personality_counts.items():
+                answer_counts['personality', name] = count
+            rollup.merge(granularity, index, sessions, answer_counts)
+
+
+def split_rollup_counts(counts):
+    """(answer frequencies, personality distribution) from rollup counts"""
+    answer_counts = {}
+    personality_counts = {}
+    for key, count in counts.items():
+        if isinstance(key, tuple):
+            personality_counts[key[1]] = count
+        else:
+            answer_counts[key] = count
+    return answer_counts, personality_counts
+
+
+def log_skipped(skipped):
+    """Warn about stored responses left out of a rebuild because their answers do not fit the quiz"""
+    if skipped:
+        logger.warning('skipped malformed quiz responses', extra={'fields': {'responses': skipped}})
+
+
+class QuizAnalytics:
+    """Answer-frequency and personality counters maintained at submit time, all-time and per time bucket"""
+
+    def __init__(self, scorer=None, rollup=None):
+        # Scores responses stored without a personality_type
+        self.scorer = scorer or PersonalityScorer()
+        self._lock = threading.Lock()
+        self.total_responses = 0
+        self.answer_counts = {}
+        self.personality_counts = {}
+        self.rollup = rollup or TimeRollup()
+        # Position in a store shared with other workers (see refresh_from)
+        self._refresh_lock = threading.Lock()
+        self.generation = None
+        self.cursor = 0
+
+    def _fresh_rollup(self):
+        return TimeRollup(self.rollup.retention, self.rollup.clock)
+
+    def record(self, answers, personality_type=None, timestamp=None):
+        """Fold one submission into the running totals, scoring it unless its type is given"""
+        keys = [f"Q{question_id}_{answer}" for question_id, answer in answers.items()]
+        personality_type = personality_type or self.scorer.classify(answers)
+
+        with self._lock:
+            self.total_responses += 1
+            for key in keys:
+                self.answer_counts[key] = self.answer_counts.get(key, 0) + 1
+            self.personality_counts[personality_type] = self.personality_counts.get(personality_type, 0) + 1
+            rollup = self.rollup
+        keys.append(('personality', personality_type))
+        rollup.add(keys, wall_seconds(timestamp))
+
+    def rebuild(self, responses):
+        """Recompute every counter from stored responses, replacing the current totals"""
+        fresh = QuizAnalytics(self.scorer, self._fresh_rollup())
+        skipped = 0
+        for response in responses:
+            if not valid_answers(response.get('answers')):
+                skipped += 1
+                continue
+            fresh.record(response['answers'], response.get('personality_type'), response.get('timestamp'))
+        log_skipped(skipped)
+
+        with self._lock:
+            self.total_responses = fresh.total_responses
+            self.answer_counts = fresh.answer_counts
+            self.personality_counts = fresh.personality_counts
+            self.rollup = fresh.rollup
+
+    def refresh_from(self, store):
+        """Fold in the responses any worker added to a shared store since the last refresh, rebuilding
+        when the store's generation moved on (a rescore or rebuild); a no-op for per-process stores"""
+        if not hasattr(store, 'changes'):
+            return
+        with self._refresh_lock:
+            generation, cursor, responses = store.changes(self.generation, self.cursor)
+            if generation != self.generation:
+                self.rebuild(responses)
+            else:
+                skipped = 0
+                for response in responses:
+                    if not valid_answers(response.get('answers')):
+                        skipped += 1
+                        continue
+                    self.record(response['answers'], response.get('personality_type'), response.get('timestamp'))
+                log_skipped(skipped)
+            self.generation, self.cursor = generation, cursor
+
+    def rebuild_from(self, store):
+        """rebuild() from a store, vectorized when the store keeps answers in columns"""
+        if hasattr(store, 'changes'):
+            # Every worker reads the shared store, so every worker rebuilds
+            store.invalidate()
+            self.refresh_from(store)
+            return
+        columns = getattr(store, 'columns', None)
+        if columns is None:
+            self.rebuild(store.all())
+            return
+
+        answers, types, timestamps, extra_responses = columns()
+        unscored = types == 0
+        if unscored.any():
+            types = types.copy()
+            types[unscored] = self.scorer.classify_columns(answers[unscored]) + 1
+        total, answer_counts, personality_counts = column_analytics(answers, types, QUESTION_IDS, ANSWER_LETTERS)
+        rollup = self._fresh_rollup()
+        rollup_columns(rollup, answers, types, timestamps)
+        # Responses kept outside the columns are few; count them one by one
+        skipped = 0
+        for response in extra_responses:
+            if not valid_answers(response.get('answers')):
+                skipped += 1
+                continue
+            total += 1
+            keys = [f"Q{question_id}_{answer}" for question_id, answer in response['answers'].items()]
+            for key in keys:
+                answer_counts[key] = answer_counts.get(key, 0) + 1
+            personality_type = response.get('personality_type') or self.scorer.classify(response['answers'])
+            personality_counts[personality_type] = personality_counts.get(personality_type, 0) + 1
+            keys.append(('personality', personality_type))
+            rollup.add(keys, wall_seconds(response.get('timestamp')))
+        log_skipped(skipped)
+
+        with self._lock:
+            self.total_responses = total
+            self.answer_counts = answer_counts
+            self.personality_counts = personality_counts
+            self.rollup = rollup
+
+    def snapshot(self):
+        """Return a consistent copy of the counters"""
+        with self._lock:
+            return {
+                'total_responses': self.total_responses,
+                'answer_frequencies': dict(self.answer_counts),
+                'personality_distribution': dict(self.personality_counts)
+            }
+
+    def window(self, since=None, until=None, granularity=None):
+        """Counters over a time window (wall_seconds bounds) from the rollup, with per-bucket points at `granularity`"""
+        with self._lock:
+            rollup = self.rollup
+        series = None
+        if granularity:
+            # Totals over the same whole buckets as the points, so the points add up to them
+            points, start, end = rollup.series(granularity, since, until, PERSONALITY_KEYS)
+            series = [
+                {
+                    'start': iso_time(bucket_start),
+                    'total_responses': sessions,
+                    'personality_distribution': split_rollup_counts(counts)[1]
+                }
+                for bucket_start, sessions, counts in points
+            ]
+            since, until = start, end - 1
+        sessions, counts, start, end = rollup.query(since, until)
+        answer_counts, personality_counts = split_rollup_counts(counts)
+        analytics = {
+            'total_responses': sessions,
+            'answer_frequencies': answer_counts,
+            'personality_distribution': personality_counts,
+            'from': iso_time(start),
+            'to': iso_time(end)
+        }
+        if series is not None:
+            analytics['granularity'] = granularity
+            analytics['series'] = series
+        return analytics
@@ -0,0 +1,477 @@
+"""
+Storage backends for submitted quiz responses
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from pagination import DEFAULT_PAGE_SIZE, in_time_range
+
+# Questions and answers of the personality quiz, stored as one code per column
+QUESTION_IDS = tuple(str(question) for question in range(1, 16))
+ANSWER_LETTERS = 'ABCD'
+
+# Personality types a response is stored with (see personality.py), in tie-break order
+PERSONALITY_TYPES = ('The Wise Seeker', 'The Compassionate Heart', 'The Strong Leader', 'The Peaceful Soul')
+
+# Sessions kept by the in-memory store before the oldest roll off (0 = unlimited)
+MAX_RESPONSES = int(os.environ.get('QUIZ_MAX_RESPONSES', '1000000'))
+
+# New sessions are merged into the sorted lookup index this many at a time
+INDEX_MERGE_SIZE = 4096
+
+_QUESTION_COLUMNS = {question_id: column for column, question_id in enumerate(QUESTION_IDS)}
+_ANSWER_CODES = {letter: code for code, letter in enumerate(ANSWER_LETTERS, 1)}
+_TYPE_CODES = {name: code for code, name in enumerate(PERSONALITY_TYPES, 1)}
+_BASE_FIELDS = 4
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _uuid_bytes(session_id):
+    """16 UUID bytes for a canonical UUID string, else None"""
+    try:
+        parsed = uuid.UUID(session_id)
+    except (TypeError, ValueError, AttributeError):
+        return None
+    return parsed.bytes if str(parsed) == session_id else None
+
+
+def _answer_codes(answers):
+    """Answer code per question column, or None when the answers do not fit the quiz"""
+    if not isinstance(answers, dict):
+        return None
+    codes = [0] * len(QUESTION_IDS)
+    for question_id, answer in answers.items():
+        column = _QUESTION_COLUMNS.get(question_id)
+        code = _ANSWER_CODES.get(answer) if isinstance(answer, str) else None
+        if column is None or code is None:
+            return None
+        codes[column] = code
+    return codes
+
+
+def valid_answers(answers):
+    """Whether answers is a non-empty {question id: answer letter} dict for this quiz"""
+    return isinstance(answers, dict) and bool(answers) and _answer_codes(answers) is not None
+
+
+def _timestamp_micros(timestamp, exact=True):
+    """Microseconds since 1970 for a naive ISO timestamp; with exact, only if it formats back identically"""
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None or (exact and parsed.isoformat() != timestamp):
+        return None
+    return (parsed - _EPOCH) // timedelta(microseconds=1)
+
+
+class InMemoryQuizStore:
+    """Quiz responses in NumPy columns, about 60 bytes per session
+
+    Rows hold the UUID as 16 bytes, one answer code per question (0 = unanswered,
+    1-4 = A-D), the timestamp as microseconds and the personality type as a code
+    (0 = not scored). A response that does not fit
+    that shape (other question ids or answers, a non-UUID session ID, a timestamp
+    with a timezone) is kept whole in a side dict so it still round-trips exactly.
+    """
+
+    def __init__(self, capacity=1024, max_responses=MAX_RESPONSES):
+        self._lock = threading.Lock()
+        self.max_responses = max_responses
+        # Rows rolled off the front; cursors are absolute positions that include them
+        self.dropped = 0
+        self._count = 0
+        self._ids = np.zeros((capacity, 16), dtype=np.uint8)
+        self._answers = np.zeros((capacity, len(QUESTION_IDS)), dtype=np.uint8)
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._types = np.zeros(capacity, dtype=np.uint8)
+        # row -> original response, for rows the columns cannot represent
+        self._extras = {}
+        # Session lookup: a sorted (first 8 UUID bytes, row) index plus recent inserts
+        # by full UUID bytes, merged into the index in batches
+        self._index_keys = np.zeros(0, dtype=np.uint64)
+        self._index_rows = np.zeros(0, dtype=np.int64)
+        self._recent = {}
+        self._named = {}
+
+    def _grow(self, needed):
+        capacity = len(self._timestamps)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('_ids', '_answers', '_timestamps', '_types'):
+            column = getattr(self, name)
+            grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[:self._count] = column[:self._count]
+            setattr(self, name, grown)
+
+    def _merge_recent(self):
+        keys = np.fromiter(
+            (int.from_bytes(key[:8], 'big') for key in self._recent), dtype=np.uint64, count=len(self._recent)
+        )
+        rows = np.fromiter(self._recent.values(), dtype=np.int64, count=len(self._recent))
+        order = np.argsort(keys, kind='stable')
+        keys, rows = keys[order], rows[order]
+        positions = np.searchsorted(self._index_keys, keys)
+        self._index_keys = np.insert(self._index_keys, positions, keys)
+        self._index_rows = np.insert(self._index_rows, positions, rows)
+        self._recent = {}
+
+    def _find(self, session_id, key):
+        """Row of a session, or None"""
+        if key is None:
+            return self._named.get(session_id)
+        row = self._recent.get(key)
+        if row is not None:
+            return row
+        prefix = np.uint64(int.from_bytes(key[:8], 'big'))
+        start = np.searchsorted(self._index_keys, prefix, 'left')
+        end = np.searchsorted(self._index_keys, prefix, 'right')
+        for row in self._index_rows[start:end]:
+            if self._ids[row].tobytes() == key:
+                return int(row)
+        return None
+
+    def add(self, response):
+        self.add_many([response])
+
+    def add_many(self, responses):
+        with self._lock:
+            for response in responses:
+                session_id = response['session_id']
+                key = _uuid_bytes(session_id)
+                row = self._find(session_id, key)
+                if row is None:
+                    if self.max_responses and self._count >= self.max_responses:
+                        # Roll off 1% at a time so the column shift is amortized
+                        self._drop_oldest(min(self._count, max(1, self.max_responses // 100)))
+                    row = self._count
+                    self._grow(row + 1)
+                    self._count += 1
+                    if key is None:
+                        self._named[session_id] = row
+                    else:
+                        self._recent[key] = row
+                        if len(self._recent) >= INDEX_MERGE_SIZE:
+                            self._merge_recent()
+                self._write_row(row, response, key)
+
+    def _drop_oldest(self, count):
+        keep = self._count - count
+        for name in ('_ids', '_answers', '_timestamps', '_types'):
+            column = getattr(self, name)
+            column[:keep] = column[count:self._count].copy()
+            column[keep:self._count] = 0
+        self._count = keep
+        self.dropped += count
+        self._extras = {row - count: response for row, response in self._extras.items() if row >= count}
+        self._named = {session_id: row - count for session_id, row in self._named.items() if row >= count}
+
+        # Rebuild the lookup index over the surviving UUID rows in one sort
+        uuid_rows = np.ones(keep, dtype=bool)
+        uuid_rows[list(self._named.values())] = False
+        rows = np.flatnonzero(uuid_rows)
+        keys = self._ids[:keep, :8].copy().view('>u8').ravel().astype(np.uint64)[rows]
+        order = np.argsort(keys, kind='stable')
+        self._index_keys = keys[order]
+        self._index_rows = rows[order]
+        self._recent = {}
+
+    def _write_row(self, row, response, key):
+        self._ids[row] = np.frombuffer(key or bytes(16), dtype=np.uint8)
+        self._extras.pop(row, None)
+        codes = _answer_codes(response.get('answers'))
+        timestamp = _timestamp_micros(response.get('timestamp'))
+        type_code = _TYPE_CODES.get(response['personality_type']) if 'personality_type' in response else 0
+        if (key is None or codes is None or timestamp is None or type_code is None
+                or response.get('total_questions') != len(response['answers'])
+                or len(response) != _BASE_FIELDS + ('personality_type' in response)):
+            self._answers[row] = 0
+            self._timestamps[row] = 0
+            self._types[row] = 0
+            self._extras[row] = response
+        else:
+            self._answers[row] = codes
+            self._timestamps[row] = timestamp
+            self._types[row] = type_code
+
+    def _response(self, row):
+        extra = self._extras.get(row)
+        if extra is not None:
+            return extra
+        codes = self._answers[row].tolist()
+        answers = {
+            question_id: ANSWER_LETTERS[code - 1]
+            for question_id, code in zip(QUESTION_IDS, codes) if code
+        }
+        response = {
+            'session_id': str(uuid.UUID(bytes=self._ids[row].tobytes())),
+            'answers': answers,
+            'timestamp': (_EPOCH + timedelta(microseconds=int(self._timestamps[row]))).isoformat(),
+            'total_questions': len(answers)
+        }
+        type_code = self._types[row]
+        if type_code:
+            response['personality_type'] = PERSONALITY_TYPES[type_code - 1]
+        return response
+
+    def get(self, session_id):
+        with self._lock:
+            row = self._find(session_id, _uuid_bytes(session_id))
+            return None if row is None else self._response(row)
+
+    def _matching_rows(self, start, end, since, until):
+        """Rows in [start, end) whose timestamp is inside [since, until]"""
+        timestamps = self._timestamps[start:end]
+        mask = np.ones(end - start, dtype=bool)
+        for bound, keep in ((since, np.greater_equal), (until, np.less_equal)):
+            if bound:
+                micros = _timestamp_micros(bound, exact=False)
+                if micros is None:
+                    # Not a plain ISO time: compare as strings, like the other stores
+                    return [row for row in range(start, end) if in_time_range(self._response(row), since, until)]
+                mask &= keep(timestamps, micros)
+        for row in self._extras:
+            if start <= row < end:
+                mask[row - start] = in_time_range(self._extras[row], since, until)
+        return (np.flatnonzero(mask) + start).tolist()
+
+    def page(self, cursor=0, limit=DEFAULT_PAGE_SIZE, since=None, until=None):
+        """Return (responses, next_cursor) starting at absolute position `cursor`"""
+        with self._lock:
+            end = self._count
+            dropped = self.dropped
+            rows = []
+            position = max(0, cursor - dropped)
+            # Scan in growing windows so a selective time range does not materialize every row
+            window = max(limit, 1024)
+            while position < end and len(rows) < limit:
+                stop = min(end, position + window)
+                if since or until:
+                    rows.extend(self._matching_rows(position, stop, since, until))
+                else:
+                    rows.extend(range(position, stop))
+                position = stop
+                window *= 2
+            if len(rows) > limit:
+                rows = rows[:limit]
+                position = rows[-1] + 1
+            page = [self._response(row) for row in rows]
+        next_cursor = str(position + dropped) if position < end else None
+        return page, next_cursor
+
+    def columns(self):
+        """(answer code matrix, personality type codes, timestamps, responses kept outside the columns)
+
+        Type code 0 is a row stored without a personality_type, i is PERSONALITY_TYPES[i - 1].
+        Timestamps are microseconds since 1970 on the naive ISO clock.
+        """
+        with self._lock:
+            extra_rows = sorted(self._extras)
+            answers = np.delete(self._answers[:self._count], extra_rows, axis=0)
+            types = np.delete(self._types[:self._count], extra_rows)
+            timestamps = np.delete(self._timestamps[:self._count], extra_rows)
+            return answers, types, timestamps, [self._extras[row] for row in extra_rows]
+
+    def rescore(self, scorer):
+        """Recompute every stored personality_type with a PersonalityScorer, vectorized over the columns"""
+        with self._lock:
+            types = scorer.classify_columns(self._answers[:self._count]) + 1
+            for row, response in self._extras.items():
+                types[row] = 0
+                self._extras[row] = {**response, 'personality_type': scorer.classify(response.get('answers'))}
+            self._types[:self._count] = types
+
+    def all(self):
+        with self._lock:
+            return [self._response(row) for row in range(self._count)]
+
+    def count(self):
+        return self._count
+
+
+class SQLiteQuizStore:
+    """Quiz responses in an SQLite file shared by every worker process"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute('''
+            CREATE TABLE IF NOT EXISTS quiz_responses (
+                session_id TEXT PRIMARY KEY,
+                answers TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                total_questions INTEGER NOT NULL,
+                personality_type TEXT
+            )
+        ''')
+        # Files created before responses were scored lack the column
+        columns = {row[1] for row in connection.execute('PRAGMA table_info(quiz_responses)')}
+        if 'personality_type' not in columns:
+            connection.execute('ALTER TABLE quiz_responses ADD COLUMN personality_type TEXT')
+        # Bumped whenever stored responses change other than by being added, so every
+        # worker knows to rebuild its analytics rather than fold in the new rows
+        connection.execute('''
+            CREATE TABLE IF NOT EXISTS quiz_generation (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                generation INTEGER NOT NULL
+            )
+        ''')
+        connection.execute('INSERT OR IGNORE INTO quiz_generation (id, generation) VALUES (1, 0)')
+        connection.commit()
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _to_row(response):
+        return (
+            response['session_id'],
+            json.dumps(response['answers']),
+            response['timestamp'],
+            response['total_questions'],
+            response.get('personality_type'),
+        )
+
+    @staticmethod
+    def _from_row(row):
+        session_id, answers, timestamp, total_questions, personality_type = row
+        response = {
+            'session_id': session_id,
+            'answers': json.loads(answers),
+            'timestamp': timestamp,
+            'total_questions': total_questions
+        }
+        if personality_type is not None:
+            response['personality_type'] = personality_type
+        return response
+
+    def add(self, response):
+        self.add_many([response])
+
+    def add_many(self, responses):
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO quiz_responses '
+                '(session_id, answers, timestamp, total_questions, personality_type) VALUES (?, ?, ?, ?, ?)',
+                (self._to_row(response) for response in responses)
+            )
+
+    def get(self, session_id):
+        row = self._connection().execute(
+            'SELECT session_id, answers, timestamp, total_questions, personality_type '
+            'FROM quiz_responses WHERE session_id = ?',
+            (session_id,)
+        ).fetchone()
+        return None if row is None else self._from_row(row)
+
+    def page(self, cursor=0, limit=DEFAULT_PAGE_SIZE, since=None, until=None):
+        """Return (responses, next_cursor) for rows after rowid `cursor`"""
+        query = (
+            'SELECT rowid, session_id, answers, timestamp, total_questions, personality_type '
+            'FROM quiz_responses WHERE rowid > ?'
+        )
+        params = [cursor]
+        if since:
+            query += ' AND timestamp >= ?'
+            params.append(since)
+        if until:
+            query += ' AND timestamp <= ?'
+            params.append(until)
+        query += ' ORDER BY rowid LIMIT ?'
+        params.append(limit + 1)
+
+        rows = self._connection().execute(query, params).fetchall()
+        page = [self._from_row(row[1:]) for row in rows[:limit]]
+        next_cursor = str(rows[limit - 1][0]) if len(rows) > limit else None
+        return page, next_cursor
+
+    def all(self):
+        rows = self._connection().execute(
+            'SELECT session_id, answers, timestamp, total_questions, personality_type '
+            'FROM quiz_responses ORDER BY rowid'
+        )
+        return [self._from_row(row) for row in rows]
+
+    def changes(self, generation=None, cursor=0):
+        """(generation, cursor, responses) added after rowid `cursor`, or every response once the generation moved on"""
+        connection = self._connection()
+        # One read transaction, so the responses are exactly those of the generation returned
+        connection.execute('BEGIN')
+        try:
+            current = connection.execute('SELECT generation FROM quiz_generation').fetchone()[0]
+            if current != generation:
+                cursor = 0
+            rows = connection.execute(
+                'SELECT rowid, session_id, answers, timestamp, total_questions, personality_type '
+                'FROM quiz_responses WHERE rowid > ? ORDER BY rowid',
+                (cursor,)
+            ).fetchall()
+        finally:
+            connection.commit()
+        return current, rows[-1][0] if rows else cursor, [self._from_row(row[1:]) for row in rows]
+
+    def invalidate(self):
+        """Make every worker rebuild its analytics from the stored responses on its next changes() call"""
+        connection = self._connection()
+        with connection:
+            connection.execute('UPDATE quiz_generation SET generation = generation + 1')
+
+    def rescore(self, scorer, batch_size=10000):
+        """Recompute every stored personality_type with a PersonalityScorer, one vectorized batch per transaction"""
+        connection = self._connection()
+        last_rowid = 0
+        while True:
+            rows = connection.execute(
+                'SELECT rowid, answers, personality_type FROM quiz_responses WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                (last_rowid, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            # One JSON array per batch decodes in half the time of a json.loads per row; the
+            # answer code matrix is then typed in one pass, as the in-memory store does
+            decoded = json.loads('[' + ','.join(answers for _, answers, _ in rows) + ']')
+            codes = [_answer_codes(answers) for answers in decoded]
+            matrix = np.array([row_codes or [0] * len(QUESTION_IDS) for row_codes in codes], dtype=np.uint8)
+            types = [PERSONALITY_TYPES[code] for code in scorer.classify_columns(matrix)]
+            for index, row_codes in enumerate(codes):
+                if row_codes is None:
+                    types[index] = scorer.classify(decoded[index])
+            with connection:
+                # Only rows whose type changed are written back
+                connection.executemany(
+                    'UPDATE quiz_responses SET personality_type = ? WHERE rowid = ?',
+                    [(personality_type, rowid) for personality_type, (rowid, _, previous) in zip(types, rows)
+                     if personality_type != previous]
+                )
+            last_rowid = rows[-1][0]
+        self.invalidate()
+
+    def count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM quiz_responses').fetchone()[0]
+
+
+def create_quiz_store(url=None, max_responses=MAX_RESPONSES):
+    """Build a quiz store from a URL such as 'memory://' or 'sqlite:///path/to/quiz.db'"""
+    if not url or url == 'memory://':
+        return InMemoryQuizStore(max_responses=max_responses)
+    if url.startswith('sqlite:///'):
+        return SQLiteQuizStore(url[len('sqlite:///'):])
+    raise ValueError(f"Unsupported quiz store URL: {url}")
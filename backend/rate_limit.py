@@ -0,0 +1,116 @@
+"""
+Token-bucket rate limiting for the write endpoints
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Sustained writes per second per client, and how many may arrive at once
+WRITE_RATE = float(os.environ.get('WRITE_RATE_LIMIT', '2'))
+WRITE_BURST = float(os.environ.get('WRITE_RATE_BURST', '30'))
+
+# Clients tracked by the in-memory limiter; the least recently seen are forgotten first
+MAX_CLIENTS = 100000
+
+# SQLite limiter: delete buckets idle long enough to be full again, every this many checks
+PRUNE_EVERY = 10000
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets in this process"""
+
+    def __init__(self, rate=WRITE_RATE, burst=WRITE_BURST, max_clients=MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # key -> [tokens, last refill time]
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Take a token for `key`; returns (allowed, seconds until the next token)"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0.0
+            return False, (1 - bucket[0]) / self.rate
+
+
+class SQLiteTokenBucketLimiter:
+    """Token buckets in an SQLite file, so every worker process shares one limit per client"""
+
+    def __init__(self, path, rate=WRITE_RATE, burst=WRITE_BURST):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self._local = threading.local()
+        self._checks = 0
+        connection = self._connection()
+        connection.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        ''')
+
+    def _connection(self):
+        """Return this thread's connection, opening it on first use"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Autocommit mode so BEGIN IMMEDIATE below controls the transaction
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def allow(self, key):
+        """Take a token for `key`; returns (allowed, seconds until the next token)"""
+        # Wall-clock time: monotonic clocks are not comparable across processes
+        now = time.time()
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?', (key,)
+            ).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            connection.execute('INSERT OR REPLACE INTO rate_limit_buckets VALUES (?, ?, ?)', (key, tokens, now))
+            self._checks += 1
+            if self._checks % PRUNE_EVERY == 0:
+                connection.execute(
+                    'DELETE FROM rate_limit_buckets WHERE updated < ?', (now - self.burst / self.rate,)
+                )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return allowed, 0.0 if allowed else (1 - tokens) / self.rate
+
+
+def create_rate_limiter(url=None, rate=WRITE_RATE, burst=WRITE_BURST):
+    """Build a limiter from 'memory://' or 'sqlite:///path', or None when the rate is 0 (disabled)"""
+    if rate <= 0:
+        return None
+    if not url or url == 'memory://':
+        return TokenBucketLimiter(rate, burst)
+    if url.startswith('sqlite:///'):
+        return SQLiteTokenBucketLimiter(url[len('sqlite:///'):], rate, burst)
+    raise ValueError(f"Unsupported rate limit URL: {url}")
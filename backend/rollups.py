@@ -0,0 +1,258 @@
+"""
+Time-bucketed counters for windowed analytics queries
+
+Every event is counted in one minute, one hour and one day bucket. Each width keeps
+only its newest buckets, so older spans survive at coarser widths alone (the
+downsampling). A window is answered by summing whole buckets: the widest that fit
+inside it, with finer ones at its edges, so its cost depends on the window's length
+and never on how many events it holds.
+
+Times are the server's wall clock, like the naive ISO timestamps records carry.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Bucket widths in seconds
+GRANULARITIES = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Newest buckets kept per width: one day of minutes, 30 days of hours, two years of days
+RETENTION = {
+    'minute': int(os.environ.get('ROLLUP_MINUTES', '1440')),
+    'hour': int(os.environ.get('ROLLUP_HOURS', '720')),
+    'day': int(os.environ.get('ROLLUP_DAYS', '730')),
+}
+
+# Distinct keys a rollup counts one by one; keys seen after that only count as events
+MAX_KEYS = int(os.environ.get('ROLLUP_MAX_KEYS', '4096'))
+
+# Bucket count vectors grow this many keys at a time
+KEY_BLOCK = 64
+
+_EPOCH = datetime(1970, 1, 1)
+_WIDEST_FIRST = sorted(GRANULARITIES.items(), key=lambda item: -item[1])
+_FINEST_FIRST = _WIDEST_FIRST[::-1]
+_FINEST = _FINEST_FIRST[0][1]
+
+
+def wall_seconds(timestamp):
+    """Seconds since 1970 on the server's wall clock for an ISO timestamp, or None"""
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return (parsed - _EPOCH) // timedelta(seconds=1)
+
+
+def wall_clock():
+    """The current wall_seconds()"""
+    return (datetime.now() - _EPOCH) // timedelta(seconds=1)
+
+
+def iso_time(seconds):
+    """Naive ISO timestamp for wall_seconds()"""
+    return (_EPOCH + timedelta(seconds=seconds)).isoformat()
+
+
+def parse_window_args(args):
+    """Read from/to/granularity query parameters, or None when none are given; raises ValueError on bad input"""
+    since, until, granularity = args.get('from'), args.get('to'), args.get('granularity')
+    if not (since or until or granularity):
+        return None
+    window = {'since': None, 'until': None, 'granularity': granularity or None}
+    for name, value in (('from', since), ('to', until)):
+        if value:
+            seconds = wall_seconds(value)
+            if seconds is None:
+                raise ValueError(f"Invalid '{name}' timestamp")
+            window['since' if name == 'from' else 'until'] = seconds
+    if granularity and granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    return window
+
+
+class TimeRollup:
+    """Per-width rings of [event count, per-key count vector] buckets over one shared key table"""
+
+    def __init__(self, retention=RETENTION, clock=wall_clock, max_keys=MAX_KEYS):
+        self.retention = retention
+        self.clock = clock
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # Key -> its position in every bucket's count vector, in order of first appearance
+        self._columns = {}
+        self.keys = []
+        # Granularity -> {bucket index: [events, int32 counts by column]}, index = seconds // width
+        self._buckets = {name: {} for name in GRANULARITIES}
+        # Granularity -> oldest bucket index still kept
+        self._oldest = dict.fromkeys(GRANULARITIES, 0)
+        self._expired_at = None
+
+    def _expire(self, now):
+        """Drop buckets that fell out of retention; caller must hold the lock"""
+        if now // _FINEST == self._expired_at:
+            return
+        self._expired_at = now // _FINEST
+        for name, width in GRANULARITIES.items():
+            oldest = now // width - self.retention[name] + 1
+            if oldest <= self._oldest[name]:
+                continue
+            buckets = self._buckets[name]
+            if oldest - self._oldest[name] > len(buckets):
+                stale = [index for index in buckets if index < oldest]
+            else:
+                stale = range(self._oldest[name], oldest)
+            for index in stale:
+                buckets.pop(index, None)
+            self._oldest[name] = oldest
+
+    def _column(self, key):
+        """Column of `key`, assigned on first sight while there is room, else None; caller must hold the lock"""
+        column = self._columns.get(key)
+        if column is None and len(self.keys) < self.max_keys:
+            column = self._columns[key] = len(self.keys)
+            self.keys.append(key)
+        return column
+
+    def _bucket(self, name, index):
+        """Bucket `index` of a width, created or widened to hold every column; caller must hold the lock"""
+        bucket = self._buckets[name].get(index)
+        if bucket is not None and len(bucket[1]) >= len(self.keys):
+            return bucket
+        width = min(self.max_keys, max(KEY_BLOCK, -(-len(self.keys) // KEY_BLOCK) * KEY_BLOCK))
+        counts = np.zeros(max(width, len(self.keys)), dtype=np.int32)
+        if bucket is None:
+            bucket = self._buckets[name][index] = [0, counts]
+        else:
+            counts[:len(bucket[1])] = bucket[1]
+            bucket[1] = counts
+        return bucket
+
+    def add(self, keys, seconds=None):
+        """Count one event at `seconds` (now when None or in the future) with 1 for each of its distinct keys"""
+        now = self.clock()
+        if seconds is None or seconds > now:
+            seconds = now
+        with self._lock:
+            self._expire(now)
+            column_of = self._columns.get
+            columns = [column_of(key) for key in keys]
+            if None in columns:
+                columns = [column for column in map(self._column, keys) if column is not None]
+            columns = np.array(columns, dtype=np.intp)
+            for name, width in GRANULARITIES.items():
+                index = seconds // width
+                if index < self._oldest[name]:
+                    continue
+                bucket = self._bucket(name, index)
+                bucket[0] += 1
+                bucket[1][columns] += 1
+
+    def merge(self, granularity, index, events, counts):
+        """Add pre-aggregated {key: count} counts to one bucket, ignored once it is out of retention"""
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            if index < self._oldest[granularity] or index > now // GRANULARITIES[granularity]:
+                return
+            columns = []
+            values = []
+            for key, count in counts.items():
+                column = self._column(key)
+                if column is not None:
+                    columns.append(column)
+                    values.append(count)
+            bucket = self._bucket(granularity, index)
+            bucket[0] += events
+            bucket[1][columns] += np.array(values, dtype=np.int32)
+
+    def _retained(self, name, seconds):
+        return seconds // GRANULARITIES[name] >= self._oldest[name]
+
+    def _edges(self, since, until, now, widths):
+        """[start, end) around [since, until], snapped out to the finest kept bucket at each end"""
+        earliest = min(self._oldest[name] * width for name, width in widths)
+        latest = now // _FINEST * _FINEST + _FINEST
+        start = earliest if since is None else min(max(since, earliest), latest)
+        for name, width in widths:
+            if self._retained(name, start):
+                start = start // width * width
+                break
+        end = latest if until is None else min(until, now)
+        for name, width in widths:
+            if self._retained(name, end):
+                end = end // width * width + width
+                break
+        return start, min(max(start, end), latest)
+
+    def _counts(self, totals, keys):
+        """{key: count} for the nonzero columns of a count vector, or only for `keys`"""
+        if keys is None:
+            return {self.keys[column]: int(totals[column]) for column in np.flatnonzero(totals).tolist()}
+        counts = {}
+        for key in keys:
+            column = self._columns.get(key)
+            if column is not None and column < len(totals) and totals[column]:
+                counts[key] = int(totals[column])
+        return counts
+
+    def query(self, since=None, until=None, keys=None):
+        """(events, {key: count}, start, end) summed over whole buckets covering [since, until]
+
+        The window defaults to everything kept and its edges snap out to bucket
+        boundaries; `start`/`end` report what was actually summed. With `keys` only
+        those keys are reported.
+        """
+        now = self.clock()
+        events = 0
+        with self._lock:
+            self._expire(now)
+            totals = np.zeros(len(self.keys), dtype=np.int64)
+            start, end = self._edges(since, until, now, _FINEST_FIRST)
+            position = start
+            while position < end:
+                for name, width in _WIDEST_FIRST:
+                    if position % width == 0 and position + width <= end and self._retained(name, position):
+                        break
+                else:
+                    # The finer widths have expired here: take the finest kept bucket, past the window's end
+                    name, width = next(
+                        ((name, width) for name, width in _FINEST_FIRST if self._retained(name, position)),
+                        _WIDEST_FIRST[0]
+                    )
+                    end = max(end, position + width)
+                bucket = self._buckets[name].get(position // width)
+                position += width
+                if bucket is None:
+                    continue
+                events += bucket[0]
+                columns = min(len(bucket[1]), len(totals))
+                totals[:columns] += bucket[1][:columns]
+            return events, self._counts(totals, keys), start, end
+
+    def series(self, granularity, since=None, until=None, keys=None):
+        """([(bucket start, events, {key: count}), ...], start, end) for the buckets of one width
+
+        Buckets without events are left out; the window is clamped to what that width keeps.
+        """
+        width = GRANULARITIES[granularity]
+        now = self.clock()
+        points = []
+        with self._lock:
+            self._expire(now)
+            start, end = self._edges(since, until, now, ((granularity, width),))
+            buckets = self._buckets[granularity]
+            for index in sorted(index for index in buckets if start <= index * width < end):
+                events, counts = buckets[index]
+                points.append((index * width, events, self._counts(counts, keys)))
+        return points, start, end
+
+    def bucket_count(self):
+        """Buckets currently kept, over every width"""
+        with self._lock:
+            return sum(len(buckets) for buckets in self._buckets.values())
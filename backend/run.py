@@ -3,6 +3,8 @@
 Simple script to run the Flask backend server
 """
 
+import os
+
 from app import app
 
 if __name__ == '__main__':
@@ -14,6 +16,7 @@ if __name__ == '__main__':
     print("  - GET /api/kurals/<emotion> - Get Kurals by emotion")
     print("  - GET /api/random - Get random Kural")
     print("  - GET /api/health - Health check")
-    print("\nPress Ctrl+C to stop the server")
+    print("\nDevelopment server only; use serve.py for production")
+    print("Press Ctrl+C to stop the server")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app.run(debug=os.environ.get('FLASK_DEBUG', '1') == '1', host='0.0.0.0', port=5000)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Production launcher for the Thirukkural.Ai backend
+
+Usage:
+    python serve.py                       # gunicorn, threaded WSGI workers
+    python serve.py --mode asgi           # gunicorn managing uvicorn (ASGI) workers
+    python serve.py --mode dev            # Werkzeug development server
+
+With --preload (the default) the app, its Kural corpus and every index are
+built once in the gunicorn master and shared with the forked workers.
+"""
+
+import argparse
+import multiprocessing
+import os
+
+from gunicorn.app.base import BaseApplication
+
+
+class GunicornServer(BaseApplication):
+    """Run a WSGI/ASGI callable under gunicorn with options given in code"""
+
+    def __init__(self, load, options):
+        self._load = load
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self._load()
+
+
+def load_wsgi():
+    from app import app
+    return app
+
+
+def load_asgi():
+    from asgi import application
+    return application
+
+
+def main():
+    default_workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+    parser = argparse.ArgumentParser(description="Serve the Thirukkural.Ai API")
+    parser.add_argument("--mode", choices=("wsgi", "asgi", "dev"), default=os.environ.get('SERVER_MODE', 'wsgi'))
+    parser.add_argument("--bind", default=os.environ.get('BIND', '0.0.0.0:5000'))
+    parser.add_argument("--workers", type=int, default=default_workers)
+    parser.add_argument("--threads", type=int, default=int(os.environ.get('THREADS', 4)),
+                        help="threads per worker")
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction, default=True,
+                        help="build the corpus and indexes once before forking workers")
+    parser.add_argument("--timeout", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.mode == 'dev':
+        from app import app
+        host, _, port = args.bind.rpartition(':')
+        app.run(host=host or '0.0.0.0', port=int(port), debug=os.environ.get('FLASK_DEBUG', '1') == '1')
+        return
+
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'preload_app': args.preload,
+        'timeout': args.timeout,
+        'accesslog': None,
+    }
+    if args.mode == 'asgi':
+        options['worker_class'] = 'uvicorn.workers.UvicornWorker'
+        # Size of the thread pool asgi.py runs the Flask app on
+        os.environ['THREADS'] = str(args.threads)
+        load = load_asgi
+    else:
+        options['worker_class'] = 'gthread'
+        options['threads'] = args.threads
+        load = load_wsgi
+
+    print(f"Starting Thirukkural.Ai Backend Server ({args.mode}, {args.workers} workers) on {args.bind}")
+    GunicornServer(load, options).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Queue-backed JSON-lines logging so request threads never block on log I/O
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+LOGGER_NAME = 'thirukkural'
+
+# Records waiting for the writer thread; beyond this they are dropped, not waited on
+QUEUE_SIZE = 10000
+
+# Fraction of requests whose full debug payloads are logged when LOG_LEVEL=DEBUG
+DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', '1.0'))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any `fields`"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking"""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+_state = {'listener': None, 'handler': None, 'stream': None}
+
+
+def _start(level):
+    log_queue = queue.Queue(QUEUE_SIZE)
+    stream_handler = logging.StreamHandler(_state['stream'] or sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+
+    handler = DroppingQueueHandler(log_queue)
+    logger = logging.getLogger(LOGGER_NAME)
+    if _state['handler'] is not None:
+        logger.removeHandler(_state['handler'])
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    _state['listener'] = listener
+    _state['handler'] = handler
+
+
+def _stop():
+    listener = _state['listener']
+    if listener is not None:
+        listener.stop()
+        _state['listener'] = None
+
+
+def _restart_in_child():
+    # The writer thread does not survive fork (gunicorn --preload); give each worker its own
+    if _state['listener'] is not None:
+        _start(logging.getLogger(LOGGER_NAME).level)
+
+
+def configure_logging(level=None, stream=None):
+    """Route the app logger through a background writer; safe to call more than once"""
+    level = level or os.environ.get('LOG_LEVEL', 'INFO').upper()
+    first_call = _state['handler'] is None
+    _stop()
+    _state['stream'] = stream
+    _start(level)
+    if first_call:
+        atexit.register(_stop)
+        os.register_at_fork(after_in_child=_restart_in_child)
+    return logging.getLogger(LOGGER_NAME)
+
+
+def debug_sampled(logger):
+    """Whether to log a full debug payload for this request"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    return DEBUG_SAMPLE_RATE >= 1.0 or random.random() < DEBUG_SAMPLE_RATE
@@ -17,11 +17,21 @@ function App() {
     return saved ? JSON.parse(saved) : {};
   });
 
+  // Personality typed by the backend at submit time; null falls back to local typing
+  const [quizPersonality, setQuizPersonality] = useState(() => {
+    const saved = localStorage.getItem('quizPersonality');
+    return saved ? JSON.parse(saved) : null;
+  });
+
   const handleQuizComplete = async (answers) => {
     try {
       // Submit quiz answers to backend
       const response = await chatApi.submitQuiz(answers);
       console.log('Quiz submitted successfully:', response);
+      if (response.personality) {
+        setQuizPersonality(response.personality);
+        localStorage.setItem('quizPersonality', JSON.stringify(response.personality));
+      }
     } catch (error) {
       console.error('Error submitting quiz:', error);
       // Continue with local storage even if API fails
@@ -52,7 +62,7 @@ function App() {
             path="/explore"
             element={
               quizCompleted ? (
-                <LandingPage quizAnswers={quizAnswers} />
+                <LandingPage quizAnswers={quizAnswers} quizPersonality={quizPersonality} />
               ) : (
                 <Navigate to="/" replace />
               )
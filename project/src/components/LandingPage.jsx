@@ -32,11 +32,12 @@ import { chatApi } from '../services/chatApi.js';
 import ThemeToggle from './ThemeToggle.jsx';
 import LanguageToggle from './LanguageToggle.jsx';
 
-const LandingPage = ({ quizAnswers }) => {
+const LandingPage = ({ quizAnswers, quizPersonality }) => {
   const [searchQuery, setSearchQuery] = useState('');
   const [randomKural, setRandomKural] = useState(null);
   const [isChatExpanded, setIsChatExpanded] = useState(false);
   const [messages, setMessages] = useState([]);
+  const [chatSessionId, setChatSessionId] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
   const messagesEndRef = useRef(null);
   const chatInputRef = useRef(null);
@@ -46,6 +47,7 @@ const LandingPage = ({ quizAnswers }) => {
     // Clear localStorage
     localStorage.removeItem('quizCompleted');
     localStorage.removeItem('quizAnswers');
+    localStorage.removeItem('quizPersonality');
     
     // Redirect to quiz
     window.location.href = '/';
@@ -75,7 +77,8 @@ const LandingPage = ({ quizAnswers }) => {
     }
   };
   
-  const personality = analyzePersonality(quizAnswers);
+  // Prefer the backend's typing; score locally when the quiz was submitted offline
+  const personality = quizPersonality || analyzePersonality(quizAnswers);
 
   const handleSurpriseMe = () => {
     const kural = getRandomKuralByPersonality(personality.type);
@@ -151,7 +154,8 @@ const LandingPage = ({ quizAnswers }) => {
     setIsLoading(true);
 
     try {
-      const response = await chatApi.sendMessage(currentQuery, messages);
+      const response = await chatApi.sendMessage(currentQuery, chatSessionId, messages);
+      setChatSessionId(response.session_id);
       
       const botMessage = {
         id: Date.now() + 1,
@@ -189,6 +193,7 @@ const LandingPage = ({ quizAnswers }) => {
   const handleChatClose = () => {
     setIsChatExpanded(false);
     setMessages([]);
+    setChatSessionId(null);
     setSearchQuery('');
   };
 
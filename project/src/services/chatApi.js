@@ -1,19 +1,35 @@
 const API_BASE_URL = 'http://localhost:5000/api';
 
+// Recent messages resent when the server answers that it does not know the session,
+// so the worker handling the request can rebuild it (the server reads at most this many)
+const HISTORY_FALLBACK_MESSAGES = 24;
+
+const postChat = (body) => fetch(`${API_BASE_URL}/chat`, {
+  method: 'POST',
+  headers: {
+    'Content-Type': 'application/json',
+  },
+  body: JSON.stringify(body)
+});
+
 export const chatApi = {
-  // Send a message to the chat API
-  async sendMessage(message, history = []) {
+  // Send a message to the chat API; the server keeps the conversation under sessionId.
+  // Only the new message goes out, unless the server reports the session unknown (another
+  // worker, a restart or expiry), in which case it is sent again with the recent history
+  async sendMessage(message, sessionId = null, history = []) {
     try {
-      const response = await fetch(`${API_BASE_URL}/chat`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-          message,
-          history
-        })
-      });
+      let response = await postChat({ message, session_id: sessionId });
+
+      if (response.status === 409) {
+        const error = await response.json();
+        if (error.session_unknown) {
+          response = await postChat({
+            message,
+            session_id: sessionId,
+            history: history.slice(-HISTORY_FALLBACK_MESSAGES)
+          });
+        }
+      }
 
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);